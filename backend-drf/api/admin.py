@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import TrainedModel
 
-# Register your models here.
+
+@admin.register(TrainedModel)
+class TrainedModelAdmin(admin.ModelAdmin):
+    list_display = ('ticker', 'kind', 'version', 'status', 'trained_at', 'trained_through', 'val_loss', 'size')
+    list_filter = ('kind', 'status')
+    search_fields = ('ticker', 'path')
@@ -0,0 +1,160 @@
+import numpy as np
+
+# Default trading costs used by the forecast endpoint
+TRANSACTION_COST = 0.001  # 0.1% per trade
+SLIPPAGE = 0.0005  # 0.05% slippage
+
+
+def detect_signals(predictions):
+    """
+    Find buy/sell days for the forecast-based strategy.
+
+    Buy on day i when the predicted price rises from day i-1 and no position
+    is open; sell on day i when it falls while a position is open. Both
+    execute at the day i-1 price. predictions has shape (..., days) and may
+    be NaN-padded at the end; returns boolean (buys, sells) of the same shape.
+    """
+    p = np.asarray(predictions, dtype=float)
+    direction = np.nan_to_num(np.sign(np.diff(p, axis=-1)))
+
+    # A position is open after step j iff the last non-zero direction up to j was up
+    steps = np.arange(direction.shape[-1])
+    last_move = np.maximum.accumulate(np.where(direction != 0, steps, -1), axis=-1)
+    last_direction = np.where(
+        last_move >= 0,
+        np.take_along_axis(direction, np.maximum(last_move, 0), axis=-1),
+        0,
+    )
+    was_holding = np.zeros_like(direction, dtype=bool)
+    was_holding[..., 1:] = last_direction[..., :-1] > 0
+
+    no_signal = np.zeros(p.shape[:-1] + (1,), dtype=bool)
+    buys = np.concatenate([no_signal, (direction > 0) & ~was_holding], axis=-1)
+    sells = np.concatenate([no_signal, (direction < 0) & was_holding], axis=-1)
+    return buys, sells
+
+
+def run_backtest(predictions, investment_amount, transaction_cost=TRANSACTION_COST, slippage=SLIPPAGE):
+    """
+    Backtest one predicted price series, compounding proceeds between trades.
+
+    Returns the signals, per-trade breakdown and totals in the shape used
+    by the forecast response.
+    """
+    p = np.asarray(predictions, dtype=float).reshape(-1)
+    investment_amount = float(investment_amount)
+    buys, sells = detect_signals(p)
+    buy_days, sell_days = np.flatnonzero(buys), np.flatnonzero(sells)
+    buy_prices, sell_prices = p[buy_days - 1], p[sell_days - 1]
+
+    # Every sell closes the buy before it; a trailing buy may still be open
+    n_trades = len(sell_days)
+    buy_price_actual = buy_prices[:n_trades] * (1 + slippage)
+    sell_price_actual = sell_prices * (1 - slippage)
+
+    # Each trade multiplies the cash by a fixed factor, so cash is a cumulative product
+    factors = (1 - transaction_cost) ** 2 * sell_price_actual / buy_price_actual
+    cash_before = investment_amount * np.concatenate([[1.0], np.cumprod(factors)[:-1]])
+
+    buy_cost = cash_before * transaction_cost
+    available_cash = cash_before - buy_cost
+    shares = available_cash / buy_price_actual
+    gross_sell_value = shares * sell_price_actual
+    sell_cost = gross_sell_value * transaction_cost
+    net_sell_value = gross_sell_value - sell_cost
+    trade_profit = net_sell_value - cash_before
+    trade_fees = buy_cost + sell_cost
+
+    buy_signals = [
+        {'day': int(day), 'price': float(price), 'action': 'BUY'}
+        for day, price in zip(buy_days, buy_prices)
+    ]
+    sell_signals = [
+        {'day': int(day), 'price': float(price), 'action': 'SELL'}
+        for day, price in zip(sell_days, sell_prices)
+    ]
+    trades = [
+        {
+            'buy_day': int(buy_days[k]),
+            'buy_price': float(buy_prices[k]),
+            'buy_price_actual': float(buy_price_actual[k]),
+            'sell_day': int(sell_days[k]),
+            'sell_price': float(sell_prices[k]),
+            'sell_price_actual': float(sell_price_actual[k]),
+            'shares': float(shares[k]),
+            'gross_profit': float(gross_sell_value[k] - available_cash[k]),
+            'fees': float(trade_fees[k]),
+            'net_profit': float(trade_profit[k]),
+            'return_percentage': float((trade_profit[k] / cash_before[k]) * 100),
+        }
+        for k in range(n_trades)
+    ]
+
+    return {
+        'buy_signals': buy_signals,
+        'sell_signals': sell_signals,
+        'trades': trades,
+        'total_profit': float(trade_profit.sum()),
+        'total_fees': float(trade_fees.sum()),
+        'final_value': float(net_sell_value[-1]) if n_trades else investment_amount,
+    }
+
+
+def pad_series(series_list):
+    """Stack 1-D series of different lengths into a NaN-padded 2-D array"""
+    length = max(len(series) for series in series_list)
+    padded = np.full((len(series_list), length), np.nan)
+    for row, series in enumerate(series_list):
+        padded[row, :len(series)] = np.asarray(series, dtype=float).reshape(-1)
+    return padded
+
+
+def sweep(predictions, investment_amounts, transaction_costs, slippages):
+    """
+    Backtest many series over a grid of amounts, costs and slippages at once.
+
+    predictions is a (tickers, days) array (see pad_series). Returns arrays
+    indexed [ticker, amount, cost, slippage]: final_value, total_fees and
+    return_percentage, plus total_trades per ticker.
+    """
+    p = np.atleast_2d(np.asarray(predictions, dtype=float))
+    amounts = np.asarray(investment_amounts, dtype=float)
+    costs = np.asarray(transaction_costs, dtype=float)
+    slips = np.asarray(slippages, dtype=float)
+    buys, sells = detect_signals(p)
+
+    # Ragged trades -> (tickers, max_trades) price matrices, padded with ratio 1
+    n_trades = sells.sum(axis=1)
+    max_trades = max(int(n_trades.max()), 1)
+    buy_price = np.ones((p.shape[0], max_trades))
+    sell_price = np.ones((p.shape[0], max_trades))
+    for mask, prices in ((buys, buy_price), (sells, sell_price)):
+        rows, days = np.nonzero(mask)
+        trade_index = np.cumsum(mask, axis=1)[rows, days] - 1
+        keep = trade_index < n_trades[rows]
+        prices[rows[keep], trade_index[keep]] = p[rows[keep], days[keep] - 1]
+    completed = np.arange(max_trades) < n_trades[:, None]
+
+    # Broadcast to [ticker, cost, slippage, trade]
+    tc = costs[None, :, None, None]
+    sl = slips[None, None, :, None]
+    ratio = (sell_price / buy_price)[:, None, None, :]
+    factors = np.where(completed[:, None, None, :], (1 - tc) ** 2 * (1 - sl) / (1 + sl) * ratio, 1.0)
+    cash_after = np.cumprod(factors, axis=-1)
+    cash_before = np.concatenate([np.ones(cash_after.shape[:-1] + (1,)), cash_after[..., :-1]], axis=-1)
+
+    # Fees per trade: tc on the cash deployed plus tc on the gross sale value
+    fees = np.where(completed[:, None, None, :], tc * cash_before + tc * cash_after / (1 - tc), 0.0)
+
+    # Everything scales linearly with the starting amount
+    growth = cash_after[..., -1]
+    final_value = amounts[None, :, None, None] * growth[:, None]
+    total_fees = amounts[None, :, None, None] * fees.sum(axis=-1)[:, None]
+    return_percentage = np.broadcast_to((growth[:, None] - 1) * 100, final_value.shape)
+
+    return {
+        'final_value': final_value,
+        'total_fees': total_fees,
+        'return_percentage': return_percentage,
+        'total_trades': n_trades,
+    }
@@ -0,0 +1,113 @@
+import os
+from datetime import datetime
+from django.db import transaction
+from django.utils import timezone
+from .model_bundle import HEAD_SUFFIX, SHARED_ENCODER_FILE, is_head, load_metadata
+from .models import TrainedModel
+
+MODEL_SUFFIX = '_stock_prediction_model.keras'
+
+
+def model_kind(model_path):
+    if os.path.basename(model_path) == SHARED_ENCODER_FILE:
+        return TrainedModel.KIND_ENCODER
+    if is_head(model_path):
+        return TrainedModel.KIND_HEAD
+    return TrainedModel.KIND_MODEL
+
+
+def register_model(model_path, metadata, model=None, training=None, trained_at=None):
+    """
+    Record a freshly saved model bundle in the catalog.
+
+    metadata is the sidecar metadata saved with the model; model, when
+    given, supplies the parameter counts and training the fit_pipeline
+    summary. Retraining the same path updates its entry and bumps version.
+    """
+    fields = {
+        'ticker': metadata.get('ticker', ''),
+        'kind': model_kind(model_path),
+        'status': TrainedModel.STATUS_READY,
+        'trained_at': trained_at or timezone.now(),
+        'trained_from': metadata.get('trained_from'),
+        'trained_through': metadata.get('trained_through'),
+        'mode': metadata.get('mode', ''),
+        'size': os.path.getsize(model_path),
+        'val_loss': metadata.get('val_loss'),
+        'training': training or {},
+        'scaler': metadata.get('scaler'),
+        'encoder_id': metadata.get('encoder_id', ''),
+    }
+    if model is not None:
+        fields['total_params'] = model.count_params()
+        fields['trainable_params'] = sum(layer.count_params() for layer in model.layers if layer.trainable)
+
+    with transaction.atomic():
+        entry = TrainedModel.objects.select_for_update().filter(path=model_path).first()
+        if entry is None:
+            return TrainedModel.objects.create(path=model_path, **fields)
+        for name, value in fields.items():
+            setattr(entry, name, value)
+        entry.version += 1
+        entry.save()
+        return entry
+
+
+def current_model(ticker):
+    """
+    The catalog entry serving ticker: its own model, else its head if it was
+    fitted on the current shared encoder, else None (the default model)
+    """
+    entries = {
+        entry.kind: entry
+        for entry in TrainedModel.objects.filter(
+            ticker=ticker, status=TrainedModel.STATUS_READY,
+            kind__in=[TrainedModel.KIND_MODEL, TrainedModel.KIND_HEAD],
+        ).only('kind', 'path', 'encoder_id')
+    }
+    if TrainedModel.KIND_MODEL in entries:
+        return entries[TrainedModel.KIND_MODEL]
+    head = entries.get(TrainedModel.KIND_HEAD)
+    if head is not None and head.encoder_id and head.encoder_id == current_encoder_id():
+        return head
+    return None
+
+
+def current_encoder_id():
+    return (TrainedModel.objects
+            .filter(kind=TrainedModel.KIND_ENCODER, status=TrainedModel.STATUS_READY)
+            .values_list('encoder_id', flat=True)
+            .first())
+
+
+def sync_directory(directory):
+    """
+    Bring the catalog in line with the model files in directory: register
+    files it doesn't know (e.g. trained before the catalog existed, or
+    copied in by hand) and mark entries whose file is gone as missing.
+    Returns (registered, missing) lists of paths.
+    """
+    known = dict(TrainedModel.objects.filter(path__startswith=directory).values_list('path', 'status'))
+    registered = []
+    for filename in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        if not (filename.endswith(MODEL_SUFFIX) or filename.endswith(HEAD_SUFFIX) or filename == SHARED_ENCODER_FILE):
+            continue
+        model_path = os.path.join(directory, filename)
+        if known.get(model_path) == TrainedModel.STATUS_READY:
+            continue
+        metadata = load_metadata(model_path) or {}
+        if model_kind(model_path) != TrainedModel.KIND_ENCODER:
+            metadata.setdefault('ticker', filename.split(MODEL_SUFFIX)[0].split(HEAD_SUFFIX)[0])
+        mtime = datetime.fromtimestamp(os.path.getmtime(model_path), tz=timezone.get_current_timezone())
+        register_model(model_path, metadata, trained_at=mtime)
+        registered.append(model_path)
+
+    missing = [path for path, status in known.items()
+               if status == TrainedModel.STATUS_READY and not os.path.exists(path)]
+    mark_missing(missing)
+    return registered, missing
+
+
+def mark_missing(paths):
+    """Stop serving and listing entries whose files were deleted"""
+    TrainedModel.objects.filter(path__in=paths).update(status=TrainedModel.STATUS_MISSING)
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from django.conf import settings
+from django.urls import reverse
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from .model_bundle import model_version
+from .timing import stage
+
+CHARTS_DIR = 'charts'
+
+# chart_type -> response field used by the frontend
+CHART_FIELDS = {
+    'closing_price': 'plot_img',
+    'ma100': 'plot_100_dma',
+    'ma200': 'plot_200_dma',
+    'prediction': 'plot_prediction',
+}
+
+# All rendering happens on this single dedicated thread, and each chart uses
+# its own Figure/Agg canvas instead of the global pyplot state machine.
+_render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chart-render')
+
+
+def data_version(df, model_path):
+    """Identify the data a chart was drawn from: last bar, its close and the model files"""
+    last_bar = f'{df.Date.iloc[-1]:%Y-%m-%d}|{float(df.Close.iloc[-1])}|{model_version(model_path)}'
+    return hashlib.sha1(last_bar.encode()).hexdigest()[:12]
+
+
+def publish_charts(ticker, version, close, ma100, ma200, y_test, y_predicted):
+    """
+    Store the series behind the forecast charts without drawing anything.
+
+    Returns (urls, chart_data): lazily rendered PNG URLs keyed by the
+    existing plot_* response fields, and the raw series for clients that
+    draw charts themselves.
+    """
+    series = {
+        'close': np.asarray(close, dtype=float),
+        'ma100': np.asarray(ma100, dtype=float),
+        'ma200': np.asarray(ma200, dtype=float),
+        'original_price': np.asarray(y_test, dtype=float),
+        'predicted_price': np.asarray(y_predicted, dtype=float),
+    }
+    data_path = _data_path(ticker, version)
+    if not os.path.exists(data_path):
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        tmp_path = f'{data_path}.tmp.npz'
+        np.savez(tmp_path, **series)
+        os.replace(tmp_path, data_path)
+        remove_superseded_charts(ticker, version)
+
+    urls = {
+        field: reverse('chart', args=[ticker, version, chart_type])
+        for chart_type, field in CHART_FIELDS.items()
+    }
+    chart_data = {
+        name: [None if np.isnan(value) else float(value) for value in values]
+        for name, values in series.items()
+    }
+    return urls, chart_data
+
+
+def remove_superseded_charts(ticker, version):
+    """
+    Delete the chart directories of ticker other than version that haven't
+    changed for CHART_RETENTION_SECONDS. A directory's mtime moves whenever
+    a chart in it is rendered, so versions still being viewed are kept.
+    """
+    ticker_dir = os.path.dirname(_chart_dir(ticker, version))
+    cutoff = time.time() - settings.CHART_RETENTION_SECONDS
+    for name in os.listdir(ticker_dir):
+        path = os.path.join(ticker_dir, name)
+        try:
+            if name != version and os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path)
+        except FileNotFoundError:
+            # Removed by a concurrent publish
+            pass
+
+
+def get_chart(ticker, version, chart_type):
+    """Return the PNG path for a chart, rendering it on first request"""
+    if chart_type not in CHART_FIELDS or not ticker.strip('.') or not version.isalnum():
+        return None
+    image_path = _image_path(ticker, version, chart_type)
+    if os.path.exists(image_path):
+        return image_path
+    if not os.path.exists(_data_path(ticker, version)):
+        return None
+    with stage('charts.render'):
+        return _render_executor.submit(_render, ticker, version, chart_type).result()
+
+
+def _render(ticker, version, chart_type):
+    image_path = _image_path(ticker, version, chart_type)
+    if os.path.exists(image_path):
+        # Rendered by an earlier queued request
+        return image_path
+
+    try:
+        with np.load(_data_path(ticker, version)) as data:
+            series = {name: data[name] for name in data.files}
+    except FileNotFoundError:
+        # Superseded and removed since get_chart checked for it
+        return None
+
+    fig = Figure(figsize=(12, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if chart_type == 'prediction':
+        ax.plot(series['original_price'], 'b', label='Original Price')
+        ax.plot(series['predicted_price'], 'r', label='Predicted Price')
+        ax.set_title(f'Final Prediction for {ticker}')
+    else:
+        ax.plot(series['close'], label='Closing Price')
+        if chart_type == 'closing_price':
+            ax.set_title(f'Closing price of {ticker}')
+        if chart_type in ('ma100', 'ma200'):
+            ax.plot(series['ma100'], 'r', label='100 DMA')
+            ax.set_title(f'100 Days Moving Average of {ticker}')
+        if chart_type == 'ma200':
+            ax.plot(series['ma200'], 'g', label='200 DMA')
+            ax.set_title(f'200 Days Moving Average of {ticker}')
+    ax.set_xlabel('Days')
+    ax.set_ylabel('Price')
+    ax.legend()
+
+    tmp_path = f'{image_path}.tmp.png'
+    fig.savefig(tmp_path)
+    os.replace(tmp_path, image_path)
+    return image_path
+
+
+def _chart_dir(ticker, version):
+    return os.path.join(settings.MEDIA_ROOT, CHARTS_DIR, ticker, version)
+
+
+def _data_path(ticker, version):
+    return os.path.join(_chart_dir(ticker, version), 'series.npz')
+
+
+def _image_path(ticker, version, chart_type):
+    return os.path.join(_chart_dir(ticker, version), f'{chart_type}.png')
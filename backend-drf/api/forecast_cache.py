@@ -0,0 +1,75 @@
+import hashlib
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+# Fixed pool of in-process locks; keys are striped across it
+_local_locks = [threading.Lock() for _ in range(64)]
+
+
+def forecast_cache_key(ticker, model_path, version, *parts):
+    """
+    Key a forecast result by ticker, model file, data version and any extra
+    request parameters (e.g. investment_amount).
+
+    version is charts.data_version(), which already covers the last bar
+    and the model and metadata mtimes. The per-ticker generation lets training
+    invalidate every cached result for a ticker at once.
+    """
+    generation = cache.get(_generation_key(ticker), 0)
+    digest = hashlib.sha1('|'.join(map(str, (model_path, version, *parts))).encode()).hexdigest()
+    return f'forecast:{ticker}:{generation}:{digest}'
+
+
+def invalidate_forecasts(ticker):
+    """Drop all cached forecast results for ticker"""
+    key = _generation_key(ticker)
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr
+        cache.set(key, 1, timeout=None)
+
+
+def get_or_compute(key, compute):
+    """
+    Return the cached value for key, computing it at most once at a time.
+
+    Concurrent misses in this process queue on a local lock; misses in
+    other processes wait on a cache-level lock and pick up the result the
+    first caller stores. If that caller dies, the waiter computes itself.
+    """
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    with _local_locks[hash(key) % len(_local_locks)]:
+        result = cache.get(key)
+        if result is not None:
+            return result
+
+        lock_key = f'{key}:lock'
+        lock_timeout = settings.FORECAST_CACHE_LOCK_TIMEOUT
+        if not cache.add(lock_key, 1, timeout=lock_timeout):
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.1)
+                result = cache.get(key)
+                if result is not None:
+                    return result
+                if cache.get(lock_key) is None:
+                    break
+            cache.add(lock_key, 1, timeout=lock_timeout)
+
+        try:
+            result = compute()
+            cache.set(key, result, timeout=settings.FORECAST_CACHE_TIMEOUT)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+
+def _generation_key(ticker):
+    return f'forecast:generation:{ticker}'
@@ -0,0 +1,358 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.preprocessing import MinMaxScaler
+from .backtest import TRANSACTION_COST, SLIPPAGE, run_backtest
+from .charts import data_version, publish_charts
+from .model_registry import get_bundle, get_model_path, get_model_info
+from .forecast_cache import forecast_cache_key, get_or_compute
+from .indicators import moving_average
+from .price_store import get_history, get_histories
+from .timing import stage, timed
+from .windowing import LOOKBACK, make_windows
+
+HISTORY_YEARS = 10
+
+
+class InsufficientHistory(ValueError):
+    """Raised when a ticker has too few bars for the requested forecast"""
+
+
+def history_range(years=HISTORY_YEARS):
+    """Return the (start, end) dates of the price history used for forecasts"""
+    now = datetime.now()
+    return datetime(now.year - years, now.month, now.day), now
+
+
+def check_history(df, mode='full', lookback=LOOKBACK):
+    """
+    Raise InsufficientHistory unless df has enough bars to forecast.
+
+    The next-day mode needs one full lookback window. The full forecast
+    evaluates on the last 30% of df, which has to be longer than the
+    lookback so the test period starts after the training period.
+    """
+    if mode == 'next_day':
+        enough = len(df) >= lookback
+    else:
+        enough = len(df) - int(len(df) * 0.7) > lookback
+    if not enough:
+        raise InsufficientHistory('Not enough price history for a prediction.')
+
+
+@timed('forecast.prepare')
+def prepare_test_data(df, bundle=None):
+    """
+    Split, scale and window the closing prices for evaluation.
+
+    The first 70% of df is the training period; the remaining 30% (plus the
+    lookback days before it) is scaled and turned into test windows. When
+    the bundle carries the scaler stored at training time it is applied
+    as-is; otherwise one is fitted on the test data. Returns
+    (x_test, y_test, scaler, training_len) with y_test still scaled.
+    """
+    lookback = bundle.lookback if bundle is not None else LOOKBACK
+    final_df, training_len = _test_frame(df, lookback)
+    scaler = _test_scaler(final_df, bundle)
+    x_test, y_test = make_windows(scaler.transform(final_df.to_numpy()), lookback)
+    return x_test, y_test, scaler, training_len
+
+
+@timed('forecast.prepare')
+def prepare_next_day_window(df, bundle):
+    """
+    Scale the latest lookback closes into a single window that predicts the
+    next, not yet known, bar. Uses the same scaler as prepare_test_data.
+    Returns (x, scaler) with x of shape (1, lookback, 1).
+    """
+    final_df, _ = _test_frame(df, bundle.lookback)
+    scaler = _test_scaler(final_df, bundle)
+    latest = scaler.transform(df[['Close']].to_numpy()[-bundle.lookback:])
+    return latest.reshape(1, bundle.lookback, 1), scaler
+
+
+def _unscale(scaler, y):
+    return scaler.inverse_transform(y.reshape(-1, 1)).flatten()
+
+
+def _test_frame(df, lookback):
+    # Splitting data into Training & Testing datasets
+    data_training = pd.DataFrame(df.Close[0:int(len(df) * 0.7)])
+    data_testing = pd.DataFrame(df.Close[int(len(df) * 0.7): int(len(df))])
+
+    # Preparing Test Data
+    past_days = data_training.tail(lookback)
+    final_df = pd.concat([past_days, data_testing], ignore_index=True)
+    return final_df, len(data_training)
+
+
+def _test_scaler(final_df, bundle):
+    if bundle is not None and bundle.scaler is not None:
+        return bundle.scaler
+    # Scaling down the data between 0 and 1
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaler.fit(final_df.to_numpy())
+    return scaler
+
+
+def build_forecast(ticker, df, model_path, scaler, y_test, y_predicted, investment_amount, training_len,
+                   lookback=LOOKBACK):
+    """
+    Turn raw model output into the forecast response: evaluation metrics,
+    the simulated trading strategy, recommendations and chart links.
+    """
+    # Revert the scaled prices to original price
+    y_predicted = _unscale(scaler, y_predicted)
+    y_test = _unscale(scaler, y_test)
+
+    chart_urls, chart_data = forecast_charts(ticker, df, model_path, y_test, y_predicted)
+    return {
+        'ticker': ticker,
+        **chart_urls,
+        'chart_data': chart_data,
+        **forecast_metrics(df, y_test, y_predicted, investment_amount, training_len, lookback),
+    }
+
+
+def predict_test_period(df, model_path):
+    """
+    Run the model over the test period. Returns (y_test, y_predicted,
+    training_len, lookback) with the series in prices.
+    """
+    # Load ML Model with the scaler it was trained with
+    bundle = get_bundle(model_path)
+    x_test, y_test, scaler, training_len = prepare_test_data(df, bundle)
+
+    # Making Predictions
+    with stage('forecast.predict'):
+        y_predicted = bundle.predict(x_test)
+    return _unscale(scaler, y_test), _unscale(scaler, y_predicted), training_len, bundle.lookback
+
+
+@timed('forecast.charts')
+def forecast_charts(ticker, df, model_path, y_test, y_predicted):
+    """Publish the forecast chart series; returns (chart_urls, chart_data)"""
+    # Charts are rendered lazily by ChartAPIView
+    ma100 = moving_average(df, 100)
+    ma200 = moving_average(df, 200)
+    version = data_version(df, model_path)
+    return publish_charts(ticker, version, df.Close, ma100, ma200, y_test, y_predicted)
+
+
+def forecast_metrics(df, y_test, y_predicted, investment_amount, training_len, lookback=LOOKBACK):
+    """Evaluation metrics, simulated trading strategy and recommendations for unscaled predictions"""
+    # Get current and predicted prices for recommendations
+    current_price = df.Close.iloc[-1]
+    predicted_future_price = y_predicted[-1]
+
+    # Buy/Sell signals and simulated trades with realistic costs
+    transaction_cost = TRANSACTION_COST
+    slippage = SLIPPAGE
+    with stage('forecast.backtest'):
+        backtest = run_backtest(y_predicted, investment_amount, transaction_cost, slippage)
+    trades = backtest['trades']
+    total_profit = backtest['total_profit']
+    total_fees = backtest['total_fees']
+    current_cash = backtest['final_value']
+
+    # Model Evaluation
+    with stage('forecast.evaluate'):
+        mse = mean_squared_error(y_test, y_predicted)
+        rmse = np.sqrt(mse)
+        r2 = r2_score(y_test, y_predicted)
+
+    # Calculate timeframe and add strategy details
+    test_period_days = len(y_test)
+    test_start_date = df.Date.iloc[training_len + lookback]  # Start of test period
+    test_end_date = df.Date.iloc[-1]  # End of test period
+
+    return {
+        'model_performance': {
+            'mse': mse,
+            'rmse': rmse,
+            'r2': r2
+        },
+        'trading_strategy': {
+            'investment_amount': investment_amount,
+            'current_price': float(current_price),
+            'strategy_explanation': {
+                'method': 'ML Forecast-Based Trading',
+                'description': 'Buy when model predicts price will go UP tomorrow, sell when it predicts price will go DOWN tomorrow',
+                'based_on': 'LSTM neural network predictions trained on historical price patterns',
+                'timeframe': f'{test_period_days} trading days',
+                'period': f'From {test_start_date.strftime("%Y-%m-%d")} to {test_end_date.strftime("%Y-%m-%d")}',
+                'trades_per_day': f'{len(trades) / test_period_days:.1f} average'
+            },
+            'buy_signals': backtest['buy_signals'],
+            'sell_signals': backtest['sell_signals'],
+            'trades': trades,
+            'total_trades': len(trades),
+            'gross_trading_profit': float(total_profit + total_fees),
+            'total_fees': float(total_fees),
+            'net_trading_profit': float(total_profit),
+            'final_portfolio_value': float(current_cash),
+            'trading_return_percentage': float(((current_cash - investment_amount) / investment_amount) * 100),
+            'trading_costs': {
+                'transaction_cost_rate': f'{transaction_cost * 100}%',
+                'slippage_rate': f'{slippage * 100}%',
+                'total_fees_paid': float(total_fees)
+            }
+        },
+        'recommendations': {
+            'current_action': 'BUY' if predicted_future_price > current_price else 'SELL',
+            'confidence': f'{abs((predicted_future_price - current_price) / current_price * 100):.2f}%',
+            'next_target_price': float(predicted_future_price)
+        },
+        'disclaimer': 'This is not financial advice. Past performance does not guarantee future results.'
+    }
+
+
+def run_forecast(ticker, df, model_path, investment_amount, on_metrics=None):
+    """
+    Run the full single-ticker forecast on a reset-index history frame.
+    Raises InsufficientHistory for tickers with too few bars.
+
+    on_metrics, if given, is called with everything but the chart fields
+    as soon as inference is done, before the charts are published.
+    """
+    check_history(df)
+    y_test, y_predicted, training_len, lookback = predict_test_period(df, model_path)
+    summary = {'status': 'success', 'model_info': get_model_info(ticker), 'ticker': ticker}
+    metrics = forecast_metrics(df, y_test, y_predicted, investment_amount, training_len, lookback)
+    if on_metrics is not None:
+        on_metrics({**summary, **metrics})
+    chart_urls, chart_data = forecast_charts(ticker, df, model_path, y_test, y_predicted)
+    return {
+        **summary,
+        **chart_urls,
+        'chart_data': chart_data,
+        **metrics,
+    }
+
+
+def run_next_day_forecast(ticker, df, model_path):
+    """
+    Predict only the next bar from the latest lookback bars.
+
+    Skips the test-period evaluation, backtest and charts, so a warm model
+    answers with a single one-window forward pass.
+    """
+    check_history(df, 'next_day')
+    bundle = get_bundle(model_path)
+    x, scaler = prepare_next_day_window(df, bundle)
+    with stage('forecast.predict'):
+        y = bundle.predict(x)
+    next_price = float(scaler.inverse_transform(y.reshape(-1, 1))[0, 0])
+    current_price = float(df.Close.iloc[-1])
+
+    return {
+        'status': 'success',
+        'mode': 'next_day',
+        'ticker': ticker,
+        'model_info': get_model_info(ticker),
+        'as_of': df.Date.iloc[-1].strftime('%Y-%m-%d'),
+        'current_price': current_price,
+        'recommendations': {
+            'current_action': 'BUY' if next_price > current_price else 'SELL',
+            'confidence': f'{abs((next_price - current_price) / current_price * 100):.2f}%',
+            'next_target_price': next_price
+        },
+        'disclaimer': 'This is not financial advice. Past performance does not guarantee future results.'
+    }
+
+
+def get_predictions(ticker):
+    """
+    Return the predicted prices over the test period for ticker.
+
+    Shares the forecast result cache, so repeated backtests of the same
+    ticker reuse one predict call until a new bar or model arrives.
+    """
+    start, end = history_range()
+    df = get_history(ticker, start, end)
+    if df.empty:
+        raise ValueError('No data found for the given ticker.')
+    df = df.reset_index()
+    model_path = get_model_path(ticker)
+
+    def predict():
+        bundle = get_bundle(model_path)
+        x_test, _, scaler, _ = prepare_test_data(df, bundle)
+        y_predicted = bundle.predict(x_test)
+        return scaler.inverse_transform(y_predicted.reshape(-1, 1)).flatten()
+
+    cache_key = forecast_cache_key(ticker, model_path, data_version(df, model_path), 'predictions')
+    return get_or_compute(cache_key, predict)
+
+
+def iter_batch_forecasts(tickers, investment_amount, include_chart_data=False):
+    """
+    Yield a forecast result per ticker, then a summary.
+
+    History for all tickers comes from one bulk price store call, and
+    tickers that share a model file (typically the default model) are
+    stacked into a single predict call. A failure only produces an error
+    entry for the affected tickers; the rest of the batch still completes.
+    """
+    failed = 0
+
+    def error(ticker, message):
+        nonlocal failed
+        failed += 1
+        return {'ticker': ticker, 'status': 'error', 'error': message}
+
+    start, end = history_range()
+    try:
+        histories = get_histories(tickers, start, end)
+    except Exception as e:
+        histories = {}
+        for ticker in tickers:
+            yield error(ticker, f'Failed to fetch price history: {e}')
+
+    # Prepare test windows and group tickers by the model they use
+    groups = {}
+    for ticker, df in histories.items():
+        if df.empty:
+            yield error(ticker, 'No data found for the given ticker.')
+            continue
+        try:
+            df = df.reset_index()
+            check_history(df)
+            model_path = get_model_path(ticker)
+            bundle = get_bundle(model_path)
+            x_test, y_test, scaler, training_len = prepare_test_data(df, bundle)
+            groups.setdefault(model_path, []).append(
+                (ticker, df, x_test, y_test, scaler, training_len, bundle.lookback)
+            )
+        except Exception as e:
+            yield error(ticker, str(e))
+
+    for model_path, members in groups.items():
+        try:
+            x_batch = np.concatenate([member[2] for member in members])
+            y_batch = get_bundle(model_path).predict(x_batch)
+        except Exception as e:
+            for member in members:
+                yield error(member[0], str(e))
+            continue
+
+        offsets = np.cumsum([len(member[2]) for member in members])[:-1]
+        for member, y_predicted in zip(members, np.split(y_batch, offsets)):
+            ticker, df, _, y_test, scaler, training_len, lookback = member
+            try:
+                result = build_forecast(ticker, df, model_path, scaler, y_test, y_predicted,
+                                        investment_amount, training_len, lookback)
+            except Exception as e:
+                yield error(ticker, str(e))
+                continue
+            if not include_chart_data:
+                result.pop('chart_data')
+            yield {'status': 'success', 'model_info': get_model_info(ticker), **result}
+
+    yield {
+        'status': 'complete',
+        'total': len(tickers),
+        'succeeded': len(tickers) - failed,
+        'failed': failed,
+    }
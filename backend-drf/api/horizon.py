@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from .forecasting import history_range, prepare_next_day_window, prepare_test_data
+from .model_registry import get_bundle, get_model_path, get_model_info
+from .price_store import get_histories
+
+# Recent test windows used to estimate a model's one-step error for Monte Carlo paths
+RESIDUAL_WINDOWS = 250
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def rollout(predict, windows, horizon, noise_scale=None, rng=None):
+    """
+    Recursively forecast horizon steps for a batch of scaled windows.
+
+    windows has shape (n, lookback). Each step runs one predict call for
+    the whole batch, appends the predictions (plus Gaussian noise with
+    per-row noise_scale, if given) and drops the oldest bar. Returns the
+    (n, horizon) scaled predictions.
+    """
+    windows = np.array(windows, dtype=np.float32)
+    steps = np.empty((len(windows), horizon), dtype=np.float32)
+    for step in range(horizon):
+        y = predict(windows[..., None]).reshape(-1)
+        if noise_scale is not None:
+            y = y + rng.standard_normal(len(y)) * noise_scale
+        steps[:, step] = y
+        windows = np.concatenate([windows[:, 1:], y[:, None]], axis=1)
+    return steps
+
+
+def horizon_forecasts(tickers, horizon, paths=0, seed=None):
+    """
+    N-day recursive forecasts for several tickers.
+
+    Tickers sharing a model advance together, so each model runs one
+    predict call per step regardless of the number of tickers. With paths
+    > 0, every ticker also gets that many Monte Carlo paths whose steps are
+    perturbed by the model's recent one-step error; they ride along in the
+    same predict calls. Returns {ticker: result}.
+    """
+    rng = np.random.default_rng(seed)
+    results = {}
+
+    start, end = history_range()
+    histories = get_histories(tickers, start, end)
+
+    groups = {}
+    for ticker in tickers:
+        df = histories.get(ticker)
+        if df is None or df.empty:
+            results[ticker] = {'ticker': ticker, 'status': 'error', 'error': 'No data found for the given ticker.'}
+            continue
+        try:
+            df = df.reset_index()
+            model_path = get_model_path(ticker)
+            bundle = get_bundle(model_path)
+            if len(df) < bundle.lookback:
+                raise ValueError('Not enough price history for a prediction.')
+            window, scaler = prepare_next_day_window(df, bundle)
+            groups.setdefault(model_path, []).append((ticker, df, window[0, :, 0], scaler))
+        except Exception as e:
+            results[ticker] = {'ticker': ticker, 'status': 'error', 'error': str(e)}
+
+    for model_path, members in groups.items():
+        try:
+            bundle = get_bundle(model_path)
+            windows = [member[2] for member in members]
+            noise_scale = None
+            if paths:
+                # One row per ticker for the central path, then paths rows per ticker
+                sigma = _residual_scales(bundle, [member[1] for member in members])
+                windows = windows + [window for window in windows for _ in range(paths)]
+                noise_scale = np.concatenate([np.zeros(len(members)), np.repeat(sigma, paths)])
+            steps = rollout(bundle.predict, windows, horizon, noise_scale, rng)
+        except Exception as e:
+            for member in members:
+                results[member[0]] = {'ticker': member[0], 'status': 'error', 'error': str(e)}
+            continue
+
+        for i, (ticker, df, _, scaler) in enumerate(members):
+            simulated = None
+            if paths:
+                block = steps[len(members) + i * paths: len(members) + (i + 1) * paths]
+                simulated = scaler.inverse_transform(block.reshape(-1, 1)).reshape(block.shape)
+            central = scaler.inverse_transform(steps[i].reshape(-1, 1)).flatten()
+            results[ticker] = _horizon_result(ticker, df, central, simulated)
+
+    return results
+
+
+def _residual_scales(bundle, frames):
+    """Std of the one-step error (in scaled units) over each frame's recent test windows"""
+    xs, ys = [], []
+    for df in frames:
+        x_test, y_test, _, _ = prepare_test_data(df, bundle)
+        xs.append(x_test[-RESIDUAL_WINDOWS:])
+        ys.append(y_test[-RESIDUAL_WINDOWS:])
+    predicted = bundle.predict(np.concatenate(xs)).reshape(-1)
+    offsets = np.cumsum([len(y) for y in ys])[:-1]
+    return np.array([
+        float(np.std(y - p)) for y, p in zip(ys, np.split(predicted, offsets))
+    ])
+
+
+def _horizon_result(ticker, df, central, simulated):
+    current_price = float(df.Close.iloc[-1])
+    last_date = df.Date.iloc[-1]
+    dates = pd.bdate_range(last_date + pd.offsets.BDay(1), periods=len(central))
+    final_price = float(central[-1])
+
+    forecast = {
+        'days': len(central),
+        'dates': [date.strftime('%Y-%m-%d') for date in dates],
+        'predicted_price': [float(price) for price in central],
+        'final_price': final_price,
+        'expected_return_percentage': (final_price - current_price) / current_price * 100,
+    }
+    if simulated is not None:
+        forecast['paths'] = len(simulated)
+        forecast['percentiles'] = {
+            f'p{q}': [float(price) for price in np.percentile(simulated, q, axis=0)]
+            for q in PERCENTILES
+        }
+        forecast['probability_up'] = float(np.mean(simulated[:, -1] > current_price))
+
+    return {
+        'ticker': ticker,
+        'status': 'success',
+        'model_info': get_model_info(ticker),
+        'as_of': last_date.strftime('%Y-%m-%d'),
+        'current_price': current_price,
+        'horizon_forecast': forecast,
+        'recommendations': {
+            'current_action': 'BUY' if final_price > current_price else 'SELL',
+            'confidence': f'{abs((final_price - current_price) / current_price * 100):.2f}%',
+            'next_target_price': float(central[0])
+        },
+        'disclaimer': 'This is not financial advice. Past performance does not guarantee future results.'
+    }
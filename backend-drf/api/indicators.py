@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+SMA_WINDOWS = (20, 50, 100, 200)
+EMA_SPANS = (12, 26)
+RSI_PERIOD = 14
+VOLATILITY_WINDOW = 20
+TRADING_DAYS = 252
+
+# Public series, in the order the indicators endpoint returns them
+INDICATORS = (
+    [f'sma{window}' for window in SMA_WINDOWS]
+    + [f'ema{span}' for span in EMA_SPANS]
+    + [f'rsi{RSI_PERIOD}', f'volatility{VOLATILITY_WINDOW}']
+)
+# Wilder averages carried between updates so RSI can continue from the last bar
+RSI_STATE = [f'rsi{RSI_PERIOD}_avg_gain', f'rsi{RSI_PERIOD}_avg_loss']
+INDICATOR_COLUMNS = INDICATORS + RSI_STATE
+
+# Bars before the first updated row that the rolling windows need
+WARMUP = max(max(SMA_WINDOWS), VOLATILITY_WINDOW + 1)
+
+
+def has_indicators(df):
+    return set(INDICATOR_COLUMNS) <= set(df.columns)
+
+
+def update_indicators(df, start=0):
+    """
+    Return df with indicator columns filled from row position start on.
+
+    Rows before start keep their stored values. Rolling indicators only
+    read the WARMUP bars before start, and EMA/RSI continue from the
+    values stored at start - 1, so appending k bars costs O(k) rather than
+    a pass over the whole history.
+    """
+    df = df.copy()
+    if not has_indicators(df):
+        start = 0
+        for column in INDICATOR_COLUMNS:
+            df[column] = np.nan
+    if start >= len(df):
+        return df
+
+    close = df['Close'].to_numpy(dtype=float)
+    window_start = max(start - WARMUP, 0)
+    window = pd.Series(close[window_start:])
+    rows = slice(start - window_start, None)
+    updates = {}
+
+    for size in SMA_WINDOWS:
+        updates[f'sma{size}'] = window.rolling(size).mean().to_numpy()[rows]
+
+    log_returns = np.log(window).diff()
+    volatility = log_returns.rolling(VOLATILITY_WINDOW).std() * np.sqrt(TRADING_DAYS)
+    updates[f'volatility{VOLATILITY_WINDOW}'] = volatility.to_numpy()[rows]
+
+    for span in EMA_SPANS:
+        updates[f'ema{span}'] = _ewm(close[start:], 2 / (span + 1), _previous(df, f'ema{span}', start))
+
+    # Wilder's RSI: smoothed average gain / loss of the daily changes
+    changes = np.diff(close[max(start - 1, 0):])
+    if start == 0:
+        changes = np.concatenate([[np.nan], changes])
+    avg_gain = _ewm(np.clip(changes, 0, None), 1 / RSI_PERIOD, _previous(df, RSI_STATE[0], start))
+    avg_loss = _ewm(np.clip(-changes, 0, None), 1 / RSI_PERIOD, _previous(df, RSI_STATE[1], start))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+    # Not meaningful until a full period of changes has been seen
+    rsi[np.arange(start, len(df)) < RSI_PERIOD] = np.nan
+    updates[RSI_STATE[0]] = avg_gain
+    updates[RSI_STATE[1]] = avg_loss
+    updates[f'rsi{RSI_PERIOD}'] = rsi
+
+    positions = np.arange(start, len(df))
+    for column, values in updates.items():
+        df.iloc[positions, df.columns.get_loc(column)] = values
+    return df
+
+
+def moving_average(df, window):
+    """Stored SMA series for window, computed on the fly if df predates the indicator columns"""
+    column = f'sma{window}'
+    if column in df.columns:
+        return df[column]
+    return df.Close.rolling(window).mean()
+
+
+def _previous(df, column, start):
+    if start == 0:
+        return None
+    value = df[column].iloc[start - 1]
+    return None if pd.isna(value) else float(value)
+
+
+def _ewm(values, alpha, previous):
+    """Exponential moving average of values, continuing from previous when given"""
+    if len(values) == 0:
+        return np.array([], dtype=float)
+    series = pd.Series(values, dtype=float)
+    if previous is None:
+        return series.ewm(alpha=alpha, adjust=False, ignore_na=True).mean().to_numpy()
+    seeded = pd.concat([pd.Series([previous]), series], ignore_index=True)
+    return seeded.ewm(alpha=alpha, adjust=False, ignore_na=True).mean().to_numpy()[1:]
@@ -0,0 +1,115 @@
+import threading
+import numpy as np
+import tensorflow as tf
+import keras
+from django.conf import settings
+
+# Windows per forward pass when several tickers share one predict call
+PREDICT_CHUNK_SIZE = 1024
+
+
+class KerasPredictor:
+    """model.predict, with Keras' data adapters and callbacks"""
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, x):
+        if len(x) == 0:
+            return np.zeros((0, 1), dtype=np.float32)
+        return self.model.predict(x, batch_size=PREDICT_CHUNK_SIZE, verbose=0)
+
+
+class FunctionPredictor:
+    """
+    The model's forward pass traced once as a tf.function.
+
+    The input signature fixes everything but the batch dimension, so
+    requests of any size reuse a single graph without retracing.
+    """
+
+    def __init__(self, model):
+        self.forward = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32)],
+        )
+
+    def predict(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        return np.concatenate([
+            self.forward(x[start:start + PREDICT_CHUNK_SIZE]).numpy()
+            for start in range(0, max(len(x), 1), PREDICT_CHUNK_SIZE)
+        ])
+
+
+class TFLitePredictor:
+    """
+    The model converted to TFLite flatbuffers and run by the interpreter.
+
+    The LSTM layers only convert with a static batch size, so inputs run in
+    fixed-size chunks. A second batch-of-one interpreter handles small
+    remainders (e.g. a single next-day window) that would otherwise be
+    mostly padding. Interpreters are not thread-safe, so calls are serialized.
+    """
+
+    def __init__(self, model, batch_size=None):
+        self.batch_size = batch_size or settings.INFERENCE_TFLITE_BATCH_SIZE
+        self.chunk = _TFLiteRunner(model, self.batch_size)
+        self.single = _TFLiteRunner(model, 1) if self.batch_size > 1 else self.chunk
+        self._lock = threading.Lock()
+
+    def predict(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        full = len(x) - len(x) % self.batch_size
+        remainder = x[full:]
+        outputs = []
+        with self._lock:
+            for start in range(0, full, self.batch_size):
+                outputs.append(self.chunk.run(x[start:start + self.batch_size]))
+            if len(remainder) * 2 > self.batch_size:
+                padded = np.zeros((self.batch_size,) + x.shape[1:], dtype=np.float32)
+                padded[:len(remainder)] = remainder
+                outputs.append(self.chunk.run(padded)[:len(remainder)])
+            else:
+                outputs.extend(self.single.run(window[None]) for window in remainder)
+        if not outputs:
+            return np.zeros((0, 1), dtype=np.float32)
+        return np.concatenate(outputs)
+
+
+class _TFLiteRunner:
+    """One interpreter for a fixed batch size"""
+
+    def __init__(self, model, batch_size):
+        inputs = keras.Input(batch_shape=(batch_size,) + tuple(model.input_shape[1:]))
+        converter = tf.lite.TFLiteConverter.from_keras_model(keras.Model(inputs, model(inputs)))
+        self.interpreter = _interpreter_class()(model_content=converter.convert())
+        self.interpreter.allocate_tensors()
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+
+    def run(self, x):
+        self.interpreter.set_tensor(self.input_index, x)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index).copy()
+
+
+PREDICTORS = {
+    'keras': KerasPredictor,
+    'function': FunctionPredictor,
+    'tflite': TFLitePredictor,
+}
+
+
+def make_predictor(model, backend=None):
+    """Wrap model in the inference backend named by settings.INFERENCE_BACKEND"""
+    return PREDICTORS[backend or settings.INFERENCE_BACKEND](model)
+
+
+def _interpreter_class():
+    # tf.lite.Interpreter is deprecated in favour of the LiteRT package
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
@@ -0,0 +1,43 @@
+import threading
+from asgiref.sync import markcoroutinefunction
+from django.utils.module_loading import import_string
+from .timing import stage
+
+VIEWS_MODULE = 'api.views'
+
+
+def lazy_view(name, is_async=False, **initkwargs):
+    """
+    URL callback for api.views.<name> that imports the view on first request.
+
+    api.views pulls in TensorFlow, Keras, sklearn and matplotlib through the
+    forecasting and training modules. Referencing the views this way keeps
+    that stack out of URLconf loading, so auth routes (token/, register/)
+    start without it, e.g. on a Lambda cold start. is_async must match the
+    view, since Django picks sync or async dispatch before the view exists.
+    """
+    view = None
+    lock = threading.Lock()
+
+    def get_view():
+        nonlocal view
+        if view is None:
+            with lock:
+                if view is None:
+                    with stage('views.import'):
+                        view = import_string(f'{VIEWS_MODULE}.{name}').as_view(**initkwargs)
+        return view
+
+    if is_async:
+        async def callback(request, *args, **kwargs):
+            return await get_view()(request, *args, **kwargs)
+        markcoroutinefunction(callback)
+    else:
+        def callback(request, *args, **kwargs):
+            return get_view()(request, *args, **kwargs)
+
+    callback.__name__ = name
+    # CsrfViewMiddleware looks at the callback before the view is imported;
+    # every view in api.views is exempt (DRF APIViews, and the stream view explicitly)
+    callback.csrf_exempt = True
+    return callback
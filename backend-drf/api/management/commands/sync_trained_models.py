@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from api.catalog import sync_directory
+from api.model_registry import TRAINED_MODELS_DIR
+
+
+class Command(BaseCommand):
+    help = (
+        'Register model files in trained_models/ that the catalog does not know about '
+        '(e.g. trained before it existed) and mark entries whose file is gone as missing.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', default=TRAINED_MODELS_DIR)
+
+    def handle(self, *args, **options):
+        registered, missing = sync_directory(options['directory'])
+        for path in registered:
+            self.stdout.write(f'registered {path}')
+        for path in missing:
+            self.stdout.write(f'missing {path}')
+        self.stdout.write(self.style.SUCCESS(f'{len(registered)} registered, {len(missing)} marked missing'))
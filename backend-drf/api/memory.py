@@ -0,0 +1,38 @@
+# cgroup files describing the container memory limit and usage (v2, then v1)
+CGROUP_FILES = (
+    ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),
+    ('/sys/fs/cgroup/memory/memory.limit_in_bytes', '/sys/fs/cgroup/memory/memory.usage_in_bytes'),
+)
+
+
+def available_memory():
+    """
+    Bytes of memory still available to this process, or None if unknown.
+
+    Inside a container the cgroup limit is what the OOM killer enforces,
+    so it takes precedence over the host-wide MemAvailable when lower.
+    """
+    candidates = []
+    for limit_path, usage_path in CGROUP_FILES:
+        try:
+            with open(limit_path) as f:
+                limit = f.read().strip()
+            with open(usage_path) as f:
+                usage = int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+        # 'max' (v2) or a huge sentinel (v1) means no limit
+        if limit.isdigit() and int(limit) < 1 << 60:
+            candidates.append(max(int(limit) - usage, 0))
+        break
+
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    candidates.append(int(line.split()[1]) * 1024)
+                    break
+    except OSError:
+        pass
+
+    return min(candidates) if candidates else None
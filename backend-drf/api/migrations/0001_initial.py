@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 05:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainedModel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(blank=True, max_length=20)),
+                ('kind', models.CharField(choices=[('model', 'Per-ticker model'), ('head', 'Per-ticker head on the shared encoder'), ('encoder', 'Shared encoder')], default='model', max_length=10)),
+                ('path', models.CharField(max_length=255, unique=True)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('status', models.CharField(choices=[('ready', 'Ready'), ('missing', 'File missing')], default='ready', max_length=10)),
+                ('trained_at', models.DateTimeField()),
+                ('trained_from', models.DateField(blank=True, null=True)),
+                ('trained_through', models.DateField(blank=True, null=True)),
+                ('mode', models.CharField(blank=True, max_length=20)),
+                ('size', models.BigIntegerField(default=0)),
+                ('total_params', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('trainable_params', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('val_loss', models.FloatField(blank=True, null=True)),
+                ('training', models.JSONField(blank=True, default=dict)),
+                ('scaler', models.JSONField(blank=True, null=True)),
+                ('encoder_id', models.CharField(blank=True, max_length=32)),
+            ],
+            options={
+                'ordering': ['-trained_at'],
+                'indexes': [models.Index(fields=['ticker', 'status', 'kind'], name='trained_model_lookup'), models.Index(fields=['status', '-trained_at'], name='trained_model_listing')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+import json
+import os
+from datetime import datetime, timezone
+from django.db import migrations
+
+# As in api.model_registry and api.model_bundle when the catalog was introduced
+TRAINED_MODELS_DIR = 'trained_models'
+MODEL_SUFFIX = '_stock_prediction_model.keras'
+HEAD_SUFFIX = '_stock_prediction_head.keras'
+SHARED_ENCODER_FILE = 'shared_encoder.keras'
+
+
+def register_existing_models(apps, schema_editor):
+    """
+    Catalog the model files trained before the catalog existed, so they
+    keep showing up in /trained-models/. Later files are registered by the
+    training tasks or the sync_trained_models command.
+    """
+    TrainedModel = apps.get_model('api', 'TrainedModel')
+    if not os.path.isdir(TRAINED_MODELS_DIR):
+        return
+    known = set(TrainedModel.objects.values_list('path', flat=True))
+    for filename in sorted(os.listdir(TRAINED_MODELS_DIR)):
+        if filename == SHARED_ENCODER_FILE:
+            kind, ticker = 'encoder', ''
+        elif filename.endswith(HEAD_SUFFIX):
+            kind, ticker = 'head', filename[:-len(HEAD_SUFFIX)]
+        elif filename.endswith(MODEL_SUFFIX):
+            kind, ticker = 'model', filename[:-len(MODEL_SUFFIX)]
+        else:
+            continue
+        model_path = os.path.join(TRAINED_MODELS_DIR, filename)
+        if model_path in known:
+            continue
+
+        metadata = {}
+        meta_path = f'{os.path.splitext(model_path)[0]}.json'
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                metadata = json.load(f)
+        TrainedModel.objects.create(
+            path=model_path,
+            ticker=metadata.get('ticker', ticker),
+            kind=kind,
+            trained_at=datetime.fromtimestamp(os.path.getmtime(model_path), tz=timezone.utc),
+            trained_from=metadata.get('trained_from'),
+            trained_through=metadata.get('trained_through'),
+            mode=metadata.get('mode', ''),
+            size=os.path.getsize(model_path),
+            val_loss=metadata.get('val_loss'),
+            scaler=metadata.get('scaler'),
+            encoder_id=metadata.get('encoder_id', ''),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(register_existing_models, migrations.RunPython.noop),
+    ]
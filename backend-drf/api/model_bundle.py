@@ -0,0 +1,123 @@
+import json
+import os
+import threading
+from sklearn.preprocessing import MinMaxScaler
+from .inference import make_predictor
+from .windowing import LOOKBACK
+
+# Per-ticker heads run on the shared encoder stored in the same directory
+SHARED_ENCODER_FILE = 'shared_encoder.keras'
+HEAD_SUFFIX = '_stock_prediction_head.keras'
+
+
+def metadata_path(model_path):
+    """Sidecar JSON written next to each trained model"""
+    return f'{os.path.splitext(model_path)[0]}.json'
+
+
+def load_metadata(model_path):
+    path = metadata_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _tmp_path(path, extension='.keras'):
+    # Hidden, per-process name in the same directory so os.replace stays atomic;
+    # Keras insists on the .keras extension
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f'.{name}.{os.getpid()}.tmp{extension}')
+
+
+def is_head(model_path):
+    return model_path.endswith(HEAD_SUFFIX)
+
+
+def encoder_path(head_path):
+    """The shared encoder a per-ticker head runs on"""
+    return os.path.join(os.path.dirname(head_path), SHARED_ENCODER_FILE)
+
+
+def model_version(model_path):
+    """
+    (model mtime, metadata mtime) identifying the files a bundle was loaded
+    from; for a head, followed by the same pair for the shared encoder.
+    """
+    meta_path = metadata_path(model_path)
+    meta_mtime_ns = os.stat(meta_path).st_mtime_ns if os.path.exists(meta_path) else None
+    version = (os.stat(model_path).st_mtime_ns, meta_mtime_ns)
+    if is_head(model_path):
+        version += model_version(encoder_path(model_path))
+    return version
+
+
+def make_scaler(data_min, data_max):
+    """Rebuild a fitted MinMaxScaler from stored parameters"""
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaler.fit([[data_min], [data_max]])
+    return scaler
+
+
+def scaler_params(scaler):
+    """Serializable parameters of a fitted single-feature MinMaxScaler"""
+    return {
+        'data_min': float(scaler.data_min_[0]),
+        'data_max': float(scaler.data_max_[0]),
+        'min': float(scaler.min_[0]),
+        'scale': float(scaler.scale_[0]),
+    }
+
+
+def save_bundle(model_path, model, metadata):
+    """
+    Write a trained model and its metadata atomically.
+
+    Both files are written to temporary names first and then renamed into
+    place, so readers see either the old or the new file, never a partial
+    one. The metadata is renamed first and the model last, so a reader only
+    sees the new weights once their scaler is in place; both mtimes are
+    part of model_version(), so the registry drops anything it loaded
+    between the two renames once the model lands.
+    """
+    tmp_model_path = _tmp_path(model_path)
+    meta_path = metadata_path(model_path)
+    tmp_meta_path = _tmp_path(meta_path, '')
+    try:
+        model.save(tmp_model_path)
+        with open(tmp_meta_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_meta_path, meta_path)
+        os.replace(tmp_model_path, model_path)
+    finally:
+        for path in (tmp_model_path, tmp_meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class ModelBundle:
+    """
+    A loaded model together with the preprocessing it was trained with.
+
+    Models trained before metadata was saved (including the shared default
+    model) have no stored scaler; callers then fit one on the data, as the
+    forecast views always used to.
+    """
+
+    def __init__(self, model, metadata=None):
+        self.model = model
+        self.metadata = metadata or {}
+        self.lookback = self.metadata.get('lookback', LOOKBACK)
+        scaler = self.metadata.get('scaler')
+        self.scaler = make_scaler(scaler['data_min'], scaler['data_max']) if scaler else None
+        self._predictor = None
+        self._predictor_lock = threading.Lock()
+
+    def predict(self, x):
+        """Run the model through the inference backend set by INFERENCE_BACKEND"""
+        if self._predictor is None:
+            # Built on first use, so training-only loads never trace or convert
+            with self._predictor_lock:
+                if self._predictor is None:
+                    self._predictor = make_predictor(self.model)
+        return self._predictor.predict(x)
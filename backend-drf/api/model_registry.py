@@ -0,0 +1,234 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from django.conf import settings
+from keras.models import Sequential, load_model
+from .catalog import current_model, mark_missing
+from .model_bundle import (
+    HEAD_SUFFIX, SHARED_ENCODER_FILE, ModelBundle, encoder_path, is_head, load_metadata, model_version,
+)
+from .models import TrainedModel
+from .timing import stage
+
+# Define the trained models directory
+TRAINED_MODELS_DIR = 'trained_models'
+SHARED_ENCODER_PATH = os.path.join(TRAINED_MODELS_DIR, SHARED_ENCODER_FILE)
+
+
+def get_head_path(ticker):
+    return os.path.join(TRAINED_MODELS_DIR, f'{ticker}{HEAD_SUFFIX}')
+
+
+def head_is_current(head_path):
+    """True if head_path exists and was fitted on the current shared encoder"""
+    if not (os.path.exists(head_path) and os.path.exists(SHARED_ENCODER_PATH)):
+        return False
+    encoder_id = (load_metadata(head_path) or {}).get('encoder_id')
+    return encoder_id is not None and encoder_id == (load_metadata(SHARED_ENCODER_PATH) or {}).get('encoder_id')
+
+
+def resolve_model(ticker):
+    """
+    (model path, kind) serving ticker: its own model, else its head on the
+    shared encoder, else the default model (kind None).
+
+    The catalog answers first. Files it doesn't list yet (trained before it
+    existed and not registered by sync_trained_models) are still found on
+    disk, as before, and entries whose files were deleted are marked
+    missing and skipped.
+    """
+    entry = current_model(ticker)
+    if entry is not None:
+        paths = [entry.path]
+        if entry.kind == TrainedModel.KIND_HEAD:
+            paths.append(encoder_path(entry.path))
+        missing = [path for path in paths if not os.path.exists(path)]
+        if not missing:
+            return entry.path, entry.kind
+        mark_missing(missing)
+        return resolve_model(ticker)
+    ticker_model = os.path.join(TRAINED_MODELS_DIR, f'{ticker}_stock_prediction_model.keras')
+    if os.path.exists(ticker_model):
+        return ticker_model, TrainedModel.KIND_MODEL
+    head = get_head_path(ticker)
+    if head_is_current(head):
+        return head, TrainedModel.KIND_HEAD
+    return os.path.join(TRAINED_MODELS_DIR, 'stock_prediction_model.keras'), None
+
+
+def get_model_path(ticker):
+    """Get model path for ticker (see resolve_model)"""
+    return model_registry.resolve(ticker)[0]
+
+
+def get_model_info(ticker):
+    """Get model info for display"""
+    kind = model_registry.resolve(ticker)[1]
+    if kind == TrainedModel.KIND_MODEL:
+        return f"Trained model exists for {ticker}"
+    if kind == TrainedModel.KIND_HEAD:
+        return f"Using the shared base model with a {ticker} head"
+    return f"Trained model doesn't exist for {ticker}, using default trained model"
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded model bundles (model + stored scaler).
+
+    Bundles are keyed by model file path, so every ticker that falls back to
+    the default model shares a single loaded copy. Per-ticker heads are
+    composed with the shared encoder, which is itself loaded only once.
+    Each entry remembers the mtimes of the model and its metadata file and
+    is reloaded when training writes newer ones. Least recently used entries
+    are evicted once either the model count or the approximate memory
+    budget is exceeded.
+
+    Which model serves a ticker (resolve_model) is remembered for
+    lookup_seconds, so forecasts don't query the catalog on every request;
+    a newly trained model is picked up once that expires.
+    """
+
+    # Tickers whose lookups are remembered at once
+    MAX_LOOKUPS = 4096
+
+    def __init__(self, max_models=8, max_bytes=512 * 1024 * 1024, lookup_seconds=30):
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.lookup_seconds = lookup_seconds
+        self._entries = OrderedDict()  # path -> (version, size, bundle)
+        self._lookups = OrderedDict()  # ticker -> (expires, (model path, kind))
+        self._lock = threading.Lock()
+        self._path_locks = {}
+
+    def resolve(self, ticker):
+        """resolve_model(ticker), answered from memory while it is fresh"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._lookups.get(ticker)
+        # A trained model deleted since the lookup is resolved again rather than loaded
+        if cached is not None and cached[0] > now and (cached[1][1] is None or os.path.exists(cached[1][0])):
+            with self._lock:
+                if ticker in self._lookups:
+                    self._lookups.move_to_end(ticker)
+            return cached[1]
+
+        resolved = resolve_model(ticker)
+        with self._lock:
+            self._lookups[ticker] = (now + self.lookup_seconds, resolved)
+            self._lookups.move_to_end(ticker)
+            while len(self._lookups) > self.MAX_LOOKUPS:
+                self._lookups.popitem(last=False)
+        return resolved
+
+    def get_bundle(self, model_path):
+        """Return the loaded ModelBundle for model_path, loading it if needed"""
+        version = model_version(model_path)
+
+        bundle = self._lookup(model_path, version)
+        if bundle is not None:
+            return bundle
+
+        # Only one thread loads a given path; the others wait and reuse it
+        with self._path_lock(model_path):
+            bundle = self._lookup(model_path, version)
+            if bundle is not None:
+                return bundle
+
+            with stage('model.load'):
+                model = load_model(model_path)
+            # Only count weights this entry owns; the shared encoder has its own entry
+            size = sum(weight.nbytes for weight in model.get_weights())
+            if is_head(model_path):
+                model = Sequential([self.get_model(encoder_path(model_path)), model])
+            bundle = ModelBundle(model, load_metadata(model_path))
+            if model_version(model_path) != version:
+                # save_bundle replaced the files mid-load; the pair may not match, so don't keep it
+                return bundle
+            with self._lock:
+                self._entries[model_path] = (version, size, bundle)
+                self._entries.move_to_end(model_path)
+                self._evict()
+            return bundle
+
+    def forget(self, ticker):
+        """Drop the remembered lookup for ticker, e.g. after registering a new model for it"""
+        with self._lock:
+            self._lookups.pop(ticker, None)
+
+    def get_model(self, model_path):
+        """Return just the loaded Keras model for model_path"""
+        return self.get_bundle(model_path).model
+
+    def invalidate(self, model_path=None):
+        """Drop one cached model, or all of them along with the remembered lookups"""
+        with self._lock:
+            if model_path is None:
+                self._entries.clear()
+                self._lookups.clear()
+            else:
+                self._entries.pop(model_path, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'models': list(self._entries.keys()),
+                'count': len(self._entries),
+                'bytes': sum(size for _, size, _ in self._entries.values()),
+            }
+
+    def _lookup(self, model_path, version):
+        with self._lock:
+            entry = self._entries.get(model_path)
+            if entry is None:
+                return None
+            if entry[0] != version:
+                # The file was rewritten (e.g. by train_model_task), reload it
+                del self._entries[model_path]
+                return None
+            self._entries.move_to_end(model_path)
+            return entry[2]
+
+    def _path_lock(self, model_path):
+        with self._lock:
+            return self._path_locks.setdefault(model_path, threading.Lock())
+
+    def _evict(self):
+        # Always keep the most recently loaded model, even if it alone is over budget
+        total = sum(size for _, size, _ in self._entries.values())
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_models or total > self.max_bytes
+        ):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            total -= size
+
+
+model_registry = ModelRegistry(
+    max_models=settings.MODEL_REGISTRY_MAX_MODELS,
+    max_bytes=settings.MODEL_REGISTRY_MAX_BYTES,
+    lookup_seconds=settings.MODEL_LOOKUP_CACHE_SECONDS,
+)
+
+
+def get_model(model_path):
+    """Shortcut for model_registry.get_model"""
+    return model_registry.get_model(model_path)
+
+
+def get_bundle(model_path):
+    """Shortcut for model_registry.get_bundle"""
+    return model_registry.get_bundle(model_path)
+
+
+def preload_models(tickers):
+    """
+    Load the models that serve tickers and run one forward pass on each, so
+    the inference backend is traced before the first request (e.g. during
+    Lambda init). Returns the model paths loaded.
+    """
+    model_paths = list(dict.fromkeys(get_model_path(ticker) for ticker in tickers))
+    for model_path in model_paths:
+        bundle = get_bundle(model_path)
+        bundle.predict(np.zeros((1, bundle.lookback, 1), dtype=np.float32))
+    return model_paths
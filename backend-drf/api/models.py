@@ -1,3 +1,57 @@
 from django.db import models
 
-# Create your models here.
+
+class TrainedModel(models.Model):
+    """
+    Catalog entry for one trained model file.
+
+    Written by the training tasks (and the sync_trained_models command for
+    files trained elsewhere), so listing models and picking the model that
+    serves a ticker are indexed queries instead of directory scans. path is
+    what the model registry loads, wherever the file is stored. version
+    counts the times the file at path was (re)trained.
+    """
+
+    KIND_MODEL = 'model'
+    KIND_HEAD = 'head'
+    KIND_ENCODER = 'encoder'
+    KIND_CHOICES = [
+        (KIND_MODEL, 'Per-ticker model'),
+        (KIND_HEAD, 'Per-ticker head on the shared encoder'),
+        (KIND_ENCODER, 'Shared encoder'),
+    ]
+
+    STATUS_READY = 'ready'
+    STATUS_MISSING = 'missing'
+    STATUS_CHOICES = [
+        (STATUS_READY, 'Ready'),
+        (STATUS_MISSING, 'File missing'),
+    ]
+
+    ticker = models.CharField(max_length=20, blank=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=KIND_MODEL)
+    path = models.CharField(max_length=255, unique=True)
+    version = models.PositiveIntegerField(default=1)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_READY)
+    trained_at = models.DateTimeField()
+    trained_from = models.DateField(null=True, blank=True)
+    trained_through = models.DateField(null=True, blank=True)
+    mode = models.CharField(max_length=20, blank=True)
+    size = models.BigIntegerField(default=0)
+    total_params = models.PositiveBigIntegerField(null=True, blank=True)
+    trainable_params = models.PositiveBigIntegerField(null=True, blank=True)
+    val_loss = models.FloatField(null=True, blank=True)
+    # fit_pipeline summary of the run that produced the file
+    training = models.JSONField(default=dict, blank=True)
+    scaler = models.JSONField(null=True, blank=True)
+    encoder_id = models.CharField(max_length=32, blank=True)
+
+    class Meta:
+        ordering = ['-trained_at']
+        indexes = [
+            models.Index(fields=['ticker', 'status', 'kind'], name='trained_model_lookup'),
+            models.Index(fields=['status', '-trained_at'], name='trained_model_listing'),
+        ]
+
+    def __str__(self):
+        return f'{self.ticker or self.kind} ({self.path}, v{self.version})'
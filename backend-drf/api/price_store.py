@@ -0,0 +1,234 @@
+import os
+import threading
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+import pandas as pd
+from django.conf import settings
+from django.utils.module_loading import import_string
+from .indicators import has_indicators, update_indicators
+from .timing import stage
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def normalize_prices(df):
+    """Flatten a downloaded frame to a Date-indexed OHLCV frame"""
+    if isinstance(df.columns, pd.MultiIndex):
+        # yfinance returns (Price, Ticker) columns even for a single ticker
+        df = df.droplevel('Ticker', axis=1)
+    df = df[[column for column in PRICE_COLUMNS if column in df.columns]].copy()
+    df.index = pd.DatetimeIndex(df.index).tz_localize(None).normalize()
+    df.index.name = 'Date'
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    return df.dropna(subset=['Close'])
+
+
+class BaseFetcher:
+    """Source of daily OHLCV bars for PriceStore"""
+
+    def fetch(self, ticker, start, end):
+        raise NotImplementedError
+
+    def fetch_many(self, tickers, start, end):
+        """Return {ticker: frame}; sources with a bulk API override this"""
+        return {ticker: self.fetch(ticker, start, end) for ticker in tickers}
+
+
+class YFinanceFetcher(BaseFetcher):
+    """Fetch daily bars from Yahoo Finance"""
+
+    def fetch(self, ticker, start, end):
+        import yfinance as yf
+        df = yf.download(ticker, start, end, progress=False)
+        return normalize_prices(df)
+
+    def fetch_many(self, tickers, start, end):
+        import yfinance as yf
+        if len(tickers) == 1:
+            return {tickers[0]: self.fetch(tickers[0], start, end)}
+        # One download for all tickers, columns grouped as (Ticker, Price)
+        df = yf.download(tickers, start, end, group_by='ticker', progress=False)
+        frames = {}
+        for ticker in tickers:
+            if ticker in df.columns.get_level_values(0):
+                frames[ticker] = normalize_prices(df[ticker])
+        return frames
+
+
+class CSVFetcher(BaseFetcher):
+    """
+    Serve daily bars from {directory}/{ticker}.csv files.
+
+    Stand-in for YFinanceFetcher in offline tests and benchmarks, reading
+    the same layout as Resources/TSLA.csv.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or settings.PRICE_CSV_DIR
+        self._frames = {}
+
+    def fetch(self, ticker, start, end):
+        if ticker not in self._frames:
+            csv_path = os.path.join(self.directory, f'{ticker}.csv')
+            if not os.path.exists(csv_path):
+                return pd.DataFrame(columns=PRICE_COLUMNS)
+            df = pd.read_csv(csv_path, parse_dates=['Date'], index_col='Date')
+            self._frames[ticker] = normalize_prices(df)
+        df = self._frames[ticker]
+        return df[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))]
+
+
+class PriceStore:
+    """
+    Local per-ticker price history kept as Parquet files.
+
+    The first request for a ticker downloads the full range; later requests
+    read the stored file and only ask the fetcher for bars after the last
+    stored date. The last stored bar is always re-fetched because it may
+    have been an intraday snapshot. Refreshes happen at most once per
+    refresh_seconds; the file mtime records them so all processes agree.
+    Rolling indicators (api/indicators.py) are stored alongside the prices
+    and only extended over the bars that changed.
+    """
+
+    # Tolerance before a later start date is treated as missing history,
+    # so weekends and holidays at the start of the range don't trigger refetches
+    HEAD_TOLERANCE = timedelta(days=7)
+
+    def __init__(self, directory, fetcher, refresh_seconds=900):
+        self.directory = directory
+        self.fetcher = fetcher
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._ticker_locks = {}
+        self._last_refresh = {}
+
+    def get_history(self, ticker, start, end):
+        """Return the Date-indexed OHLCV history for ticker between start and end"""
+        return self.get_histories([ticker], start, end)[ticker]
+
+    def get_histories(self, tickers, start, end):
+        """
+        Return {ticker: history} for several tickers.
+
+        Tickers that need new bars from the same start date are fetched
+        together through the fetcher's bulk fetch_many call. Tickers without
+        any data map to an empty frame.
+        """
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end)
+        tickers = list(dict.fromkeys(tickers))
+
+        with ExitStack() as stack:
+            # Sorted acquisition keeps overlapping batches from deadlocking
+            for ticker in sorted(tickers):
+                stack.enter_context(self._ticker_lock(ticker))
+
+            stored = {ticker: self.load(ticker) for ticker in tickers}
+
+            pending = {}  # fetch start -> tickers
+            for ticker, df in stored.items():
+                fetch_start = self._fetch_start(ticker, df, start, end)
+                if fetch_start is not None:
+                    pending.setdefault(fetch_start, []).append(ticker)
+
+            for fetch_start, group in pending.items():
+                with stage('prices.download'):
+                    fetched = self.fetcher.fetch_many(group, fetch_start, end)
+                for ticker in group:
+                    new = fetched.get(ticker)
+                    if new is not None and not new.empty:
+                        stored[ticker] = self._merge(ticker, stored[ticker], new)
+                    self._mark_refreshed(ticker)
+
+        histories = {}
+        for ticker, df in stored.items():
+            if df is None:
+                histories[ticker] = pd.DataFrame(columns=PRICE_COLUMNS)
+            else:
+                histories[ticker] = df[(df.index >= start) & (df.index <= end)]
+        return histories
+
+    def load(self, ticker):
+        """Return the stored history for ticker, or None"""
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return None
+        df = pd.read_parquet(path)
+        if not df.empty and not has_indicators(df):
+            # Stored before indicators were kept with the prices
+            df = update_indicators(df)
+            self._write(ticker, df)
+        return df
+
+    def _fetch_start(self, ticker, df, start, end):
+        """Return the date to fetch from, or None if the stored data is enough"""
+        if df is None or df.empty or start < df.index[0] - self.HEAD_TOLERANCE:
+            return start
+
+        last_refresh = self._last_refresh.get(ticker)
+        if last_refresh is None:
+            # Another process (e.g. a bulk training prefetch) may have refreshed the file
+            last_refresh = os.path.getmtime(self._path(ticker))
+        refresh_due = time.time() - last_refresh > self.refresh_seconds
+        if refresh_due and df.index[-1] <= end.normalize():
+            return df.index[-1]
+        return None
+
+    def _merge(self, ticker, df, new):
+        if df is None:
+            merged = update_indicators(new)
+        else:
+            prices = pd.concat([df[PRICE_COLUMNS], new[PRICE_COLUMNS]])
+            prices = prices[~prices.index.duplicated(keep='last')].sort_index()
+            if prices.equals(df[PRICE_COLUMNS]):
+                return df
+            # Indicators only need recomputing from the first re-fetched or new bar
+            merged = df.reindex(prices.index)
+            merged[PRICE_COLUMNS] = prices
+            merged = update_indicators(merged, int(prices.index.searchsorted(new.index[0])))
+        self._write(ticker, merged)
+        return merged
+
+    def _mark_refreshed(self, ticker):
+        # The file mtime doubles as the refresh time seen by other processes
+        self._last_refresh[ticker] = time.time()
+        path = self._path(ticker)
+        if os.path.exists(path):
+            os.utime(path)
+
+    def _write(self, ticker, df):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(ticker)
+        tmp_path = f'{path}.tmp'
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _path(self, ticker):
+        return os.path.join(self.directory, f'{ticker}.parquet')
+
+    def _ticker_lock(self, ticker):
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+
+def get_fetcher():
+    """Instantiate the fetcher configured in settings.PRICE_FETCHER"""
+    return import_string(settings.PRICE_FETCHER)()
+
+
+price_store = PriceStore(
+    settings.PRICE_DATA_DIR,
+    get_fetcher(),
+    refresh_seconds=settings.PRICE_STORE_REFRESH_SECONDS,
+)
+
+
+def get_history(ticker, start, end):
+    """Shortcut for price_store.get_history"""
+    return price_store.get_history(ticker, start, end)
+
+
+def get_histories(tickers, start, end):
+    """Shortcut for price_store.get_histories"""
+    return price_store.get_histories(tickers, start, end)
@@ -1,6 +1,79 @@
+from django.conf import settings
 from rest_framework import serializers
 
 
 
 class StockPredictionSerializer(serializers.Serializer):
-    ticker = serializers.CharField(max_length=20)
\ No newline at end of file
+    ticker = serializers.CharField(max_length=20)
+
+
+class ForecastSerializer(StockPredictionSerializer):
+    investment_amount = serializers.FloatField(min_value=0.01, default=1000.0)
+
+
+class TrainModelSerializer(StockPredictionSerializer):
+    mode = serializers.ChoiceField(choices=['full', 'incremental', 'head'], default='full')
+
+
+class TrainUniverseSerializer(serializers.Serializer):
+    tickers = serializers.ListField(
+        child=serializers.CharField(max_length=20),
+        allow_empty=False,
+        max_length=settings.BATCH_FORECAST_MAX_TICKERS,
+    )
+    mode = serializers.ChoiceField(choices=['full', 'incremental', 'head'], default='full')
+
+
+class SharedEncoderSerializer(serializers.Serializer):
+    tickers = serializers.ListField(
+        child=serializers.CharField(max_length=20),
+        allow_empty=False,
+        max_length=settings.BATCH_FORECAST_MAX_TICKERS,
+    )
+
+
+class BatchForecastSerializer(serializers.Serializer):
+    tickers = serializers.ListField(
+        child=serializers.CharField(max_length=20),
+        allow_empty=False,
+        max_length=settings.BATCH_FORECAST_MAX_TICKERS,
+    )
+    investment_amount = serializers.FloatField(min_value=0.01, default=1000.0)
+    include_chart_data = serializers.BooleanField(default=False)
+
+
+class HorizonForecastSerializer(serializers.Serializer):
+    tickers = serializers.ListField(
+        child=serializers.CharField(max_length=20),
+        allow_empty=False,
+        max_length=settings.BATCH_FORECAST_MAX_TICKERS,
+    )
+    horizon = serializers.IntegerField(min_value=1, max_value=settings.HORIZON_MAX_DAYS, default=5)
+    paths = serializers.IntegerField(min_value=0, max_value=settings.HORIZON_MAX_PATHS, default=0)
+    seed = serializers.IntegerField(required=False, allow_null=True, default=None)
+
+    def validate(self, data):
+        rollouts = len(set(ticker.upper() for ticker in data['tickers'])) * (data['paths'] + 1)
+        if rollouts > settings.HORIZON_MAX_ROLLOUTS:
+            raise serializers.ValidationError(
+                f'tickers x (paths + 1) must not exceed {settings.HORIZON_MAX_ROLLOUTS}.'
+            )
+        return data
+
+
+class BacktestSweepSerializer(serializers.Serializer):
+    tickers = serializers.ListField(
+        child=serializers.CharField(max_length=20),
+        allow_empty=False,
+        max_length=settings.BATCH_FORECAST_MAX_TICKERS,
+    )
+    investment_amounts = serializers.ListField(
+        child=serializers.FloatField(min_value=0.01), allow_empty=False, max_length=50, default=[1000],
+    )
+    transaction_costs = serializers.ListField(
+        child=serializers.FloatField(min_value=0, max_value=0.5), allow_empty=False, max_length=50, default=[0.001],
+    )
+    slippages = serializers.ListField(
+        child=serializers.FloatField(min_value=0, max_value=0.5), allow_empty=False, max_length=50, default=[0.0005],
+    )
+    top = serializers.IntegerField(min_value=1, max_value=10000, default=50)
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from .charts import data_version
+from .forecast_cache import forecast_cache_key, get_or_compute
+from .forecasting import check_history, history_range, iter_batch_forecasts, run_forecast, run_next_day_forecast
+from .model_registry import get_model_path
+from .price_store import get_history
+from .timing import stage
+
+STREAM_FORMATS = {
+    'sse': 'text/event-stream',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class ExecutorBusy(Exception):
+    """Raised when an executor already has its maximum of queued and running calls"""
+
+
+class BoundedExecutor:
+    """
+    A thread pool that refuses work once max_pending calls are queued or running.
+
+    Async views hand blocking work (price fetches, TF inference, chart data
+    files) to these pools so the event loop keeps serving other requests,
+    while the bound keeps a burst of slow tickers from piling up unbounded.
+    A slot is held until the thread finishes, even if the awaiting request
+    was cancelled (e.g. the client disconnected).
+    """
+
+    def __init__(self, max_workers, max_pending, name):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    async def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return await asyncio.wrap_future(future)
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name):
+    """The process-wide 'io' (price fetches, files) or 'compute' (inference) executor"""
+    with _executors_lock:
+        if name not in _executors:
+            workers = {
+                'io': settings.FORECAST_IO_WORKERS,
+                'compute': settings.FORECAST_COMPUTE_WORKERS,
+            }[name]
+            _executors[name] = BoundedExecutor(workers, workers + settings.FORECAST_MAX_QUEUED, f'forecast-{name}')
+        return _executors[name]
+
+
+def format_event(event, data, stream_format):
+    """Encode one stream event as a server-sent event or an NDJSON line"""
+    payload = json.dumps(data, cls=DjangoJSONEncoder)
+    if stream_format == 'sse':
+        return f'event: {event}\ndata: {payload}\n\n'
+    return f'{{"event": {json.dumps(event)}, "data": {payload}}}\n'
+
+
+async def forecast_events(ticker, investment_amount, mode='full'):
+    """
+    Yield (event, data) pairs for a single-ticker forecast.
+
+    The full mode sends 'metrics' (performance, trading strategy and
+    recommendations) as soon as inference finishes, then 'charts' (chart
+    URLs and series) once they are published. Results go through the same
+    cache key and single-flight get_or_compute as the synchronous forecast
+    view, so concurrent requests for a ticker compute it once. Ends with
+    'done', or 'error'.
+    """
+    io, compute = get_executor('io'), get_executor('compute')
+    try:
+        start, end = history_range()
+        with stage('forecast.fetch'):
+            df = await io.run(get_history, ticker, start, end)
+        if df.empty:
+            yield 'error', {'ticker': ticker, 'error': 'No data found for the given ticker.'}
+            return
+        df = df.reset_index()
+        parts = ('next_day',) if mode == 'next_day' else (investment_amount,)
+        model_path, cache_key, result = await io.run(_lookup, ticker, df, mode, *parts)
+
+        if mode == 'next_day':
+            if result is None:
+                result = await compute.run(
+                    get_or_compute, cache_key, lambda: run_next_day_forecast(ticker, df, model_path),
+                )
+            yield 'metrics', result
+            yield 'done', {'ticker': ticker}
+            return
+
+        if result is None:
+            # Whoever computes the forecast hands its metrics over before publishing charts
+            loop = asyncio.get_running_loop()
+            early_metrics = loop.create_future()
+
+            def on_metrics(metrics):
+                loop.call_soon_threadsafe(lambda: early_metrics.done() or early_metrics.set_result(metrics))
+
+            forecast = asyncio.ensure_future(compute.run(
+                get_or_compute, cache_key, lambda: run_forecast(ticker, df, model_path, investment_amount, on_metrics),
+            ))
+            await asyncio.wait([early_metrics, forecast], return_when=asyncio.FIRST_COMPLETED)
+            if early_metrics.done():
+                yield 'metrics', early_metrics.result()
+                result = await forecast
+                yield 'charts', _split(ticker, result)[1]
+                yield 'done', {'ticker': ticker}
+                return
+            early_metrics.cancel()
+            # Computed by another request (or process) while this one waited
+            result = forecast.result()
+
+        metrics, charts = _split(ticker, result)
+        yield 'metrics', metrics
+        yield 'charts', charts
+        yield 'done', {'ticker': ticker}
+    except ExecutorBusy:
+        yield 'error', {'ticker': ticker, 'error': 'Forecast workers are busy, please retry shortly.'}
+    except Exception as e:
+        yield 'error', {'ticker': ticker, 'error': str(e)}
+
+
+def _lookup(ticker, df, mode, *parts):
+    """
+    Check the history and look up the model path, cache key and any cached
+    result. Blocking (database, cache and file stats), so run on the io executor.
+    """
+    check_history(df, mode)
+    model_path = get_model_path(ticker)
+    cache_key = forecast_cache_key(ticker, model_path, data_version(df, model_path), *parts)
+    return model_path, cache_key, cache.get(cache_key)
+
+
+def _split(ticker, result):
+    """Split a full forecast result into its 'metrics' and 'charts' events"""
+    chart_fields = ['chart_data'] + [field for field in result if field.startswith('plot_')]
+    metrics = {key: value for key, value in result.items() if key not in chart_fields}
+    return metrics, {'ticker': ticker, **{field: result[field] for field in chart_fields}}
+
+
+async def batch_forecast_events(tickers, investment_amount, include_chart_data=False):
+    """
+    Yield ('result', ...) per ticker and a final ('complete', summary).
+
+    Steps through iter_batch_forecasts on the compute executor, so each
+    ticker is sent as soon as its group's predict call is done without
+    holding the event loop.
+    """
+    results = iter_batch_forecasts(tickers, investment_amount, include_chart_data)
+    compute = get_executor('compute')
+    try:
+        while True:
+            result = await compute.run(next, results, None)
+            if result is None:
+                return
+            yield ('complete' if result['status'] == 'complete' else 'result'), result
+    except ExecutorBusy:
+        yield 'error', {'error': 'Forecast workers are busy, please retry shortly.'}
+    finally:
+        if not results.gi_running:
+            results.close()
@@ -1,94 +1,125 @@
 from celery import shared_task
-import yfinance as yf
-import pandas as pd
-import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, LSTM, Input
-import os
+from celery.exceptions import MaxRetriesExceededError
+from django.conf import settings
 import time
-import sys
-from datetime import datetime, timedelta
+from datetime import datetime
+from .backtest import pad_series, sweep
+from .catalog import register_model
+from .forecast_cache import invalidate_forecasts
+from .forecasting import get_predictions
+from .memory import available_memory
+from .price_store import get_histories, get_history
+from .model_bundle import load_metadata, save_bundle
+from .model_registry import SHARED_ENCODER_PATH, get_head_path, model_registry
+from .training import (
+    TRAINING_SPLIT, FullRetrainRequired, fit_pipeline, train_full, train_head, train_incremental,
+    train_shared_encoder, training_range,
+)
+from .windowing import LOOKBACK
+from .timing import collected, current_timings, stage
+from .training_jobs import claim_training, release_training
+
+
+def _wait_for_memory(task, claim):
+    # Wait for memory to free up rather than getting the worker OOM-killed
+    available = available_memory()
+    if available is not None and available < settings.TRAINING_MIN_FREE_MEMORY_MB * 1024 * 1024:
+        try:
+            raise task.retry(
+                countdown=settings.TRAINING_ADMISSION_RETRY_SECONDS,
+                max_retries=settings.TRAINING_ADMISSION_MAX_RETRIES,
+            )
+        except MaxRetriesExceededError:
+            # The view claimed the ticker before queueing; giving up must free it
+            release_training(claim, task.request.id)
+            raise
+
+
+def _progress_fit(task, runs):
+    """
+    fit(model, x_train, y_train, epochs) that trains through the tf.data
+    pipeline, reports progress on task and appends each run's summary
+    (epochs, per-epoch wall-clock, throughput) to runs
+    """
+    def fit(model, x_train, y_train, epochs):
+        runs.append(fit_pipeline(
+            model, x_train, y_train, epochs,
+            publish=lambda meta: task.update_state(state='PROGRESS', meta=meta),
+        ))
+    return fit
+
 
 @shared_task(bind=True)
-def train_model_task(self, ticker):
+@collected('train.total')
+def train_model_task(self, ticker, mode='full'):
     """
     Celery task to train ML model for stock prediction
+
+    mode='incremental' fine-tunes the existing model on the bars that
+    arrived since it was trained, and falls back to a full retrain when
+    there is no model yet or the new data has drifted too far.
+    mode='head' only fits a small per-ticker head on the shared encoder
+    (see train_shared_encoder_task), falling back to a full retrain when
+    there is no encoder yet.
     """
+    _wait_for_memory(self, ticker)
+
+    # Tasks queued without going through the API still train a ticker one at a time
+    existing = claim_training(ticker, self.request.id)
+    if existing:
+        return {
+            'status': 'error',
+            'message': f'Model training for {ticker} is already in progress (task {existing})'
+        }
+
     start_time = time.time()
-    total_epochs = 50  # Define epochs as variable
-    
-    class ProgressCapture:
-        def __init__(self, task, epochs):
-            self.task = task
-            self.epochs = epochs
-            self.original_stdout = sys.stdout
-            
-        def write(self, text):
-            self.original_stdout.write(text)
-            if "Epoch" in text and f"/{self.epochs}" in text:
-                # Parse epoch info from output like "Epoch 12/50"
-                try:
-                    # Extract the number before /{epochs}
-                    current = int(text.split(f'/{self.epochs}')[0].split()[-1])
-                    progress = int((current / self.epochs) * 100)
-                    
-                    self.task.update_state(
-                        state='PROGRESS',
-                        meta={
-                            'current_epoch': current,
-                            'total_epochs': self.epochs,
-                            'progress': progress,
-                            'message': f'Epoch {current}/{self.epochs}'
-                        }
-                    )
-                except:
-                    pass
-                    
-        def flush(self):
-            self.original_stdout.flush()
-    
+    total_epochs = settings.TRAINING_MAX_EPOCHS
+    runs = []
+    fit = _progress_fit(self, runs)
+
     try:
-        # Download stock data
-        now = datetime.now()
-        start = datetime(now.year - 4, now.month, now.day)
-        end = now
-        df = yf.download(ticker, start, end)
+        # Load stock data from the local price store
+        start, end = training_range()
+        with stage('train.fetch'):
+            df = get_history(ticker, start, end)
+        if df.empty:
+            return {
+                'status': 'error',
+                'message': f'No data found for {ticker}'
+            }
         df = df.reset_index()
-        
-        # Prepare data
-        data_training = pd.DataFrame(df['Close'][0:int(len(df)*0.70)])
-        scaler = MinMaxScaler(feature_range=(0,1))
-        data_training_array = scaler.fit_transform(data_training)
-        
-        # Create training data
-        x_train = []
-        y_train = []
-        for i in range(100, data_training_array.shape[0]):
-            x_train.append(data_training_array[i-100: i])
-            y_train.append(data_training_array[i, 0])
-        x_train, y_train = np.array(x_train), np.array(y_train)
-        
-        # Build LSTM model
-        model = Sequential()
-        model.add(Input(shape=(x_train.shape[1], 1)))
-        model.add(LSTM(units=128, activation='tanh', return_sequences=True))
-        model.add(LSTM(64, return_sequences=True))
-        model.add(LSTM(32))
-        model.add(Dense(25))
-        model.add(Dense(1))
-        
-        model.compile(loss='mean_squared_error', optimizer='adam')
 
+        model_path = f'trained_models/{ticker}_stock_prediction_model.keras'
+        fallback_reason = None
+        model = None
+        if mode == 'incremental':
+            try:
+                with stage('train.fit'):
+                    model, metadata = train_incremental(df, model_path, load_metadata(model_path), fit)
+            except FullRetrainRequired as e:
+                fallback_reason = str(e)
+            else:
+                if model is None:
+                    return {
+                        'status': 'success',
+                        'message': f'Model for {ticker} is already up to date',
+                        'model_path': model_path,
+                        'mode': 'incremental',
+                        'trained_through': metadata['trained_through'],
+                    }
 
-        # Train model with stdout capture
-        progress_capture = ProgressCapture(self, total_epochs)
-        sys.stdout = progress_capture
-        
-        try:
-            model.fit(x_train, y_train, epochs=total_epochs, batch_size=16, verbose=1)
-        finally:
-            sys.stdout = progress_capture.original_stdout
+        if mode == 'head':
+            try:
+                with stage('train.fit'):
+                    model, metadata = train_head(df, SHARED_ENCODER_PATH, fit, total_epochs)
+            except FullRetrainRequired as e:
+                fallback_reason = str(e)
+            else:
+                model_path = get_head_path(ticker)
+
+        if model is None:
+            with stage('train.fit'):
+                model, metadata = train_full(df, fit, total_epochs)
 
         model.summary()
         # Capture model summary
@@ -102,9 +133,14 @@ def train_model_task(self, ticker):
             'trainable_params': sum([layer.count_params() for layer in model.layers if layer.trainable])
         }
         
-        # Save model
-        model_path = f'trained_models/{ticker}_stock_prediction_model.keras'
-        model.save(model_path)
+        # Save model together with its scaler and training metadata
+        metadata['ticker'] = ticker
+        metadata['trained_at'] = datetime.now().isoformat(timespec='seconds')
+        with stage('train.save'):
+            save_bundle(model_path, model, metadata)
+            register_model(model_path, metadata, model, runs[-1] if runs else None)
+        model_registry.forget(ticker)
+        invalidate_forecasts(ticker)
         
         end_time = time.time()
         elapsed_time = end_time - start_time
@@ -113,8 +149,13 @@ def train_model_task(self, ticker):
             'status': 'success',
             'message': f'Model trained successfully for {ticker}',
             'model_path': model_path,
+            'mode': metadata['mode'],
+            'fallback_reason': fallback_reason,
+            'trained_through': metadata['trained_through'],
             'elapsed_time': elapsed_time,
             'elapsed_time_formatted': f'{elapsed_time:.2f}s',
+            'training': runs[-1] if runs else None,
+            'timings': current_timings().as_dict(),
             'model_summary': model_summary
         }
         
@@ -122,4 +163,152 @@ def train_model_task(self, ticker):
         return {
             'status': 'error',
             'message': str(e)
-        }
\ No newline at end of file
+        }
+    finally:
+        # Let the next training request for this ticker through
+        release_training(ticker, self.request.id)
+
+
+@shared_task(bind=True)
+def train_shared_encoder_task(self, tickers):
+    """
+    Train the shared LSTM encoder on many tickers, then fit a head for each.
+
+    Heads fitted on an earlier encoder stop being served (get_model_path
+    falls back to the default model) until they are refitted with
+    train_model_task(mode='head').
+    """
+    _wait_for_memory(self, SHARED_ENCODER_PATH)
+
+    existing = claim_training(SHARED_ENCODER_PATH, self.request.id)
+    if existing:
+        return {
+            'status': 'error',
+            'message': f'The shared encoder is already being trained (task {existing})'
+        }
+
+    start_time = time.time()
+    runs = []
+    fit = _progress_fit(self, runs)
+
+    try:
+        start, end = training_range()
+        histories = {
+            ticker: df.reset_index() for ticker, df in get_histories(tickers, start, end).items()
+            if len(df) * TRAINING_SPLIT > LOOKBACK
+        }
+        if not histories:
+            return {
+                'status': 'error',
+                'message': 'Not enough data for any of the given tickers'
+            }
+
+        encoder, metadata = train_shared_encoder(histories, fit, settings.SHARED_ENCODER_EPOCHS)
+        encoder_training = runs[-1]
+        metadata['trained_at'] = datetime.now().isoformat(timespec='seconds')
+        save_bundle(SHARED_ENCODER_PATH, encoder, metadata)
+        register_model(SHARED_ENCODER_PATH, metadata, encoder, encoder_training)
+
+        heads = {}
+        errors = {}
+        for ticker, df in histories.items():
+            try:
+                head, head_metadata = train_head(df, SHARED_ENCODER_PATH, fit, settings.HEAD_EPOCHS)
+                head_metadata['ticker'] = ticker
+                head_metadata['trained_at'] = datetime.now().isoformat(timespec='seconds')
+                head_path = get_head_path(ticker)
+                save_bundle(head_path, head, head_metadata)
+                register_model(head_path, head_metadata, head, runs[-1])
+                model_registry.forget(ticker)
+                invalidate_forecasts(ticker)
+                heads[ticker] = head_path
+            except Exception as e:
+                errors[ticker] = str(e)
+
+        elapsed_time = time.time() - start_time
+        return {
+            'status': 'success',
+            'message': f'Shared encoder trained on {len(histories)} tickers',
+            'model_path': SHARED_ENCODER_PATH,
+            'encoder_params': encoder.count_params(),
+            'encoder_training': encoder_training,
+            'heads': heads,
+            'errors': errors,
+            'skipped': sorted(set(tickers) - set(histories)),
+            'elapsed_time': elapsed_time,
+            'elapsed_time_formatted': f'{elapsed_time:.2f}s',
+        }
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'message': str(e)
+        }
+    finally:
+        release_training(SHARED_ENCODER_PATH, self.request.id)
+
+
+@shared_task
+def prefetch_histories_task(tickers):
+    """
+    Download training history for many tickers in one batched fetch, so the
+    training tasks that follow read it from the local price store.
+    """
+    start, end = training_range()
+    try:
+        histories = get_histories(tickers, start, end)
+    except Exception as e:
+        # Each training task falls back to fetching its own history
+        return {'status': 'error', 'message': str(e)}
+    return {'status': 'success', 'bars': {ticker: len(df) for ticker, df in histories.items()}}
+
+
+@shared_task
+def backtest_sweep_chunk_task(tickers, investment_amounts, transaction_costs, slippages):
+    """
+    Backtest a chunk of tickers over the full parameter grid.
+
+    Predictions come from the shared forecast cache; the grid itself runs
+    as one vectorized sweep over the whole chunk.
+    """
+    predictions = []
+    errors = []
+    for ticker in tickers:
+        try:
+            predictions.append((ticker, get_predictions(ticker)))
+        except Exception as e:
+            errors.append({'ticker': ticker, 'error': str(e)})
+
+    rows = []
+    if predictions:
+        result = sweep(pad_series([series for _, series in predictions]),
+                       investment_amounts, transaction_costs, slippages)
+        for t, (ticker, _) in enumerate(predictions):
+            for a, amount in enumerate(investment_amounts):
+                for c, cost in enumerate(transaction_costs):
+                    for s, slippage in enumerate(slippages):
+                        rows.append({
+                            'ticker': ticker,
+                            'investment_amount': amount,
+                            'transaction_cost': cost,
+                            'slippage': slippage,
+                            'final_portfolio_value': float(result['final_value'][t, a, c, s]),
+                            'total_fees': float(result['total_fees'][t, a, c, s]),
+                            'trading_return_percentage': float(result['return_percentage'][t, a, c, s]),
+                            'total_trades': int(result['total_trades'][t]),
+                        })
+    return {'rows': rows, 'errors': errors}
+
+
+@shared_task
+def rank_backtest_sweep_task(chunk_results, top=50):
+    """Chord callback: merge chunk results into one ranked summary table"""
+    rows = [row for chunk in chunk_results for row in chunk['rows']]
+    errors = [error for chunk in chunk_results for error in chunk['errors']]
+    rows.sort(key=lambda row: (row['trading_return_percentage'], row['final_portfolio_value']), reverse=True)
+    return {
+        'status': 'success',
+        'total_combinations': len(rows),
+        'results': rows[:top],
+        'errors': errors,
+    }
@@ -1,3 +1,791 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import keras
+from celery.exceptions import MaxRetriesExceededError, Retry
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from sklearn.preprocessing import MinMaxScaler
+from .backtest import pad_series, run_backtest, sweep
+from .catalog import current_encoder_id, current_model, model_kind, register_model, sync_directory
+from .charts import get_chart, publish_charts
+from .forecasting import predict_test_period, prepare_next_day_window, prepare_test_data
+from .forecast_cache import forecast_cache_key, get_or_compute, invalidate_forecasts
+from .indicators import INDICATOR_COLUMNS, RSI_PERIOD, update_indicators
+from .model_bundle import ModelBundle, load_metadata, make_scaler, metadata_path, save_bundle, scaler_params
+from .model_registry import ModelRegistry, resolve_model
+from .models import TrainedModel
+from .price_store import PRICE_COLUMNS, CSVFetcher, PriceStore
+from .streaming import forecast_events
+from .tasks import _wait_for_memory, train_model_task
+from .training import TRAINING_SPLIT, train_full, train_incremental
+from .training_jobs import claim_training, release_training
+from .windowing import LOOKBACK
 
-# Create your tests here.
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'api-tests'}}
+
+
+def legacy_backtest(y_predicted, investment_amount, transaction_cost=0.001, slippage=0.0005):
+    """The signal and trade loops the forecast view ran before api/backtest.py"""
+    buy_signals = []
+    sell_signals = []
+    trades = []
+    for i in range(1, len(y_predicted)):
+        price_change = y_predicted[i] - y_predicted[i-1]
+        if price_change > 0 and len(buy_signals) == len(sell_signals):  # Buy signal
+            buy_signals.append({'day': i, 'price': float(y_predicted[i-1]), 'action': 'BUY'})
+        elif price_change < 0 and len(buy_signals) > len(sell_signals):  # Sell signal
+            sell_signals.append({'day': i, 'price': float(y_predicted[i-1]), 'action': 'SELL'})
+
+    total_profit = 0
+    current_cash = investment_amount
+    total_fees = 0
+    for i, buy in enumerate(buy_signals):
+        if i < len(sell_signals):
+            sell = sell_signals[i]
+            buy_cost = current_cash * transaction_cost
+            available_cash = current_cash - buy_cost
+            buy_price_with_slippage = buy['price'] * (1 + slippage)
+            shares_bought_trade = available_cash / buy_price_with_slippage
+            sell_price_with_slippage = sell['price'] * (1 - slippage)
+            gross_sell_value = shares_bought_trade * sell_price_with_slippage
+            sell_cost = gross_sell_value * transaction_cost
+            net_sell_value = gross_sell_value - sell_cost
+            trade_profit = net_sell_value - current_cash
+            total_profit += trade_profit
+            trade_fees = buy_cost + sell_cost
+            total_fees += trade_fees
+            trades.append({
+                'buy_day': buy['day'],
+                'buy_price': buy['price'],
+                'buy_price_actual': float(buy_price_with_slippage),
+                'sell_day': sell['day'],
+                'sell_price': sell['price'],
+                'sell_price_actual': float(sell_price_with_slippage),
+                'shares': float(shares_bought_trade),
+                'gross_profit': float(gross_sell_value - available_cash),
+                'fees': float(trade_fees),
+                'net_profit': float(trade_profit),
+                'return_percentage': float((trade_profit / current_cash) * 100)
+            })
+            current_cash = net_sell_value
+
+    return {
+        'buy_signals': buy_signals,
+        'sell_signals': sell_signals,
+        'trades': trades,
+        'total_profit': total_profit,
+        'total_fees': total_fees,
+        'final_value': current_cash,
+    }
+
+
+# Flat stretches (ties) at the start, between moves and while a position is
+# open, plus a trailing buy that never closes
+TIES = [10, 10, 11, 11, 11, 12, 12, 11, 11, 10, 10, 10, 11, 12, 12, 13]
+
+
+def fixed_series():
+    """Rounded random walks, so equal consecutive predictions are common"""
+    rng = np.random.default_rng(7)
+    walks = [np.round(100 + np.cumsum(rng.normal(0, 1, size)), 0) for size in (2, 30, 250, 500)]
+    return [np.array(TIES, dtype=float), np.array([5.0, 5.0, 5.0])] + walks
+
+
+class BacktestParityTests(SimpleTestCase):
+    """run_backtest and sweep must trade exactly like the old loops"""
+
+    def assertResultsEqual(self, result, expected):
+        self.assertEqual(result['buy_signals'], expected['buy_signals'])
+        self.assertEqual(result['sell_signals'], expected['sell_signals'])
+        self.assertEqual(len(result['trades']), len(expected['trades']))
+        for trade, expected_trade in zip(result['trades'], expected['trades']):
+            self.assertEqual(trade.keys(), expected_trade.keys())
+            for key, value in expected_trade.items():
+                self.assertAlmostEqual(trade[key], value, places=6, msg=key)
+        for key in ('total_profit', 'total_fees', 'final_value'):
+            self.assertAlmostEqual(result[key], expected[key], places=6, msg=key)
+
+    def test_run_backtest_matches_legacy_loop(self):
+        for series in fixed_series():
+            with self.subTest(length=len(series)):
+                self.assertResultsEqual(run_backtest(series, 1000), legacy_backtest(series, 1000))
+
+    def test_ties_do_not_trade(self):
+        result = run_backtest(TIES, 1000)
+        self.assertEqual([signal['day'] for signal in result['buy_signals']], [2, 12])
+        self.assertEqual([signal['day'] for signal in result['sell_signals']], [7])
+        self.assertEqual(len(result['trades']), 1)
+
+    def test_sweep_matches_legacy_loop_on_nan_padded_series(self):
+        series = fixed_series()
+        amounts, costs, slippages = [500, 1000], [0, 0.001, 0.01], [0, 0.0005]
+        result = sweep(pad_series(series), amounts, costs, slippages)
+        self.assertEqual(result['final_value'].shape, (len(series), 2, 3, 2))
+
+        for t, prices in enumerate(series):
+            for a, amount in enumerate(amounts):
+                for c, cost in enumerate(costs):
+                    for s, slippage in enumerate(slippages):
+                        expected = legacy_backtest(prices, amount, cost, slippage)
+                        with self.subTest(series=t, amount=amount, cost=cost, slippage=slippage):
+                            self.assertEqual(result['total_trades'][t], len(expected['trades']))
+                            self.assertAlmostEqual(result['final_value'][t, a, c, s], expected['final_value'], places=6)
+                            self.assertAlmostEqual(result['total_fees'][t, a, c, s], expected['total_fees'], places=6)
+                            self.assertAlmostEqual(
+                                result['return_percentage'][t, a, c, s],
+                                (expected['final_value'] - amount) / amount * 100, places=6,
+                            )
+
+
+class RecordingFetcher(CSVFetcher):
+    """CSVFetcher that records its calls and only serves bars up to through"""
+
+    def __init__(self, through):
+        super().__init__()
+        self.through = pd.Timestamp(through)
+        self.calls = []
+
+    def fetch_many(self, tickers, start, end):
+        self.calls.append((list(tickers), pd.Timestamp(start)))
+        return super().fetch_many(tickers, start, min(pd.Timestamp(end), self.through + pd.Timedelta(days=1)))
+
+
+class PriceStoreTests(SimpleTestCase):
+    """PriceStore only downloads bars it doesn't already hold"""
+
+    start, end = '2019-01-01', '2020-12-31'
+
+    def setUp(self):
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.fetcher = RecordingFetcher(through='2020-06-30')
+        self.store = PriceStore(self.directory, self.fetcher, refresh_seconds=60)
+
+    def expire_refresh(self):
+        self.store._last_refresh['TSLA'] -= 2 * self.store.refresh_seconds
+
+    def test_first_request_fetches_full_range(self):
+        df = self.store.get_history('TSLA', self.start, self.end)
+        self.assertEqual(self.fetcher.calls, [(['TSLA'], pd.Timestamp(self.start))])
+        self.assertEqual(df.index[-1], pd.Timestamp('2020-06-30'))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'TSLA.parquet')))
+
+    def test_repeat_request_within_refresh_window_does_not_fetch(self):
+        first = self.store.get_history('TSLA', self.start, self.end)
+        second = self.store.get_history('TSLA', self.start, self.end)
+        # A fresh store sees the refresh through the file mtime
+        third = PriceStore(self.directory, self.fetcher, refresh_seconds=60).get_history('TSLA', self.start, self.end)
+        self.assertEqual(len(self.fetcher.calls), 1)
+        pd.testing.assert_frame_equal(first, second)
+        pd.testing.assert_frame_equal(first, third)
+
+    def test_expired_refresh_fetches_from_last_stored_bar(self):
+        stored = self.store.get_history('TSLA', self.start, self.end)
+        self.fetcher.through = pd.Timestamp('2020-09-30')
+        self.expire_refresh()
+        df = self.store.get_history('TSLA', self.start, self.end)
+
+        self.assertEqual(self.fetcher.calls[-1], (['TSLA'], stored.index[-1]))
+        self.assertEqual(df.index[-1], pd.Timestamp('2020-09-30'))
+        self.assertTrue(df.index.is_unique)
+        pd.testing.assert_frame_equal(df.loc[:stored.index[-1]], stored)
+
+        expected = CSVFetcher().fetch('TSLA', self.start, '2020-10-01')
+        pd.testing.assert_frame_equal(df[PRICE_COLUMNS], expected, check_freq=False)
+        pd.testing.assert_frame_equal(df, update_indicators(expected), check_freq=False)
+
+    def test_expired_refresh_without_new_bars_keeps_history(self):
+        stored = self.store.get_history('TSLA', self.start, self.end)
+        self.expire_refresh()
+        df = self.store.get_history('TSLA', self.start, self.end)
+        self.assertEqual(len(self.fetcher.calls), 2)
+        pd.testing.assert_frame_equal(df, stored)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, FORECAST_CACHE_LOCK_TIMEOUT=5)
+class ForecastCacheTests(SimpleTestCase):
+    """get_or_compute computes each forecast once; training invalidates them"""
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.calls_lock = threading.Lock()
+
+    def compute(self, value='forecast', delay=0):
+        def compute():
+            with self.calls_lock:
+                self.calls += 1
+            time.sleep(delay)
+            return value
+        return compute
+
+    def test_concurrent_misses_compute_once(self):
+        key = forecast_cache_key('TSLA', 'model.keras', 1)
+        barrier = threading.Barrier(8)
+
+        def request():
+            barrier.wait()
+            return get_or_compute(key, self.compute(delay=0.2))
+
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda _: request(), range(8)))
+        self.assertEqual(results, ['forecast'] * 8)
+        self.assertEqual(self.calls, 1)
+
+    def test_cached_value_is_returned(self):
+        key = forecast_cache_key('TSLA', 'model.keras', 1, 1000.0)
+        get_or_compute(key, self.compute('first'))
+        self.assertEqual(get_or_compute(key, self.compute('second')), 'first')
+        self.assertEqual(self.calls, 1)
+
+    def test_waits_for_result_from_lock_holder(self):
+        # Another process holds the cache lock and stores the result
+        key = forecast_cache_key('TSLA', 'model.keras', 1)
+        cache.add(f'{key}:lock', 1)
+        with ThreadPoolExecutor(1) as executor:
+            future = executor.submit(get_or_compute, key, self.compute('local'))
+            time.sleep(0.3)
+            cache.set(key, 'remote')
+            self.assertEqual(future.result(timeout=5), 'remote')
+        self.assertEqual(self.calls, 0)
+
+    def test_failed_compute_releases_lock(self):
+        key = forecast_cache_key('TSLA', 'model.keras', 1)
+
+        def fail():
+            raise RuntimeError('download failed')
+
+        with self.assertRaises(RuntimeError):
+            get_or_compute(key, fail)
+        self.assertIsNone(cache.get(f'{key}:lock'))
+        self.assertEqual(get_or_compute(key, self.compute()), 'forecast')
+
+    def test_invalidate_forecasts_changes_key(self):
+        key = forecast_cache_key('TSLA', 'model.keras', 1)
+        other = forecast_cache_key('AAPL', 'model.keras', 1)
+        get_or_compute(key, self.compute('old'))
+
+        invalidate_forecasts('TSLA')
+        new_key = forecast_cache_key('TSLA', 'model.keras', 1)
+        self.assertNotEqual(new_key, key)
+        self.assertEqual(forecast_cache_key('AAPL', 'model.keras', 1), other)
+        self.assertEqual(get_or_compute(new_key, self.compute('new')), 'new')
+
+        invalidate_forecasts('TSLA')
+        self.assertNotIn(forecast_cache_key('TSLA', 'model.keras', 1), (key, new_key))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TrainingClaimTests(SimpleTestCase):
+    """Only one training run per ticker is in flight at a time"""
+
+    def setUp(self):
+        cache.clear()
+        # ready() is False: claimed tasks count as still running
+        self.async_result = self.enterContext(mock.patch('api.training_jobs.AsyncResult'))
+        self.async_result.return_value.ready.return_value = False
+
+    def test_second_task_gets_existing_claim(self):
+        self.assertIsNone(claim_training('TSLA', 'task-1'))
+        self.assertEqual(claim_training('TSLA', 'task-2'), 'task-1')
+        self.async_result.assert_called_with('task-1')
+
+    def test_same_task_reclaims(self):
+        self.assertIsNone(claim_training('TSLA', 'task-1'))
+        self.assertIsNone(claim_training('TSLA', 'task-1'))
+
+    def test_claims_are_per_ticker(self):
+        self.assertIsNone(claim_training('TSLA', 'task-1'))
+        self.assertIsNone(claim_training('AAPL', 'task-2'))
+
+    def test_release_allows_new_claim(self):
+        claim_training('TSLA', 'task-1')
+        release_training('TSLA', 'task-1')
+        self.assertIsNone(claim_training('TSLA', 'task-2'))
+
+    def test_release_by_other_task_keeps_claim(self):
+        claim_training('TSLA', 'task-1')
+        release_training('TSLA', 'task-2')
+        self.assertEqual(claim_training('TSLA', 'task-3'), 'task-1')
+
+    def test_stale_claim_is_replaced(self):
+        claim_training('TSLA', 'task-1')
+        # task-1's worker died without releasing the claim
+        self.async_result.return_value.ready.return_value = True
+        self.assertIsNone(claim_training('TSLA', 'task-2'))
+        self.async_result.return_value.ready.return_value = False
+        self.assertEqual(claim_training('TSLA', 'task-3'), 'task-2')
+
+    def test_claim_kept_while_waiting_for_memory(self):
+        claim_training('TSLA', 'task-1')
+        task = mock.Mock(**{'request.id': 'task-1', 'retry.return_value': Retry()})
+        with mock.patch('api.tasks.available_memory', return_value=0), self.assertRaises(Retry):
+            _wait_for_memory(task, 'TSLA')
+        self.assertEqual(claim_training('TSLA', 'task-2'), 'task-1')
+
+    @override_settings(TRAINING_ADMISSION_MAX_RETRIES=2, TRAINING_ADMISSION_RETRY_SECONDS=0)
+    def test_claim_released_when_memory_retries_run_out(self):
+        claim_training('TSLA', 'task-1')
+        with mock.patch('api.tasks.available_memory', return_value=0):
+            # Eager tasks run their retries inline until they give up
+            result = train_model_task.apply(('TSLA',), task_id='task-1')
+        self.assertIsInstance(result.result, MaxRetriesExceededError)
+        self.assertIsNone(claim_training('TSLA', 'task-2'))
+
+
+class IndicatorTests(SimpleTestCase):
+    """Extending stored indicators gives the same values as a full recompute"""
+
+    def setUp(self):
+        self.prices = CSVFetcher().fetch('TSLA', '2015-01-01', '2021-01-01')
+        self.full = update_indicators(self.prices)
+
+    def extend(self, stored, end):
+        df = stored.reindex(self.prices.index[:end])
+        df[PRICE_COLUMNS] = self.prices[PRICE_COLUMNS].iloc[:end]
+        return update_indicators(df, len(stored))
+
+    def assertIndicatorsEqual(self, df, expected):
+        pd.testing.assert_frame_equal(df[INDICATOR_COLUMNS], expected[INDICATOR_COLUMNS], check_exact=False, rtol=1e-9)
+
+    def test_incremental_matches_full(self):
+        # Chunks ending inside and just past the RSI period and the SMA warmup
+        df = update_indicators(self.prices.iloc[:5])
+        for end in (10, 15, 150, 199, 200, 201, 202, 700, len(self.prices)):
+            with self.subTest(end=end):
+                df = self.extend(df, end)
+                self.assertIndicatorsEqual(df, self.full.iloc[:end])
+
+    def test_daily_appends_match_full(self):
+        df = update_indicators(self.prices.iloc[:-30])
+        for end in range(len(self.prices) - 29, len(self.prices) + 1):
+            df = self.extend(df, end)
+        self.assertIndicatorsEqual(df, self.full)
+
+    def test_refetched_last_bar_matches_full(self):
+        # The stored last bar was an intraday snapshot; the re-fetched close differs
+        prices = self.prices.copy()
+        prices.iloc[-1, prices.columns.get_loc('Close')] *= 1.05
+        df = self.full.copy()
+        df[PRICE_COLUMNS] = prices[PRICE_COLUMNS]
+        self.assertIndicatorsEqual(update_indicators(df, len(df) - 1), update_indicators(prices))
+
+    def test_matches_pandas_reference(self):
+        close = self.prices['Close']
+        pd.testing.assert_series_equal(self.full['sma50'], close.rolling(50).mean(), check_names=False)
+        pd.testing.assert_series_equal(
+            self.full['ema12'], close.ewm(span=12, adjust=False).mean(), check_names=False, check_exact=False, rtol=1e-9,
+        )
+        self.assertTrue(self.full['rsi14'].iloc[:RSI_PERIOD].isna().all())
+        self.assertTrue(self.full['rsi14'].iloc[RSI_PERIOD:].between(0, 100).all())
+
+
+def price_history(bars, start='2020-01-01'):
+    """Reset-index history of a smooth synthetic series, so updates never drift out of the scaler range"""
+    t = np.arange(bars)
+    return pd.DataFrame({
+        'Date': pd.bdate_range(start, periods=bars),
+        'Close': 100 + 10 * np.sin(t / 15),
+    })
+
+
+# Untrained models are compared against their own baseline loss, which says nothing here
+@override_settings(INCREMENTAL_MAX_LOSS_RATIO=1e9, INCREMENTAL_REPLAY_RATIO=2.0)
+class IncrementalTrainingTests(SimpleTestCase):
+    """Each incremental run fine-tunes on the bars added since the previous run"""
+
+    def setUp(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.model_path = os.path.join(directory, 'TEST_stock_prediction_model.keras')
+        self.runs = []
+
+    def fit(self, model, x, y, epochs):
+        self.runs.append(y.copy())
+
+    def update(self, df):
+        model, metadata = train_incremental(df, self.model_path, load_metadata(self.model_path), self.fit)
+        if model is not None:
+            save_bundle(self.model_path, model, metadata)
+        return model, metadata
+
+    def test_incremental_runs_only_train_on_new_bars(self):
+        df = price_history(440)
+        model, metadata = train_full(df.iloc[:400], self.fit, 1)
+        save_bundle(self.model_path, model, metadata)
+        self.assertEqual(metadata['data_through'], df.Date.iloc[399].strftime('%Y-%m-%d'))
+        self.assertLess(metadata['trained_through'], metadata['data_through'])
+
+        for end in (420, 440):
+            with self.subTest(end=end):
+                model, metadata = self.update(df.iloc[:end])
+                self.assertEqual(metadata['mode'], 'incremental')
+                self.assertEqual(metadata['new_windows'], 20)
+                self.assertEqual(metadata['replay_windows'], 40)
+                self.assertEqual(metadata['data_through'], df.Date.iloc[end - 1].strftime('%Y-%m-%d'))
+                # New windows come last; their targets are the 20 new closes
+                scaler = make_scaler(metadata['scaler']['data_min'], metadata['scaler']['data_max'])
+                expected = scaler.transform(df[['Close']].to_numpy()[end - 20:end]).ravel()
+                np.testing.assert_allclose(self.runs[-1][-20:], expected)
+                self.assertEqual(len(self.runs[-1]), 60)
+
+        model, metadata = self.update(df)
+        self.assertIsNone(model)
+        self.assertEqual(len(self.runs), 3)
+
+    def test_legacy_metadata_counts_from_training_split(self):
+        df = price_history(420)
+        model, metadata = train_full(df.iloc[:400], self.fit, 1)
+        del metadata['data_through']
+        save_bundle(self.model_path, model, metadata)
+        model, metadata = self.update(df)
+        self.assertEqual(metadata['new_windows'], 420 - int(400 * TRAINING_SPLIT))
+
+
+class CatalogTests(TestCase):
+    """The catalog records trained files and picks the one serving a ticker"""
+
+    def setUp(self):
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+
+    def write_model(self, filename, metadata=None):
+        """A stand-in model file (the catalog only stats it) with its sidecar metadata"""
+        model_path = os.path.join(self.directory, filename)
+        with open(model_path, 'wb') as f:
+            f.write(b'\0' * 64)
+        if metadata is not None:
+            with open(metadata_path(model_path), 'w') as f:
+                json.dump(metadata, f)
+        return model_path
+
+    def register(self, filename, **metadata):
+        return register_model(self.write_model(filename, metadata), metadata)
+
+    def test_register_model_records_metadata_and_bumps_version(self):
+        model = keras.Sequential([keras.Input((3,)), keras.layers.Dense(2)])
+        model_path = self.write_model('TSLA_stock_prediction_model.keras')
+        metadata = {'ticker': 'TSLA', 'trained_through': '2024-01-05', 'mode': 'full', 'val_loss': 0.01}
+        entry = register_model(model_path, metadata, model, {'epochs': 3})
+
+        self.assertEqual((entry.ticker, entry.kind, entry.version), ('TSLA', TrainedModel.KIND_MODEL, 1))
+        self.assertEqual(entry.size, 64)
+        self.assertEqual(entry.total_params, 8)
+        self.assertEqual(entry.training, {'epochs': 3})
+        entry.refresh_from_db()
+        self.assertEqual(entry.trained_through, datetime.date(2024, 1, 5))
+
+        entry = register_model(model_path, {**metadata, 'mode': 'incremental'})
+        self.assertEqual((entry.version, entry.mode), (2, 'incremental'))
+        self.assertEqual(TrainedModel.objects.count(), 1)
+
+    def test_model_kind(self):
+        self.assertEqual(model_kind('trained_models/TSLA_stock_prediction_model.keras'), TrainedModel.KIND_MODEL)
+        self.assertEqual(model_kind('trained_models/TSLA_stock_prediction_head.keras'), TrainedModel.KIND_HEAD)
+        self.assertEqual(model_kind('trained_models/shared_encoder.keras'), TrainedModel.KIND_ENCODER)
+
+    def test_current_model_prefers_ticker_model_over_head(self):
+        self.register('shared_encoder.keras', encoder_id='a')
+        head = self.register('TSLA_stock_prediction_head.keras', ticker='TSLA', encoder_id='a')
+        self.assertEqual(current_model('TSLA'), head)
+        model = self.register('TSLA_stock_prediction_model.keras', ticker='TSLA')
+        self.assertEqual(current_model('TSLA'), model)
+        self.assertIsNone(current_model('AAPL'))
+
+    def test_head_is_only_served_on_current_encoder(self):
+        self.register('shared_encoder.keras', encoder_id='a')
+        head = self.register('TSLA_stock_prediction_head.keras', ticker='TSLA', encoder_id='a')
+        self.assertEqual(current_encoder_id(), 'a')
+        self.assertEqual(current_model('TSLA'), head)
+
+        # Retraining the encoder leaves the head on the old one
+        self.register('shared_encoder.keras', encoder_id='b')
+        self.assertEqual(current_encoder_id(), 'b')
+        self.assertIsNone(current_model('TSLA'))
+
+        self.register('TSLA_stock_prediction_head.keras', ticker='TSLA', encoder_id='b')
+        self.assertEqual(current_model('TSLA'), head)
+
+    def test_sync_directory_registers_unknown_files_and_marks_deleted_ones(self):
+        known = self.register('AAPL_stock_prediction_model.keras', ticker='AAPL')
+        self.write_model('TSLA_stock_prediction_model.keras', {'trained_through': '2024-01-05', 'mode': 'full'})
+        self.write_model('GOOG_stock_prediction_head.keras')
+        self.write_model('notes.keras')
+
+        registered, missing = sync_directory(self.directory)
+        self.assertEqual(sorted(os.path.basename(path) for path in registered),
+                         ['GOOG_stock_prediction_head.keras', 'TSLA_stock_prediction_model.keras'])
+        self.assertEqual(missing, [])
+        # The ticker comes from the file name when the metadata has none
+        self.assertEqual(current_model('TSLA').mode, 'full')
+        self.assertEqual(TrainedModel.objects.get(ticker='GOOG').kind, TrainedModel.KIND_HEAD)
+        self.assertEqual(TrainedModel.objects.get(pk=known.pk).version, 1)
+
+        os.remove(known.path)
+        self.assertEqual(sync_directory(self.directory), ([], [known.path]))
+        self.assertIsNone(current_model('AAPL'))
+
+    def test_resolve_model_skips_deleted_files(self):
+        self.register('shared_encoder.keras', encoder_id='a')
+        head = self.register('ZZTEST_stock_prediction_head.keras', ticker='ZZTEST', encoder_id='a')
+        model = self.register('ZZTEST_stock_prediction_model.keras', ticker='ZZTEST')
+        self.assertEqual(resolve_model('ZZTEST'), (model.path, TrainedModel.KIND_MODEL))
+
+        os.remove(model.path)
+        self.assertEqual(resolve_model('ZZTEST'), (head.path, TrainedModel.KIND_HEAD))
+        self.assertEqual(TrainedModel.objects.get(pk=model.pk).status, TrainedModel.STATUS_MISSING)
+
+        # A head is no use without its encoder
+        os.remove(os.path.join(self.directory, 'shared_encoder.keras'))
+        self.assertIsNone(resolve_model('ZZTEST')[1])
+        self.assertEqual(TrainedModel.objects.get(kind=TrainedModel.KIND_ENCODER).status, TrainedModel.STATUS_MISSING)
+
+
+class SaveBundleTests(SimpleTestCase):
+    """save_bundle never exposes new weights next to the old scaler"""
+
+    def test_metadata_is_replaced_before_model(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        model_path = os.path.join(directory, 'TSLA_stock_prediction_model.keras')
+        model = keras.Sequential([keras.Input((3,)), keras.layers.Dense(1)])
+
+        with mock.patch('api.model_bundle.os.replace', wraps=os.replace) as replace:
+            save_bundle(model_path, model, {'ticker': 'TSLA'})
+        self.assertEqual([os.path.basename(call.args[1]) for call in replace.call_args_list],
+                         ['TSLA_stock_prediction_model.json', 'TSLA_stock_prediction_model.keras'])
+        # Temporary files are per process and cleaned up
+        self.assertTrue(all(str(os.getpid()) in call.args[0] for call in replace.call_args_list))
+        self.assertEqual(sorted(os.listdir(directory)),
+                         ['TSLA_stock_prediction_model.json', 'TSLA_stock_prediction_model.keras'])
+        self.assertEqual(load_metadata(model_path), {'ticker': 'TSLA'})
+
+
+def small_model(inputs=3, units=1):
+    return keras.Sequential([keras.Input((inputs,)), keras.layers.Dense(units)])
+
+
+class ModelRegistryTests(TestCase):
+    """The registry shares loaded models and keeps them within budget"""
+
+    def setUp(self):
+        self.directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.registry = ModelRegistry(max_models=2, max_bytes=1 << 20)
+
+    def save(self, filename, model=None, metadata=None):
+        model_path = os.path.join(self.directory, filename)
+        save_bundle(model_path, model or small_model(), metadata or {})
+        return model_path
+
+    def loaded(self):
+        return [os.path.basename(path) for path in self.registry.stats()['models']]
+
+    def bump_mtimes(self, model_path):
+        # Filesystems with coarse timestamps may not tell quick rewrites apart
+        for path in (model_path, metadata_path(model_path)):
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def test_least_recently_used_model_is_evicted(self):
+        a, b, c = (self.save(f'{name}_stock_prediction_model.keras') for name in 'ABC')
+        bundle = self.registry.get_bundle(a)
+        self.registry.get_bundle(b)
+        self.assertIs(self.registry.get_bundle(a), bundle)
+        self.registry.get_bundle(c)
+        self.assertEqual(self.loaded(), ['A_stock_prediction_model.keras', 'C_stock_prediction_model.keras'])
+
+    def test_byte_budget_evicts_but_keeps_newest(self):
+        small = self.save('A_stock_prediction_model.keras', small_model(3, 1))
+        large = self.save('B_stock_prediction_model.keras', small_model(64, 64))
+        self.registry.max_bytes = 1024
+        self.registry.get_bundle(small)
+        self.registry.get_bundle(large)
+        # Over budget on its own (64 * 65 float32 weights), but still served
+        self.assertEqual(self.loaded(), ['B_stock_prediction_model.keras'])
+        self.assertEqual(self.registry.stats()['bytes'], 64 * 65 * 4)
+
+    def test_model_reloaded_when_files_change(self):
+        model_path = self.save('A_stock_prediction_model.keras', metadata={'lookback': 3})
+        bundle = self.registry.get_bundle(model_path)
+        self.assertIs(self.registry.get_bundle(model_path), bundle)
+
+        retrained = small_model()
+        self.save('A_stock_prediction_model.keras', retrained, {'lookback': 3})
+        self.bump_mtimes(model_path)
+        reloaded = self.registry.get_bundle(model_path)
+        self.assertIsNot(reloaded, bundle)
+        for weight, expected in zip(reloaded.model.get_weights(), retrained.get_weights()):
+            np.testing.assert_array_equal(weight, expected)
+
+        # Metadata alone (e.g. a new scaler) also counts as a new version
+        with open(metadata_path(model_path), 'w') as f:
+            json.dump({'lookback': 5}, f)
+        self.bump_mtimes(model_path)
+        self.assertEqual(self.registry.get_bundle(model_path).lookback, 5)
+        self.assertEqual(self.registry.stats()['count'], 1)
+
+    def test_tickers_without_models_share_default_entry(self):
+        default = self.save('stock_prediction_model.keras')
+        with mock.patch('api.model_registry.TRAINED_MODELS_DIR', self.directory):
+            paths = {ticker: self.registry.resolve(ticker) for ticker in ('ZZA', 'ZZB', 'ZZC')}
+        self.assertEqual(set(paths.values()), {(default, None)})
+        bundles = {self.registry.get_bundle(path) for path, _ in paths.values()}
+        self.assertEqual(len(bundles), 1)
+        self.assertEqual(self.registry.stats()['count'], 1)
+
+    def test_heads_are_composed_on_one_shared_encoder(self):
+        encoder = keras.Sequential([keras.Input((5, 1)), keras.layers.Flatten(), keras.layers.Dense(3)])
+        self.save('shared_encoder.keras', encoder)
+        heads = {ticker: self.save(f'{ticker}_stock_prediction_head.keras', small_model(3, 1)) for ticker in 'XY'}
+        self.registry.max_models = 8
+
+        models = {ticker: self.registry.get_model(path) for ticker, path in heads.items()}
+        shared = self.registry.get_model(os.path.join(self.directory, 'shared_encoder.keras'))
+        self.assertIs(models['X'].layers[0], shared)
+        self.assertIs(models['Y'].layers[0], shared)
+        self.assertEqual(self.registry.stats()['count'], 3)
+
+        x = np.random.default_rng(0).random((4, 5, 1)).astype(np.float32)
+        head = keras.models.load_model(heads['X'])
+        np.testing.assert_allclose(models['X'].predict(x, verbose=0),
+                                   head.predict(encoder.predict(x, verbose=0), verbose=0), rtol=1e-5)
+
+
+class StoredScalerTests(SimpleTestCase):
+    """Forecasts scale prices with the scaler stored at training time"""
+
+    def setUp(self):
+        # A steady climb, so the test period lies above the training range
+        self.df = pd.DataFrame({'Close': 100 + 0.5 * np.arange(600, dtype=float)})
+        self.training_len = int(len(self.df) * 0.7)
+        training_closes = self.df[['Close']].to_numpy()[:self.training_len]
+        fitted = MinMaxScaler().fit(training_closes)
+        self.metadata = {'lookback': LOOKBACK, 'scaler': scaler_params(fitted)}
+
+    def test_make_scaler_restores_fitted_scaler(self):
+        scaler = make_scaler(self.metadata['scaler']['data_min'], self.metadata['scaler']['data_max'])
+        self.assertEqual(scaler_params(scaler), self.metadata['scaler'])
+
+    def test_stored_scaler_is_used_as_is(self):
+        bundle = ModelBundle(small_model(), self.metadata)
+        x_test, y_test, scaler, training_len = prepare_test_data(self.df, bundle)
+        self.assertIs(scaler, bundle.scaler)
+        self.assertEqual(training_len, self.training_len)
+        self.assertEqual(scaler_params(scaler), self.metadata['scaler'])
+        # Not refitted on the test data: prices past the training range scale above 1
+        self.assertGreater(y_test.max(), 1.4)
+        np.testing.assert_allclose(scaler.inverse_transform(y_test.reshape(-1, 1)).ravel(), self.df.Close.to_numpy()[training_len:])
+
+        x, next_day_scaler = prepare_next_day_window(self.df, bundle)
+        self.assertIs(next_day_scaler, bundle.scaler)
+        np.testing.assert_allclose(scaler.inverse_transform(x.reshape(-1, 1)).ravel(), self.df.Close.to_numpy()[-LOOKBACK:])
+
+    def test_legacy_bundle_fits_scaler_on_test_data(self):
+        # Models saved without metadata, like the default model
+        bundle = ModelBundle(small_model())
+        self.assertIsNone(bundle.scaler)
+        x_test, y_test, scaler, training_len = prepare_test_data(self.df, bundle)
+        test_closes = self.df.Close.to_numpy()[training_len - LOOKBACK:]
+        self.assertEqual(scaler.data_min_[0], test_closes.min())
+        self.assertEqual(scaler.data_max_[0], test_closes.max())
+        self.assertAlmostEqual(x_test.min(), 0.0)
+        self.assertAlmostEqual(y_test.max(), 1.0)
+
+    def test_predict_test_period_unscales_with_stored_scaler(self):
+        # Predicts the last close of each window, so predictions are the previous day's close
+        model = keras.Sequential([keras.Input((LOOKBACK, 1)), keras.layers.Flatten(), keras.layers.Dense(1)])
+        weights = np.zeros((LOOKBACK, 1), dtype=np.float32)
+        weights[-1] = 1
+        model.layers[-1].set_weights([weights, np.zeros(1, dtype=np.float32)])
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        model_path = os.path.join(directory, 'TSLA_stock_prediction_model.keras')
+        save_bundle(model_path, model, self.metadata)
+
+        y_test, y_predicted, training_len, lookback = predict_test_period(self.df, model_path)
+        closes = self.df.Close.to_numpy()
+        np.testing.assert_allclose(y_test, closes[training_len:])
+        np.testing.assert_allclose(y_predicted, closes[training_len - 1:-1], rtol=1e-5)
+        self.assertEqual(lookback, LOOKBACK)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ForecastStreamTests(SimpleTestCase):
+    """Concurrent stream requests share one forecast computation"""
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        df = price_history(600).set_index('Date')
+        for target, value in (('get_history', df), ('get_model_path', 'model.keras'), ('data_version', 'v1')):
+            self.enterContext(mock.patch(f'api.streaming.{target}', return_value=value))
+        self.enterContext(mock.patch('api.streaming.run_forecast', self.run_forecast))
+
+    def run_forecast(self, ticker, df, model_path, investment_amount, on_metrics=None):
+        self.calls += 1
+        metrics = {'status': 'success', 'ticker': ticker, 'model_performance': {'mse': 1.0}}
+        if on_metrics is not None:
+            on_metrics(metrics)
+        time.sleep(0.2)
+        return {**metrics, 'plot_prediction': '/prediction.png', 'chart_data': {}}
+
+    async def events(self):
+        return [(event, data) async for event, data in forecast_events('TSLA', 1000.0)]
+
+    def test_concurrent_streams_compute_once(self):
+        async def both():
+            return await asyncio.gather(self.events(), self.events())
+
+        for events in asyncio.run(both()) + [asyncio.run(self.events())]:
+            self.assertEqual([event for event, _ in events], ['metrics', 'charts', 'done'])
+            self.assertEqual(events[0][1]['model_performance'], {'mse': 1.0})
+            self.assertEqual(events[1][1], {'ticker': 'TSLA', 'chart_data': {}, 'plot_prediction': '/prediction.png'})
+        self.assertEqual(self.calls, 1)
+
+    def test_short_history_is_an_error_event(self):
+        with mock.patch('api.streaming.get_history', return_value=price_history(50).set_index('Date')):
+            events = asyncio.run(self.events())
+        self.assertEqual(events, [('error', {'ticker': 'TSLA', 'error': 'Not enough price history for a prediction.'})])
+        self.assertEqual(self.calls, 0)
+
+
+class ChartCleanupTests(SimpleTestCase):
+    """Publishing a new chart version removes the superseded ones"""
+
+    def setUp(self):
+        self.media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root, CHART_RETENTION_SECONDS=60))
+
+    def publish(self, version):
+        series = np.arange(10, dtype=float)
+        return publish_charts('TSLA', version, series, series, series, series[:4], series[:4])
+
+    def versions(self):
+        return sorted(os.listdir(os.path.join(self.media_root, 'charts', 'TSLA')))
+
+    def age(self, version, seconds):
+        path = os.path.join(self.media_root, 'charts', 'TSLA', version)
+        os.utime(path, (time.time() - seconds, time.time() - seconds))
+
+    def test_old_versions_are_removed_on_publish(self):
+        self.publish('aaa')
+        self.publish('bbb')
+        self.assertEqual(self.versions(), ['aaa', 'bbb'])
+
+        # bbb was published recently, so clients may still fetch its charts
+        self.age('aaa', 120)
+        self.publish('ccc')
+        self.assertEqual(self.versions(), ['bbb', 'ccc'])
+        self.assertIsNone(get_chart('TSLA', 'aaa', 'prediction'))
+
+        # Republishing the current version leaves the others alone
+        self.age('bbb', 120)
+        self.publish('ccc')
+        self.assertEqual(self.versions(), ['bbb', 'ccc'])
+        self.publish('ddd')
+        self.assertEqual(self.versions(), ['ccc', 'ddd'])
+        self.assertTrue(get_chart('TSLA', 'ddd', 'prediction').endswith('prediction.png'))
@@ -0,0 +1,250 @@
+import bisect
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+# Upper bounds in seconds; training stages can take minutes
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STAGE_METRIC = 'stock_prediction_stage_seconds'
+REQUEST_METRIC = 'stock_prediction_request_seconds'
+METRIC_HELP = {
+    STAGE_METRIC: 'Duration of forecast and training pipeline stages.',
+    REQUEST_METRIC: 'Duration of API requests by route.',
+}
+METRIC_LABELS = {
+    STAGE_METRIC: 'stage',
+    REQUEST_METRIC: 'route',
+}
+
+# Stages timed during the current request or task, if one is being collected
+_current = ContextVar('timings', default=None)
+
+
+class Timings:
+    """Stage durations collected for one request or task, in the order they finished"""
+
+    def __init__(self):
+        self.stages = []
+        self.start = time.perf_counter()
+
+    def add(self, name, seconds):
+        self.stages.append((name, seconds))
+
+    def as_dict(self):
+        """{stage: milliseconds}; repeated stages are summed"""
+        totals = {}
+        for name, seconds in self.stages:
+            totals[name] = totals.get(name, 0) + seconds * 1000
+        return totals
+
+    def server_timing(self, total):
+        """Server-Timing header value, with total in seconds as the last entry"""
+        entries = [f'{name};dur={ms:.1f}' for name, ms in self.as_dict().items()]
+        entries.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(entries)
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a block as pipeline stage name.
+
+    The duration goes into the stage histogram and, while a request or task
+    is collecting (see collect), into its Timings.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        registry.observe(STAGE_METRIC, name, seconds)
+        timings = _current.get()
+        if timings is not None:
+            timings.add(name, seconds)
+
+
+def timed(name):
+    """Decorator form of stage()"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def collect():
+    """Collect the stages timed inside the block; yields the Timings"""
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def current_timings():
+    """Timings of the request or task being collected, or None"""
+    return _current.get()
+
+
+def collected(name):
+    """
+    Decorator for Celery tasks: collect the task's stages, time the whole
+    run as stage name and flush the metrics registry when it ends, since a
+    worker may not finish another task for a while.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                with collect(), stage(name):
+                    return func(*args, **kwargs)
+            finally:
+                registry.flush(force=True)
+        return wrapper
+    return decorator
+
+
+class MetricsRegistry:
+    """
+    In-process histograms, shared with other processes through the cache.
+
+    Observations only touch local counters. At most every
+    METRICS_FLUSH_SECONDS (or on flush(force=True), e.g. at the end of a
+    Celery task) the process writes its whole snapshot under its own cache
+    key, so the metrics endpoint of any web process can report the web
+    workers and the Celery workers together. Snapshots of processes that
+    stop flushing expire after METRICS_PROCESS_TIMEOUT.
+    """
+
+    PROCESSES_KEY = 'metrics:processes'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (metric, label value) -> [bucket counts..., +Inf count, sum]
+        self._last_flush = 0.0
+        self.process_id = f'{socket.gethostname()}:{os.getpid()}'
+
+    def observe(self, metric, label, seconds):
+        with self._lock:
+            counts = self._histograms.get((metric, label))
+            if counts is None:
+                counts = self._histograms[(metric, label)] = [0] * (len(BUCKETS) + 1) + [0.0]
+            counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+            counts[-1] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(counts) for key, counts in self._histograms.items()}
+
+    def flush(self, force=False):
+        now = time.time()
+        if not force and now - self._last_flush < settings.METRICS_FLUSH_SECONDS:
+            return
+        self._last_flush = now
+        timeout = settings.METRICS_PROCESS_TIMEOUT
+        try:
+            cache.set(self._process_key(self.process_id), self.snapshot(), timeout=timeout)
+            processes = cache.get(self.PROCESSES_KEY) or {}
+            if now - processes.get(self.process_id, 0) > timeout / 2:
+                processes = {pid: seen for pid, seen in processes.items() if now - seen < timeout}
+                processes[self.process_id] = now
+                cache.set(self.PROCESSES_KEY, processes, timeout=None)
+        except Exception:
+            # Metrics must never fail a request or a training run
+            pass
+
+    def merged(self):
+        """Histograms summed over every process that flushed recently, this one live"""
+        processes = cache.get(self.PROCESSES_KEY) or {}
+        keys = [self._process_key(pid) for pid in processes if pid != self.process_id]
+        snapshots = list(cache.get_many(keys).values()) + [self.snapshot()]
+        merged = {}
+        for snapshot in snapshots:
+            for key, counts in snapshot.items():
+                total = merged.setdefault(key, [0] * len(counts))
+                for i, value in enumerate(counts):
+                    total[i] += value
+        return merged
+
+    def render(self):
+        """Prometheus text exposition format"""
+        merged = self.merged()
+        lines = []
+        for metric, help_text in METRIC_HELP.items():
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} histogram')
+            label = METRIC_LABELS[metric]
+            for (name, value), counts in sorted(merged.items()):
+                if name != metric:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), counts[:-1]):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{label}="{value}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{label}="{value}"}} {counts[-1]}')
+                lines.append(f'{metric}_count{{{label}="{value}"}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _process_key(process_id):
+        return f'metrics:process:{process_id}'
+
+
+registry = MetricsRegistry()
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint"""
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class ServerTimingMiddleware:
+    """
+    Collect stage timings for every request, report them in a Server-Timing
+    header and record the request duration by route.
+
+    Streaming responses send their headers before the body runs, so they
+    only carry the stages timed before the response was returned.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect() as timings:
+            response = self.get_response(request)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        with collect() as timings:
+            response = await self.get_response(request)
+        return self._finish(request, response, timings)
+
+    def _finish(self, request, response, timings):
+        total = time.perf_counter() - timings.start
+        response['Server-Timing'] = timings.server_timing(total)
+        match = getattr(request, 'resolver_match', None)
+        route = (match.url_name or match.view_name) if match else 'unmatched'
+        registry.observe(REQUEST_METRIC, route, total)
+        registry.flush()
+        return response
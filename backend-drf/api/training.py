@@ -0,0 +1,424 @@
+import os
+import time
+import uuid
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from django.conf import settings
+from sklearn.preprocessing import MinMaxScaler
+from tensorflow.keras.callbacks import Callback, EarlyStopping
+from tensorflow.keras.layers import Dense, LSTM, Input
+from tensorflow.keras.models import Sequential, load_model
+from tensorflow.keras.optimizers import Adam
+from .model_registry import model_registry
+from .model_bundle import load_metadata, make_scaler, scaler_params
+from .windowing import LOOKBACK, make_windows
+
+# Share of the history used for training; the rest is the validation period
+TRAINING_SPLIT = 0.70
+# Years of price history a model is trained on
+TRAINING_YEARS = 4
+
+
+def training_range():
+    """(start, end) of the history a training run downloads"""
+    now = datetime.now()
+    return datetime(now.year - TRAINING_YEARS, now.month, now.day), now
+
+
+# Fields TrainingProgressCallback publishes besides progress/message
+TRAINING_PROGRESS_FIELDS = (
+    'current_epoch', 'total_epochs', 'batch', 'steps', 'loss', 'val_loss',
+    'samples_per_sec', 'epoch_seconds', 'elapsed_seconds', 'eta_seconds',
+)
+
+
+class TrainingProgressCallback(Callback):
+    """
+    Publish structured training progress while model.fit runs with verbose=0.
+
+    publish(meta) is called after every epoch and, at most once per
+    batch_interval seconds, during an epoch (0 disables batch updates).
+    meta carries loss, throughput in samples/sec, elapsed time and ETA.
+    """
+
+    def __init__(self, publish, epochs, samples, batch_size, batch_interval=None):
+        super().__init__()
+        self.publish = publish
+        self.epochs = epochs
+        self.samples = samples
+        self.batch_size = batch_size
+        if batch_interval is None:
+            batch_interval = settings.TRAINING_PROGRESS_BATCH_INTERVAL
+        self.batch_interval = batch_interval
+        self.epoch_seconds = []
+
+    def on_train_begin(self, logs=None):
+        self.train_start = time.monotonic()
+        self.last_publish = self.train_start
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch = epoch
+        self.epoch_start = time.monotonic()
+
+    def on_train_batch_end(self, batch, logs=None):
+        if not self.batch_interval:
+            return
+        now = time.monotonic()
+        if now - self.last_publish < self.batch_interval:
+            return
+        steps = self.params.get('steps') or 1
+        epoch_elapsed = now - self.epoch_start
+        seen = min((batch + 1) * self.batch_size, self.samples)
+        epochs_done = self.epoch + (batch + 1) / steps
+        self._publish(now, epochs_done, {
+            'current_epoch': self.epoch + 1,
+            'batch': batch + 1,
+            'steps': steps,
+            'loss': _float(logs, 'loss'),
+            'samples_per_sec': seen / epoch_elapsed if epoch_elapsed > 0 else None,
+        }, f'Epoch {self.epoch + 1}/{self.epochs}, batch {batch + 1}/{steps}')
+
+    def on_epoch_end(self, epoch, logs=None):
+        now = time.monotonic()
+        epoch_seconds = now - self.epoch_start
+        self.epoch_seconds.append(epoch_seconds)
+        self._publish(now, epoch + 1, {
+            'current_epoch': epoch + 1,
+            'loss': _float(logs, 'loss'),
+            'val_loss': _float(logs, 'val_loss'),
+            'samples_per_sec': self.samples / epoch_seconds if epoch_seconds > 0 else None,
+            'epoch_seconds': epoch_seconds,
+        }, f'Epoch {epoch + 1}/{self.epochs}')
+
+    def _publish(self, now, epochs_done, meta, message):
+        self.last_publish = now
+        elapsed = now - self.train_start
+        self.publish({
+            **meta,
+            'total_epochs': self.epochs,
+            'progress': int((epochs_done / self.epochs) * 100),
+            'message': message,
+            'elapsed_seconds': elapsed,
+            'eta_seconds': elapsed / epochs_done * (self.epochs - epochs_done) if epochs_done else None,
+        })
+
+
+def _float(logs, key):
+    value = (logs or {}).get(key)
+    return None if value is None else float(value)
+
+
+# The old fixed loop trained with batch_size=16 at Adam's default learning rate;
+# larger batches scale the rate up from there
+BASE_BATCH_SIZE = 16
+BASE_LEARNING_RATE = 1e-3
+
+
+def scaled_learning_rate(batch_size, scaling=None):
+    """Learning rate for batch_size under 'linear', 'sqrt' or 'none' scaling"""
+    scaling = scaling or settings.TRAINING_LR_SCALING
+    ratio = batch_size / BASE_BATCH_SIZE
+    if scaling == 'linear':
+        return BASE_LEARNING_RATE * ratio
+    if scaling == 'sqrt':
+        return BASE_LEARNING_RATE * ratio ** 0.5
+    return BASE_LEARNING_RATE
+
+
+def new_optimizer():
+    """Adam at the rate scaled for TRAINING_BATCH_SIZE, for models trained from scratch"""
+    return Adam(learning_rate=scaled_learning_rate(settings.TRAINING_BATCH_SIZE))
+
+
+def make_dataset(x, y, batch_size, shuffle=False, seed=None):
+    """
+    tf.data pipeline over in-memory windows.
+
+    x and y are copied into tensors once; the dataset itself only shuffles
+    and batches row indices, and each batch is gathered in-graph, so no
+    per-sample Python work happens between steps. Batches are prefetched
+    while the previous step trains.
+    """
+    x = tf.constant(np.asarray(x, dtype=np.float32))
+    y = tf.constant(np.asarray(y, dtype=np.float32))
+    dataset = tf.data.Dataset.range(len(y))
+    if shuffle:
+        dataset = dataset.shuffle(len(y), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size).map(
+        lambda index: (tf.gather(x, index), tf.gather(y, index)),
+        num_parallel_calls=tf.data.AUTOTUNE,
+    )
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def fit_pipeline(model, x, y, max_epochs, publish=None, batch_size=None, validation_split=None, patience=None,
+                 learning_rate=None):
+    """
+    Train model on (x, y) through make_dataset with early stopping.
+
+    The last validation_split of the windows (the most recent ones, as the
+    callers order them chronologically) is held out; training stops once
+    its loss has not improved for patience epochs and the best weights are
+    restored. With too few windows to hold any out, all max_epochs run.
+    publish receives TrainingProgressCallback updates. The model trains at
+    its optimizer's current rate (new_optimizer() for fresh models, the
+    saved rate for warm starts) unless learning_rate is given. Returns a
+    summary with the wall-clock time of every epoch.
+    """
+    batch_size = batch_size or settings.TRAINING_BATCH_SIZE
+    if validation_split is None:
+        validation_split = settings.TRAINING_VALIDATION_SPLIT
+    patience = patience or settings.TRAINING_EARLY_STOPPING_PATIENCE
+
+    val_size = int(len(y) * validation_split)
+    train_size = len(y) - val_size
+    if learning_rate is not None:
+        model.optimizer.learning_rate = learning_rate
+    learning_rate = float(model.optimizer.learning_rate)
+
+    progress = TrainingProgressCallback(publish or (lambda meta: None), max_epochs, train_size,
+                                        batch_size, batch_interval=None if publish else 0)
+    callbacks = [progress]
+    validation = None
+    if val_size:
+        validation = make_dataset(x[train_size:], y[train_size:], batch_size)
+        callbacks.append(EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True))
+
+    history = model.fit(
+        make_dataset(x[:train_size], y[:train_size], batch_size, shuffle=True),
+        validation_data=validation,
+        epochs=max_epochs,
+        shuffle=False,  # make_dataset already reshuffles every epoch
+        verbose=0,
+        callbacks=callbacks,
+    )
+    val_losses = history.history.get('val_loss')
+    epoch_seconds = progress.epoch_seconds
+    return {
+        'epochs': len(history.epoch),
+        'max_epochs': max_epochs,
+        'stopped_early': len(history.epoch) < max_epochs,
+        'best_val_loss': float(min(val_losses)) if val_losses else None,
+        'batch_size': batch_size,
+        'learning_rate': learning_rate,
+        'train_windows': train_size,
+        'val_windows': val_size,
+        'epoch_seconds': epoch_seconds,
+        'mean_epoch_seconds': float(np.mean(epoch_seconds)) if epoch_seconds else None,
+        'samples_per_sec': train_size * len(epoch_seconds) / sum(epoch_seconds) if epoch_seconds else None,
+    }
+
+
+class FullRetrainRequired(Exception):
+    """Raised when an incremental update can't safely reuse the existing model"""
+
+
+def build_model(lookback=LOOKBACK):
+    """The 3-layer LSTM used for per-ticker models"""
+    model = Sequential()
+    model.add(Input(shape=(lookback, 1)))
+    model.add(LSTM(units=128, activation='tanh', return_sequences=True))
+    model.add(LSTM(64, return_sequences=True))
+    model.add(LSTM(32))
+    model.add(Dense(25))
+    model.add(Dense(1))
+
+    model.compile(loss='mean_squared_error', optimizer=new_optimizer())
+    return model
+
+
+def build_encoder(lookback=LOOKBACK):
+    """The LSTM stack of build_model without the dense layers, shared across tickers"""
+    encoder = Sequential()
+    encoder.add(Input(shape=(lookback, 1)))
+    encoder.add(LSTM(units=128, activation='tanh', return_sequences=True))
+    encoder.add(LSTM(64, return_sequences=True))
+    encoder.add(LSTM(32))
+    return encoder
+
+
+def build_head(features=32):
+    """The dense layers of build_model, fitted per ticker on encoder outputs"""
+    head = Sequential()
+    head.add(Input(shape=(features,)))
+    head.add(Dense(25))
+    head.add(Dense(1))
+
+    head.compile(loss='mean_squared_error', optimizer=new_optimizer())
+    return head
+
+
+def train_full(df, fit, epochs):
+    """
+    Train a new model from scratch on the first 70% of df.
+
+    df is a reset-index price history, fit(model, x, y, epochs) runs the
+    actual training. Returns (model, metadata); the validation loss on the
+    remaining 30% becomes the baseline for later incremental updates.
+    """
+    split = int(len(df) * TRAINING_SPLIT)
+    data_training = pd.DataFrame(df['Close'][0:split])
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    data_training_array = scaler.fit_transform(data_training)
+
+    x_train, y_train = make_windows(data_training_array)
+    model = build_model(x_train.shape[1])
+    fit(model, x_train, y_train, epochs)
+
+    # Windows whose target falls after the training period
+    x_all, y_all = make_windows(scaler.transform(pd.DataFrame(df['Close'])))
+    x_val, y_val = x_all[split - LOOKBACK:], y_all[split - LOOKBACK:]
+    val_loss = float(model.evaluate(x_val, y_val, verbose=0)) if len(x_val) else None
+
+    metadata = {
+        'lookback': LOOKBACK,
+        'scaler': scaler_params(scaler),
+        'trained_from': df.Date.iloc[0].strftime('%Y-%m-%d'),
+        'trained_through': df.Date.iloc[split - 1].strftime('%Y-%m-%d'),
+        # Last bar the model has seen, including the validation period
+        'data_through': df.Date.iloc[-1].strftime('%Y-%m-%d'),
+        'val_loss': val_loss,
+        'mode': 'full',
+    }
+    return model, metadata
+
+
+def train_incremental(df, model_path, metadata, fit, epochs=None):
+    """
+    Fine-tune the existing model on the windows that arrived since its last
+    run (metadata['data_through']), plus a random replay sample of older
+    windows.
+
+    The stored scaler is reused unchanged. Returns (model, metadata), or
+    (None, metadata) when there is nothing new to train on. Raises
+    FullRetrainRequired when there is no usable model, when new prices
+    drift too far outside the scaler range, or when the model's loss on
+    the new windows is too far above its validation baseline.
+    """
+    if metadata is None or not os.path.exists(model_path):
+        raise FullRetrainRequired('No existing model to update')
+
+    lookback = metadata['lookback']
+    scaler = make_scaler(metadata['scaler']['data_min'], metadata['scaler']['data_max'])
+    x_all, y_all = make_windows(scaler.transform(df[['Close']].to_numpy()), lookback)
+    target_dates = df.Date.iloc[lookback:]
+    # Models saved before data_through was recorded only know their training split
+    data_through = metadata.get('data_through', metadata['trained_through'])
+    is_new = (target_dates > pd.Timestamp(data_through)).to_numpy()
+    if not is_new.any():
+        return None, metadata
+
+    # How far the new prices fall outside the [0, 1] range the scaler was fitted on
+    y_new = y_all[is_new]
+    drift = float(max(0.0, -y_new.min(), y_new.max() - 1))
+    if drift > settings.INCREMENTAL_MAX_DRIFT:
+        raise FullRetrainRequired(f'Price drift {drift:.2f} exceeds {settings.INCREMENTAL_MAX_DRIFT}')
+
+    # Load a private copy; the registry's instance may be serving forecasts
+    model = load_model(model_path)
+
+    # Out-of-sample check: the new windows haven't been seen by the model yet
+    new_loss = float(model.evaluate(x_all[is_new], y_new, verbose=0))
+    baseline = metadata.get('val_loss')
+    if baseline and new_loss > settings.INCREMENTAL_MAX_LOSS_RATIO * baseline:
+        raise FullRetrainRequired(
+            f'Loss on new data {new_loss:.6f} exceeds {settings.INCREMENTAL_MAX_LOSS_RATIO}x baseline {baseline:.6f}'
+        )
+
+    new_index = np.flatnonzero(is_new)
+    old_index = np.flatnonzero(~is_new)
+    replay_size = min(len(old_index), int(len(new_index) * settings.INCREMENTAL_REPLAY_RATIO))
+    replay_index = np.random.default_rng().choice(old_index, size=replay_size, replace=False)
+    index = np.concatenate([replay_index, new_index])
+
+    fit(model, x_all[index], y_all[index], epochs or settings.INCREMENTAL_EPOCHS)
+
+    metadata = {
+        **metadata,
+        'trained_through': df.Date.iloc[-1].strftime('%Y-%m-%d'),
+        'data_through': df.Date.iloc[-1].strftime('%Y-%m-%d'),
+        'new_data_loss': new_loss,
+        'new_windows': len(new_index),
+        'replay_windows': replay_size,
+        'mode': 'incremental',
+    }
+    return model, metadata
+
+
+def _training_windows(df):
+    """Scaler fitted on the training split plus the training and validation windows"""
+    split = int(len(df) * TRAINING_SPLIT)
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaler.fit(df[['Close']].to_numpy()[:split])
+    x_all, y_all = make_windows(scaler.transform(df[['Close']].to_numpy()))
+    # Windows whose target falls inside the training period come first
+    train = split - LOOKBACK
+    return scaler, split, (x_all[:train], y_all[:train]), (x_all[train:], y_all[train:])
+
+
+def train_shared_encoder(histories, fit, epochs):
+    """
+    Train one encoder on the windows of many tickers.
+
+    histories maps ticker -> reset-index price history. Each series is
+    scaled with its own training-split scaler, so the encoder learns from
+    shapes rather than price levels. A temporary dense head is trained
+    along with it and discarded. Returns (encoder, metadata).
+    """
+    x_parts, y_parts = [], []
+    for df in histories.values():
+        _, _, (x_train, y_train), _ = _training_windows(df)
+        x_parts.append(x_train)
+        y_parts.append(y_train)
+    x_train, y_train = np.concatenate(x_parts), np.concatenate(y_parts)
+
+    encoder = build_encoder(LOOKBACK)
+    model = Sequential([encoder, build_head(encoder.output_shape[-1])])
+    model.compile(loss='mean_squared_error', optimizer=new_optimizer())
+    fit(model, x_train, y_train, epochs)
+
+    metadata = {
+        'lookback': LOOKBACK,
+        'encoder_id': uuid.uuid4().hex,
+        'tickers': sorted(histories),
+        'windows': len(x_train),
+        'mode': 'shared_encoder',
+    }
+    return encoder, metadata
+
+
+def train_head(df, encoder_path, fit, epochs):
+    """
+    Fit a small per-ticker head on the outputs of the shared encoder.
+
+    The encoder stays frozen, so its outputs are computed once and the head
+    trains on those features alone. Returns (head, metadata); raises
+    FullRetrainRequired when there is no shared encoder yet.
+    """
+    encoder_metadata = load_metadata(encoder_path) if os.path.exists(encoder_path) else None
+    if encoder_metadata is None:
+        raise FullRetrainRequired('No shared encoder to fit a head on')
+
+    encoder = model_registry.get_model(encoder_path)
+    scaler, split, (x_train, y_train), (x_val, y_val) = _training_windows(df)
+    features = encoder.predict(x_train, batch_size=1024, verbose=0)
+    head = build_head(features.shape[-1])
+    fit(head, features, y_train, epochs)
+
+    val_loss = None
+    if len(x_val):
+        val_features = encoder.predict(x_val, batch_size=1024, verbose=0)
+        val_loss = float(head.evaluate(val_features, y_val, verbose=0))
+
+    metadata = {
+        'lookback': LOOKBACK,
+        'scaler': scaler_params(scaler),
+        'trained_from': df.Date.iloc[0].strftime('%Y-%m-%d'),
+        'trained_through': df.Date.iloc[split - 1].strftime('%Y-%m-%d'),
+        'val_loss': val_loss,
+        'encoder_id': encoder_metadata['encoder_id'],
+        'mode': 'head',
+    }
+    return head, metadata
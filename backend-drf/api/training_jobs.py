@@ -0,0 +1,110 @@
+import time
+from celery.result import AsyncResult
+from django.conf import settings
+from django.core.cache import cache
+
+
+def claim_training(ticker, task_id):
+    """
+    Record task_id as the training run in flight for ticker.
+
+    Returns None when the claim succeeded (or task_id already holds it),
+    or the task id of the run that is already training ticker. A record
+    left behind by a run that ended without releasing it (e.g. its worker
+    died) is replaced.
+    """
+    key = _inflight_key(ticker)
+    for _ in range(3):
+        if cache.add(key, task_id, timeout=settings.TRAINING_INFLIGHT_TIMEOUT):
+            return None
+        existing = cache.get(key)
+        if existing is None:
+            # Expired between add and get
+            continue
+        if existing == task_id:
+            return None
+        if not AsyncResult(existing).ready():
+            return existing
+        cache.delete(key)
+    return cache.get(key)
+
+
+def release_training(ticker, task_id):
+    """Drop the in-flight record for ticker if it still belongs to task_id"""
+    key = _inflight_key(ticker)
+    if cache.get(key) == task_id:
+        cache.delete(key)
+
+
+def save_universe(universe_id, record):
+    cache.set(_universe_key(universe_id), record, timeout=settings.TRAINING_UNIVERSE_RECORD_TIMEOUT)
+
+
+def load_universe(universe_id):
+    return cache.get(_universe_key(universe_id))
+
+
+def training_status(task_id):
+    """Status of one train_model_task run in the shape used by the universe report"""
+    task = AsyncResult(task_id)
+    if task.state == 'PROGRESS':
+        info = task.info
+        return {
+            'status': 'in_progress',
+            'progress': info.get('progress', 0),
+            'message': info.get('message'),
+            'elapsed_seconds': info.get('elapsed_seconds'),
+            'eta_seconds': info.get('eta_seconds'),
+        }
+    if task.state == 'SUCCESS':
+        result = task.result
+        if result.get('status') == 'error':
+            return {'status': 'failed', 'progress': 100, 'error': result.get('message')}
+        return {
+            'status': 'completed',
+            'progress': 100,
+            'message': result.get('message'),
+            'mode': result.get('mode'),
+            'elapsed_seconds': result.get('elapsed_time'),
+        }
+    if task.state == 'FAILURE':
+        return {'status': 'failed', 'progress': 100, 'error': str(task.info)}
+    # PENDING, RETRY (waiting for memory) or STARTED
+    return {'status': 'pending', 'progress': 0}
+
+
+def universe_status(universe_id, record):
+    """Aggregate per-ticker training status for a bulk training request"""
+    tickers = {}
+    for ticker, task_id in record['tasks'].items():
+        tickers[ticker] = {'task_id': task_id, **training_status(task_id)}
+    for ticker, task_id in record['already_training'].items():
+        tickers[ticker] = {'task_id': task_id, 'deduplicated': True, **training_status(task_id)}
+
+    counts = {'pending': 0, 'in_progress': 0, 'completed': 0, 'failed': 0}
+    for entry in tickers.values():
+        counts[entry['status']] += 1
+    finished = counts['completed'] + counts['failed']
+
+    return {
+        'universe_id': universe_id,
+        'status': 'completed' if finished == len(tickers) else 'in_progress',
+        'progress': int(sum(entry['progress'] for entry in tickers.values()) / len(tickers)) if tickers else 100,
+        'total': len(tickers),
+        **counts,
+        'elapsed_seconds': time.time() - record['created_at'],
+        'training_seconds': sum(
+            entry['elapsed_seconds'] for entry in tickers.values()
+            if entry['status'] == 'completed' and entry.get('elapsed_seconds')
+        ),
+        'failures': {ticker: entry['error'] for ticker, entry in tickers.items() if entry['status'] == 'failed'},
+        'tickers': tickers,
+    }
+
+
+def _inflight_key(ticker):
+    return f'training:inflight:{ticker}'
+
+
+def _universe_key(universe_id):
+    return f'training:universe:{universe_id}'
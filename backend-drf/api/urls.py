@@ -5,7 +5,8 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 from rest_framework_simplejwt.views import TokenVerifyView
-from .views import StockPredictionAPIView, TrainStockModelAPIView, StockPredictionWithPotentialEarningAPIView, TaskStatusAPIView, TrainedModelsAPIView
+# ML views are imported on first request; see lazy_view
+from .lazy_views import lazy_view
 
 
 urlpatterns = [
@@ -17,12 +18,30 @@ urlpatterns = [
     path('protected-view/', UserViews.protected_view.as_view()),
 
     # Forecast API
-    path('forecast/', StockPredictionWithPotentialEarningAPIView.as_view(), name='stock_prediction'),
+    path('forecast/', lazy_view('StockPredictionWithPotentialEarningAPIView'), name='stock_prediction'),
+    # Batch forecast API (newline-delimited JSON stream)
+    path('forecast/batch/', lazy_view('BatchForecastAPIView'), name='batch_forecast'),
+    # Async streaming forecast APIs (server-sent events or NDJSON; serve with an ASGI server)
+    path('forecast/stream/', lazy_view('ForecastStreamView', is_async=True, events='single'), name='forecast_stream'),
+    path('forecast/batch/stream/', lazy_view('ForecastStreamView', is_async=True, events='batch'), name='batch_forecast_stream'),
+    # Multi-day recursive forecast API
+    path('forecast/horizon/', lazy_view('HorizonForecastAPIView'), name='horizon_forecast'),
+    # Stored rolling indicators (SMA/EMA/RSI/volatility)
+    path('indicators/<str:ticker>/', lazy_view('IndicatorsAPIView'), name='indicators'),
+    # Forecast charts, rendered on first request
+    path('charts/<str:ticker>/<str:version>/<str:chart_type>.png', lazy_view('ChartAPIView'), name='chart'),
+    # Strategy parameter sweep API
+    path('backtest/sweep/', lazy_view('BacktestSweepAPIView'), name='backtest_sweep'),
     # Train model API
-    path('train/', TrainStockModelAPIView.as_view(), name='train_model'),
+    path('train/', lazy_view('TrainStockModelAPIView'), name='train_model'),
+    # Shared encoder + per-ticker heads training API
+    path('train/shared-encoder/', lazy_view('TrainSharedEncoderAPIView'), name='train_shared_encoder'),
+    # Bulk training API
+    path('train/universe/', lazy_view('TrainUniverseAPIView'), name='train_universe'),
+    path('train/universe/<str:universe_id>/', lazy_view('TrainUniverseStatusAPIView'), name='train_universe_status'),
     # Task status API
-    path('task-status/<str:task_id>/', TaskStatusAPIView.as_view(), name='task_status'),
+    path('task-status/<str:task_id>/', lazy_view('TaskStatusAPIView'), name='task_status'),
     # Trained models API
-    path('trained-models/', TrainedModelsAPIView.as_view(), name='trained_models'),
+    path('trained-models/', lazy_view('TrainedModelsAPIView'), name='trained_models'),
 
 ]
@@ -1,40 +1,44 @@
-from django.shortcuts import render
 from rest_framework.views import APIView
-from .serializers import StockPredictionSerializer
+from .serializers import StockPredictionSerializer, ForecastSerializer, TrainModelSerializer, TrainUniverseSerializer, SharedEncoderSerializer, BatchForecastSerializer, HorizonForecastSerializer, BacktestSweepSerializer
 from rest_framework import status
 from rest_framework.response import Response
-from .tasks import train_model_task
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+import json
+from .tasks import train_model_task, train_shared_encoder_task, prefetch_histories_task, backtest_sweep_chunk_task, rank_backtest_sweep_task
+from celery import chain, chord, group
 from celery.result import AsyncResult
-import yfinance as yf
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from datetime import datetime
-import os
+import time
+import uuid
 from django.conf import settings
-from .utils import save_plot
-from sklearn.preprocessing import MinMaxScaler
-from keras.models import load_model
+from django.core.paginator import Paginator
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from .charts import data_version, get_chart
+from .forecasting import (InsufficientHistory, check_history, forecast_charts, history_range, predict_test_period,
+                          run_forecast, run_next_day_forecast, iter_batch_forecasts)
+from .forecast_cache import forecast_cache_key, get_or_compute
+from .horizon import horizon_forecasts
+from .indicators import INDICATORS
+from .model_registry import get_model_path, get_model_info
+from .models import TrainedModel
+from .price_store import get_history
+from .streaming import STREAM_FORMATS, batch_forecast_events, forecast_events, format_event
+from .timing import current_timings, stage
+from .training import TRAINING_PROGRESS_FIELDS
+from .training_jobs import claim_training, release_training, save_universe, load_universe, universe_status
 from sklearn.metrics import mean_squared_error, r2_score
-import tensorflow as tf
-from keras.models import Sequential
-from keras.layers import Dense, LSTM, Input
 
-# Define the trained models directory
-TRAINED_MODELS_DIR = 'trained_models'
 
-def get_model_path(ticker):
-    """Get model path for ticker, fallback to default if not found"""
-    ticker_model = os.path.join(TRAINED_MODELS_DIR, f'{ticker}_stock_prediction_model.keras')
-    default_model = os.path.join(TRAINED_MODELS_DIR, 'stock_prediction_model.keras')
-    return ticker_model if os.path.exists(ticker_model) else default_model
-
-def get_model_info(ticker):
-    """Get model info for display"""
-    ticker_model = os.path.join(TRAINED_MODELS_DIR, f'{ticker}_stock_prediction_model.keras')
-    if os.path.exists(ticker_model):
-        return f"Trained model exists for {ticker}"
-    return f"Trained model doesn't exist for {ticker}, using default trained model"
+def _with_timings(request, result):
+    """Add the request's stage timings (ms) to result when asked for with ?timings=true"""
+    if request.query_params.get('timings', '').lower() not in ('1', 'true'):
+        return result
+    timings = current_timings()
+    return {**result, 'timings': timings.as_dict() if timings else {}}
 
 
 class StockPredictionAPIView(APIView):
@@ -43,354 +47,315 @@ class StockPredictionAPIView(APIView):
         if serializer.is_valid():
             ticker = serializer.validated_data['ticker'].upper()
 
-            # Fetch the data from yfinance
-            now = datetime.now()
-            start = datetime(now.year - 10, now.month, now.day)
-            end = now
-            df = yf.download(ticker, start, end)
+            # Fetch the data from the local price store (refreshed from yfinance)
+            start, end = history_range()
+            with stage('forecast.fetch'):
+                df = get_history(ticker, start, end)
             if df.empty:
                 return Response({"error": "No data found for the given ticker.",
                                  'status': status.HTTP_404_NOT_FOUND})
 
 
             df = df.reset_index()
-            # Generate Basic Plot
-            plt.switch_backend('AGG')
-            plt.figure(figsize=(12, 5))
-            plt.plot(df.Close, label='Closing Price')
-            plt.title(f'Closing price of {ticker}')
-            plt.xlabel('Days')
-            plt.ylabel('Price')
-            plt.legend()
-            # Save the plot to a file
-            plot_img_path = f'{ticker}_plot.png'
-            plot_img = save_plot(plot_img_path)
-
-            # 100 Days moving average
-            ma100 = df.Close.rolling(100).mean()
-            plt.switch_backend('AGG')
-            plt.figure(figsize=(12, 5))
-            plt.plot(df.Close, label='Closing Price')
-            plt.plot(ma100, 'r', label='100 DMA')
-            plt.title(f'100 Days Moving Average of {ticker}')
-            plt.xlabel('Days')
-            plt.ylabel('Price')
-            plt.legend()
-            plot_img_path = f'{ticker}_100_dma.png'
-            plot_100_dma = save_plot(plot_img_path)
-
-            # 200 Days moving average
-            ma200 = df.Close.rolling(200).mean()
-            plt.switch_backend('AGG')
-            plt.figure(figsize=(12, 5))
-            plt.plot(df.Close, label='Closing Price')
-            plt.plot(ma100, 'r', label='100 DMA')
-            plt.plot(ma200, 'g', label='200 DMA')
-            plt.title(f'200 Days Moving Average of {ticker}')
-            plt.xlabel('Days')
-            plt.ylabel('Price')
-            plt.legend()
-            plot_img_path = f'{ticker}_200_dma.png'
-            plot_200_dma = save_plot(plot_img_path)
-
-            # Splitting data into Training & Testing datasets
-            data_training = pd.DataFrame(df.Close[0:int(len(df) * 0.7)])
-            data_testing = pd.DataFrame(df.Close[int(len(df) * 0.7): int(len(df))])
-
-            # Scaling down the data between 0 and 1
-            scaler = MinMaxScaler(feature_range=(0, 1))
-
-            # Load ML Model
-            model = load_model(get_model_path(ticker))
-
-            # Preparing Test Data
-            past_100_days = data_training.tail(100)
-            final_df = pd.concat([past_100_days, data_testing], ignore_index=True)
-            input_data = scaler.fit_transform(final_df)
-
-            x_test = []
-            y_test = []
-            for i in range(100, input_data.shape[0]):
-                x_test.append(input_data[i - 100: i])
-                y_test.append(input_data[i, 0])
-            x_test, y_test = np.array(x_test), np.array(y_test)
-
-            # Making Predictions
-            y_predicted = model.predict(x_test)
-
-            # Revert the scaled prices to original price
-            y_predicted = scaler.inverse_transform(y_predicted.reshape(-1, 1)).flatten()
-            y_test = scaler.inverse_transform(y_test.reshape(-1, 1)).flatten()
-
-            # Plot the final prediction
-            plt.switch_backend('AGG')
-            plt.figure(figsize=(12, 5))
-            plt.plot(y_test, 'b', label='Original Price')
-            plt.plot(y_predicted, 'r', label='Predicted Price')
-            plt.title(f'Final Prediction for {ticker}')
-            plt.xlabel('Days')
-            plt.ylabel('Price')
-            plt.legend()
-            plot_img_path = f'{ticker}_final_prediction.png'
-            plot_prediction = save_plot(plot_img_path)
+            try:
+                check_history(df)
+            except InsufficientHistory as e:
+                return Response({'error': str(e), 'status': status.HTTP_400_BAD_REQUEST},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            # Predict with the model and the scaler it was trained with
+            model_path = get_model_path(ticker)
+            y_test, y_predicted, _, _ = predict_test_period(df, model_path)
+            chart_urls, chart_data = forecast_charts(ticker, df, model_path, y_test, y_predicted)
 
             # Model Evaluation
-            # Mean Squared Error (MSE)
-            mse = mean_squared_error(y_test, y_predicted)
+            with stage('forecast.evaluate'):
+                # Mean Squared Error (MSE)
+                mse = mean_squared_error(y_test, y_predicted)
 
-            # Root Mean Squared Error (RMSE)
-            rmse = np.sqrt(mse)
+                # Root Mean Squared Error (RMSE)
+                rmse = np.sqrt(mse)
 
-            # R-Squared
-            r2 = r2_score(y_test, y_predicted)
+                # R-Squared
+                r2 = r2_score(y_test, y_predicted)
 
-            return Response({
+            return Response(_with_timings(request, {
                 'status': 'success',
                 'model_info': get_model_info(ticker),
-                'plot_img': plot_img,
-                'plot_100_dma': plot_100_dma,
-                'plot_200_dma': plot_200_dma,
-                'plot_prediction': plot_prediction,
+                **chart_urls,
+                'chart_data': chart_data,
                 'model_performance': {
                     'mse': mse,
                     'rmse': rmse,
                     'r2': r2
                 },
-            })
+            }))
         
 class TrainStockModelAPIView(APIView):
     def post(self, request):
-        serializer = StockPredictionSerializer(data=request.data)
+        serializer = TrainModelSerializer(data=request.data)
         if serializer.is_valid():
             ticker = serializer.validated_data['ticker'].upper()
+            mode = serializer.validated_data['mode']
             
+            # A duplicate request gets the task already training this ticker
+            task_id = str(uuid.uuid4())
+            existing = claim_training(ticker, task_id)
+            if existing:
+                return Response({
+                    'status': 'already_training',
+                    'task_id': existing,
+                    'ticker': ticker,
+                    'mode': mode,
+                    'message': f'Model training for {ticker} is already in progress. Use task_id to check progress.'
+                })
+
             # Start async training task
-            task = train_model_task.delay(ticker)
+            try:
+                task = train_model_task.apply_async((ticker, mode), task_id=task_id)
+            except Exception:
+                release_training(ticker, task_id)
+                raise
             
             return Response({
                 'status': 'training_started',
                 'task_id': task.id,
                 'ticker': ticker,
+                'mode': mode,
                 'message': f'Model training started for {ticker}. Use task_id to check progress.'
             })
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class TrainUniverseAPIView(APIView):
+    def post(self, request):
+        """Start training for a list of tickers, skipping ones already training"""
+        serializer = TrainUniverseSerializer(data=request.data)
+        if serializer.is_valid():
+            tickers = list(dict.fromkeys(ticker.upper() for ticker in serializer.validated_data['tickers']))
+            mode = serializer.validated_data['mode']
+
+            tasks = {}
+            already_training = {}
+            for ticker in tickers:
+                task_id = str(uuid.uuid4())
+                existing = claim_training(ticker, task_id)
+                if existing:
+                    already_training[ticker] = existing
+                else:
+                    tasks[ticker] = task_id
+
+            if tasks:
+                # One batched history download, then every ticker trains in parallel
+                try:
+                    chain(
+                        prefetch_histories_task.si(list(tasks)),
+                        group(train_model_task.si(ticker, mode).set(task_id=task_id)
+                              for ticker, task_id in tasks.items()),
+                    ).apply_async()
+                except Exception:
+                    for ticker, task_id in tasks.items():
+                        release_training(ticker, task_id)
+                    raise
+
+            universe_id = str(uuid.uuid4())
+            save_universe(universe_id, {
+                'tasks': tasks,
+                'already_training': already_training,
+                'mode': mode,
+                'created_at': time.time(),
+            })
+            return Response({
+                'status': 'training_started',
+                'universe_id': universe_id,
+                'tickers': list(tasks),
+                'already_training': already_training,
+                'mode': mode,
+                'message': f'Training started for {len(tasks)} tickers. Use universe_id to check progress.'
+            })
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class TrainSharedEncoderAPIView(APIView):
+    def post(self, request):
+        """Start training the shared encoder and per-ticker heads for a list of tickers"""
+        serializer = SharedEncoderSerializer(data=request.data)
+        if serializer.is_valid():
+            tickers = list(dict.fromkeys(ticker.upper() for ticker in serializer.validated_data['tickers']))
+            task = train_shared_encoder_task.delay(tickers)
+            return Response({
+                'status': 'training_started',
+                'task_id': task.id,
+                'tickers': tickers,
+                'message': f'Shared encoder training started for {len(tickers)} tickers. Use task_id to check progress.'
+            })
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class TrainUniverseStatusAPIView(APIView):
+    def get(self, request, universe_id):
+        """Aggregate progress, timing and failures of a bulk training request"""
+        record = load_universe(universe_id)
+        if record is None:
+            return Response({'error': 'Unknown universe_id'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(universe_status(universe_id, record))
+
+
 class StockPredictionWithPotentialEarningAPIView(APIView):
+    # ?mode=next_day returns only the next-bar prediction and recommendation
+    FORECAST_MODES = ('full', 'next_day')
+
     def post(self, request):
-        serializer = StockPredictionSerializer(data=request.data)
+        serializer = ForecastSerializer(data=request.data)
+        mode = request.query_params.get('mode', 'full')
+        if mode not in self.FORECAST_MODES:
+            return Response({'mode': [f'Must be one of: {", ".join(self.FORECAST_MODES)}.']},
+                            status=status.HTTP_400_BAD_REQUEST)
         if serializer.is_valid():
             ticker = serializer.validated_data['ticker'].upper()
-            investment_amount = request.data.get('investment_amount', 1000)  # Default $1000
+            investment_amount = serializer.validated_data['investment_amount']
 
-            # Fetch the data from yfinance
-            now = datetime.now()
-            start = datetime(now.year - 10, now.month, now.day)
-            end = now
-            df = yf.download(ticker, start, end)
+            # Fetch the data from the local price store (refreshed from yfinance)
+            start, end = history_range()
+            with stage('forecast.fetch'):
+                df = get_history(ticker, start, end)
             if df.empty:
                 return Response({"error": "No data found for the given ticker.",
                                  'status': status.HTTP_404_NOT_FOUND})
 
             df = df.reset_index()
-            
-            # Splitting data into Training & Testing datasets
-            data_training = pd.DataFrame(df.Close[0:int(len(df) * 0.7)])
-            data_testing = pd.DataFrame(df.Close[int(len(df) * 0.7): int(len(df))])
-
-            # Scaling down the data between 0 and 1
-            scaler = MinMaxScaler(feature_range=(0, 1))
-
-            # Load ML Model
-            model = load_model(get_model_path(ticker))
-
-            # Preparing Test Data
-            past_100_days = data_training.tail(100)
-            final_df = pd.concat([past_100_days, data_testing], ignore_index=True)
-            input_data = scaler.fit_transform(final_df)
-
-            x_test = []
-            y_test = []
-            for i in range(100, input_data.shape[0]):
-                x_test.append(input_data[i - 100: i])
-                y_test.append(input_data[i, 0])
-            x_test, y_test = np.array(x_test), np.array(y_test)
-
-            # Making Predictions
-            y_predicted = model.predict(x_test)
-
-            # Revert the scaled prices to original price
-            y_predicted = scaler.inverse_transform(y_predicted.reshape(-1, 1)).flatten()
-            y_test = scaler.inverse_transform(y_test.reshape(-1, 1)).flatten()
-
-            # Get current and predicted prices for recommendations
-            current_price = df.Close.iloc[-1]
-            predicted_future_price = y_predicted[-1]
-
-            # Buy/Sell Signal Detection
-            buy_signals = []
-            sell_signals = []
-            trades = []
-            
-            # Simple strategy: Buy when predicted price goes up, sell when it goes down
-            for i in range(1, len(y_predicted)):
-                price_change = y_predicted[i] - y_predicted[i-1]
-                if price_change > 0 and len(buy_signals) == len(sell_signals):  # Buy signal
-                    buy_signals.append({
-                        'day': i,
-                        'price': float(y_predicted[i-1]),
-                        'action': 'BUY'
-                    })
-                elif price_change < 0 and len(buy_signals) > len(sell_signals):  # Sell signal
-                    sell_signals.append({
-                        'day': i,
-                        'price': float(y_predicted[i-1]),
-                        'action': 'SELL'
-                    })
-            
-            # Calculate trading profit with realistic costs
-            transaction_cost = 0.001  # 0.1% per trade
-            slippage = 0.0005  # 0.05% slippage
-            total_profit = 0
-            current_cash = investment_amount
-            total_fees = 0
-            
-            for i, buy in enumerate(buy_signals):
-                if i < len(sell_signals):
-                    sell = sell_signals[i]
-                    
-                    # Buy with costs
-                    buy_cost = current_cash * transaction_cost
-                    available_cash = current_cash - buy_cost
-                    buy_price_with_slippage = buy['price'] * (1 + slippage)
-                    shares_bought_trade = available_cash / buy_price_with_slippage
-                    
-                    # Sell with costs
-                    sell_price_with_slippage = sell['price'] * (1 - slippage)
-                    gross_sell_value = shares_bought_trade * sell_price_with_slippage
-                    sell_cost = gross_sell_value * transaction_cost
-                    net_sell_value = gross_sell_value - sell_cost
-                    
-                    trade_profit = net_sell_value - current_cash
-                    total_profit += trade_profit
-                    trade_fees = buy_cost + sell_cost
-                    total_fees += trade_fees
-                    
-                    trades.append({
-                        'buy_day': buy['day'],
-                        'buy_price': buy['price'],
-                        'buy_price_actual': float(buy_price_with_slippage),
-                        'sell_day': sell['day'],
-                        'sell_price': sell['price'],
-                        'sell_price_actual': float(sell_price_with_slippage),
-                        'shares': float(shares_bought_trade),
-                        'gross_profit': float(gross_sell_value - available_cash),
-                        'fees': float(trade_fees),
-                        'net_profit': float(trade_profit),
-                        'return_percentage': float((trade_profit / current_cash) * 100)
-                    })
-                    current_cash = net_sell_value  # Use net proceeds for next trade
-
-            # Generate plots
-            plt.switch_backend('AGG')
-            plt.figure(figsize=(12, 5))
-            plt.plot(df.Close, label='Closing Price')
-            plt.title(f'Closing price of {ticker}')
-            plt.xlabel('Days')
-            plt.ylabel('Price')
-            plt.legend()
-            plot_img_path = f'{ticker}_plot.png'
-            plot_img = save_plot(plot_img_path)
-
-            ma100 = df.Close.rolling(100).mean()
-            plt.figure(figsize=(12, 5))
-            plt.plot(df.Close, label='Closing Price')
-            plt.plot(ma100, 'r', label='100 DMA')
-            plt.title(f'100 Days Moving Average of {ticker}')
-            plt.xlabel('Days')
-            plt.ylabel('Price')
-            plt.legend()
-            plot_img_path = f'{ticker}_100_dma.png'
-            plot_100_dma = save_plot(plot_img_path)
-
-            ma200 = df.Close.rolling(200).mean()
-            plt.figure(figsize=(12, 5))
-            plt.plot(df.Close, label='Closing Price')
-            plt.plot(ma100, 'r', label='100 DMA')
-            plt.plot(ma200, 'g', label='200 DMA')
-            plt.title(f'200 Days Moving Average of {ticker}')
-            plt.xlabel('Days')
-            plt.ylabel('Price')
-            plt.legend()
-            plot_img_path = f'{ticker}_200_dma.png'
-            plot_200_dma = save_plot(plot_img_path)
-
-            plt.figure(figsize=(12, 5))
-            plt.plot(y_test, 'b', label='Original Price')
-            plt.plot(y_predicted, 'r', label='Predicted Price')
-            plt.title(f'Final Prediction for {ticker}')
-            plt.xlabel('Days')
-            plt.ylabel('Price')
-            plt.legend()
-            plot_img_path = f'{ticker}_final_prediction.png'
-            plot_prediction = save_plot(plot_img_path)
+            # Checked before get_or_compute so nothing is computed or cached
+            try:
+                check_history(df, mode)
+            except InsufficientHistory as e:
+                return Response({'error': str(e), 'status': status.HTTP_400_BAD_REQUEST},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            model_path = get_model_path(ticker)
+
+            if mode == 'next_day':
+                cache_key = forecast_cache_key(ticker, model_path, data_version(df, model_path), 'next_day')
+                result = get_or_compute(cache_key, lambda: run_next_day_forecast(ticker, df, model_path))
+                return Response(_with_timings(request, result))
+
+            # Results only change with a new bar, a new model or a different amount
+            cache_key = forecast_cache_key(ticker, model_path, data_version(df, model_path), investment_amount)
+            result = get_or_compute(
+                cache_key,
+                lambda: run_forecast(ticker, df, model_path, investment_amount),
+            )
+            return Response(_with_timings(request, result))
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            # Model Evaluation
-            mse = mean_squared_error(y_test, y_predicted)
-            rmse = np.sqrt(mse)
-            r2 = r2_score(y_test, y_predicted)
-
-            # Calculate timeframe and add strategy details
-            test_period_days = len(y_test)
-            test_start_date = df.Date.iloc[len(data_training) + 100]  # Start of test period
-            test_end_date = df.Date.iloc[-1]  # End of test period
-            
+
+class BatchForecastAPIView(APIView):
+    def post(self, request):
+        """Forecast many tickers at once, streaming one JSON line per ticker"""
+        serializer = BatchForecastSerializer(data=request.data)
+        if serializer.is_valid():
+            tickers = list(dict.fromkeys(ticker.upper() for ticker in serializer.validated_data['tickers']))
+            investment_amount = serializer.validated_data['investment_amount']
+
+            results = iter_batch_forecasts(tickers, investment_amount,
+                                           serializer.validated_data['include_chart_data'])
+            return StreamingHttpResponse(
+                (json.dumps(result, cls=DjangoJSONEncoder) + '\n' for result in results),
+                content_type='application/x-ndjson',
+            )
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ForecastStreamView(View):
+    """
+    Async forecast endpoints for ASGI deployments.
+
+    Blocking work runs on the bounded executors in api/streaming.py, so a
+    slow price fetch or inference call does not pin a worker thread. The
+    response streams as server-sent events, or NDJSON with ?format=ndjson.
+    Serve through core/asgi.py (e.g. uvicorn core.asgi:application); under
+    WSGI the stream still works but each request holds a worker again.
+    """
+    events = None  # 'single' or 'batch'
+
+    async def post(self, request):
+        stream_format = request.GET.get('format', 'sse')
+        if stream_format not in STREAM_FORMATS:
+            return JsonResponse({'format': [f'Must be one of: {", ".join(STREAM_FORMATS)}.']}, status=400)
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'error': 'Request body must be JSON.'}, status=400)
+        if self.events == 'batch':
+            serializer = BatchForecastSerializer(data=data)
+            if not serializer.is_valid():
+                return JsonResponse(serializer.errors, status=400)
+            tickers = list(dict.fromkeys(ticker.upper() for ticker in serializer.validated_data['tickers']))
+            events = batch_forecast_events(tickers, serializer.validated_data['investment_amount'],
+                                           serializer.validated_data['include_chart_data'])
+        else:
+            mode = request.GET.get('mode', 'full')
+            modes = StockPredictionWithPotentialEarningAPIView.FORECAST_MODES
+            if mode not in modes:
+                return JsonResponse({'mode': [f'Must be one of: {", ".join(modes)}.']}, status=400)
+            serializer = ForecastSerializer(data=data)
+            if not serializer.is_valid():
+                return JsonResponse(serializer.errors, status=400)
+            events = forecast_events(serializer.validated_data['ticker'].upper(),
+                                     serializer.validated_data['investment_amount'], mode)
+
+        async def stream():
+            async for event, payload in events:
+                yield format_event(event, payload, stream_format)
+
+        response = StreamingHttpResponse(stream(), content_type=STREAM_FORMATS[stream_format])
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Don't let a reverse proxy buffer the stream
+        return response
+
+
+class HorizonForecastAPIView(APIView):
+    def post(self, request):
+        """Recursive N-day forecasts, optionally with Monte Carlo percentile bands"""
+        serializer = HorizonForecastSerializer(data=request.data)
+        if serializer.is_valid():
+            data = serializer.validated_data
+            tickers = list(dict.fromkeys(ticker.upper() for ticker in data['tickers']))
+            results = horizon_forecasts(tickers, data['horizon'], data['paths'], data['seed'])
             return Response({
                 'status': 'success',
-                'model_info': get_model_info(ticker),
-                'ticker': ticker,
-                'plot_img': plot_img,
-                'plot_100_dma': plot_100_dma,
-                'plot_200_dma': plot_200_dma,
-                'plot_prediction': plot_prediction,
-                'model_performance': {
-                    'mse': mse,
-                    'rmse': rmse,
-                    'r2': r2
-                },
-                'trading_strategy': {
-                    'investment_amount': investment_amount,
-                    'current_price': float(current_price.iloc[0]),
-                    'strategy_explanation': {
-                        'method': 'ML Forecast-Based Trading',
-                        'description': 'Buy when model predicts price will go UP tomorrow, sell when it predicts price will go DOWN tomorrow',
-                        'based_on': 'LSTM neural network predictions trained on historical price patterns',
-                        'timeframe': f'{test_period_days} trading days',
-                        'period': f'From {test_start_date.strftime("%Y-%m-%d")} to {test_end_date.strftime("%Y-%m-%d")}',
-                        'trades_per_day': f'{len(trades) / test_period_days:.1f} average'
-                    },
-                    'buy_signals': buy_signals,
-                    'sell_signals': sell_signals,
-                    'trades': trades,
-                    'total_trades': len(trades),
-                    'gross_trading_profit': float(total_profit + total_fees),
-                    'total_fees': float(total_fees),
-                    'net_trading_profit': float(total_profit),
-                    'final_portfolio_value': float(current_cash),
-                    'trading_return_percentage': float(((current_cash - investment_amount) / investment_amount) * 100),
-                    'trading_costs': {
-                        'transaction_cost_rate': f'{transaction_cost * 100}%',
-                        'slippage_rate': f'{slippage * 100}%',
-                        'total_fees_paid': float(total_fees)
-                    }
-                },
-                'recommendations': {
-                    'current_action': 'BUY' if predicted_future_price > current_price.iloc[0] else 'SELL',
-                    'confidence': f'{abs((predicted_future_price - current_price.iloc[0]) / current_price.iloc[0] * 100):.2f}%',
-                    'next_target_price': float(predicted_future_price)
-                },
-                'disclaimer': 'This is not financial advice. Past performance does not guarantee future results.'
+                'horizon': data['horizon'],
+                'paths': data['paths'],
+                'results': [results[ticker] for ticker in tickers],
+            })
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class BacktestSweepAPIView(APIView):
+    def post(self, request):
+        """Start a strategy backtest over a grid of amounts, costs and slippages"""
+        serializer = BacktestSweepSerializer(data=request.data)
+        if serializer.is_valid():
+            data = serializer.validated_data
+            tickers = list(dict.fromkeys(ticker.upper() for ticker in data['tickers']))
+            grid = (data['investment_amounts'], data['transaction_costs'], data['slippages'])
+
+            # One chunk task per group of tickers, ranked by a chord callback
+            chunk_size = settings.BACKTEST_SWEEP_CHUNK_SIZE
+            chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+            task = chord(
+                backtest_sweep_chunk_task.s(chunk, *grid) for chunk in chunks
+            )(rank_backtest_sweep_task.s(top=data['top']))
+
+            combinations = len(tickers) * len(grid[0]) * len(grid[1]) * len(grid[2])
+            return Response({
+                'status': 'sweep_started',
+                'task_id': task.id,
+                'tickers': tickers,
+                'combinations': combinations,
+                'message': f'Backtesting {combinations} combinations. Use task_id to check progress.'
             })
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class TaskStatusAPIView(APIView):
@@ -409,6 +374,15 @@ class TaskStatusAPIView(APIView):
                 'message': task.info.get('message', 'Task is being processed'),
                 'progress': task.info.get('progress', 0)
             }
+            # Live training metrics (loss, throughput, ETA) when the task reports them
+            for field in TRAINING_PROGRESS_FIELDS:
+                if field in task.info:
+                    response[field] = task.info[field]
+        elif task.state == 'RETRY':
+            response = {
+                'status': 'pending',
+                'message': 'Task is waiting for worker resources'
+            }
         elif task.state == 'SUCCESS':
             response = {
                 'status': 'completed',
@@ -424,12 +398,16 @@ class TaskStatusAPIView(APIView):
 
 class TrainedModelsAPIView(APIView):
     def get(self, request):
-        """List all trained models by scanning the trained_models directory"""
+        """
+        List trained models from the catalog, newest first.
+
+        ?ticker= filters to one ticker, ?page= and ?page_size= page through
+        the rest.
+        """
         
-        def time_ago(timestamp):
-            """Convert timestamp to relative time string"""
-            now = datetime.now()
-            diff = now - datetime.fromtimestamp(timestamp)
+        def time_ago(trained_at):
+            """Convert datetime to relative time string"""
+            diff = timezone.now() - trained_at
             
             seconds = int(diff.total_seconds())
             if seconds < 60:
@@ -447,39 +425,81 @@ class TrainedModelsAPIView(APIView):
             return f"{days} day{'s' if days > 1 else ''} ago"
         
         try:
-            models = []
-            trained_models_dir = 'trained_models'
-            
-            if os.path.exists(trained_models_dir):
-                for filename in os.listdir(trained_models_dir):
-                    if filename.endswith('_stock_prediction_model.keras'):
-                        # Extract ticker from filename like "AAPL_stock_prediction_model.keras"
-                        ticker = filename.split('_stock_prediction_model.keras')[0]
-                        file_path = os.path.join(trained_models_dir, filename)
-                        
-                        # Get file modification time
-                        mod_time = os.path.getmtime(file_path)
-                        
-                        models.append({
-                            'ticker': ticker,
-                            'model_path': file_path,
-                            'trained_at': time_ago(mod_time),
-                            'file_size': os.path.getsize(file_path),
-                            'model_summary': None  # Add this for consistency
-                        })
-            
-            # Sort by modification time (newest first)
-            models.sort(key=lambda x: os.path.getmtime(os.path.join('trained_models', f"{x['ticker']}_stock_prediction_model.keras")), reverse=True)
-            
-            return Response({
-                'status': 'success',
-                'models': models,
-                'count': len(models)
-            })
-            
-        except Exception as e:
-            return Response({
-                'status': 'error',
-                'message': str(e),
-                'models': []
-            })
\ No newline at end of file
+            page_size = int(request.query_params.get('page_size', settings.TRAINED_MODELS_PAGE_SIZE))
+            page_size = max(1, min(page_size, settings.TRAINED_MODELS_MAX_PAGE_SIZE))
+        except ValueError:
+            return Response({'status': 'error', 'message': 'page_size must be an integer', 'models': []},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        entries = TrainedModel.objects.filter(
+            status=TrainedModel.STATUS_READY,
+            kind__in=[TrainedModel.KIND_MODEL, TrainedModel.KIND_HEAD],
+        ).order_by('-trained_at', '-id')
+        ticker = request.query_params.get('ticker')
+        if ticker:
+            entries = entries.filter(ticker=ticker.upper())
+
+        paginator = Paginator(entries.defer('scaler'), page_size)
+        page = paginator.get_page(request.query_params.get('page'))
+        models = [{
+            'ticker': entry.ticker,
+            'kind': entry.kind,
+            'model_path': entry.path,
+            'version': entry.version,
+            'trained_at': time_ago(entry.trained_at),
+            'trained_at_iso': entry.trained_at.isoformat(),
+            'trained_through': entry.trained_through,
+            'mode': entry.mode,
+            'val_loss': entry.val_loss,
+            'file_size': entry.size,
+            'model_summary': {
+                'total_params': entry.total_params,
+                'trainable_params': entry.trainable_params,
+            } if entry.total_params is not None else None,
+            'training': entry.training or None,
+        } for entry in page]
+
+        return Response({
+            'status': 'success',
+            'models': models,
+            'count': paginator.count,
+            'page': page.number,
+            'num_pages': paginator.num_pages,
+            'page_size': page_size,
+        })
+
+
+class IndicatorsAPIView(APIView):
+    def get(self, request, ticker):
+        """Stored indicator series for ticker; ?fields=sma50,rsi14 picks a subset"""
+        ticker = ticker.upper()
+        fields = request.query_params.get('fields')
+        fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else INDICATORS
+        unknown = [field for field in fields if field not in INDICATORS]
+        if unknown:
+            return Response({'error': f'Unknown indicators: {", ".join(unknown)}', 'available': INDICATORS},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        start, end = history_range()
+        df = get_history(ticker, start, end)
+        if df.empty:
+            return Response({'error': 'No data found for the given ticker.'}, status=status.HTTP_404_NOT_FOUND)
+
+        # NaN (indicator still warming up) is not valid JSON
+        df = df[['Close'] + fields]
+        df = df.astype(object).where(df.notna(), None)
+        return Response({
+            'ticker': ticker,
+            'dates': [date.strftime('%Y-%m-%d') for date in df.index],
+            'close': df.Close.tolist(),
+            'indicators': {field: df[field].tolist() for field in fields},
+        })
+
+
+class ChartAPIView(APIView):
+    def get(self, request, ticker, version, chart_type):
+        """Serve a forecast chart, rendering and caching it on first request"""
+        image_path = get_chart(ticker, version, chart_type)
+        if image_path is None:
+            raise Http404('Chart not found')
+        return FileResponse(open(image_path, 'rb'), content_type='image/png')
@@ -0,0 +1,22 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+LOOKBACK = 100
+
+
+def make_windows(values, lookback=LOOKBACK):
+    """
+    Build (x, y) training/inference pairs from a scaled price series.
+
+    Equivalent to appending values[i - lookback:i] and values[i] for every
+    i in range(lookback, len(values)), but x is a read-only strided view of
+    values rather than a copy. values may be 1-D or an (n, 1) column as
+    returned by MinMaxScaler; x has shape (n - lookback, lookback, 1).
+    """
+    series = np.asarray(values).reshape(-1)
+    if series.shape[0] <= lookback:
+        return np.empty((0, lookback, 1), dtype=series.dtype), np.empty(0, dtype=series.dtype)
+    x = sliding_window_view(series[:-1], lookback)[:, :, np.newaxis]
+    y = series[lookback:]
+    return x, y
+
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold-start import cost of auth routes vs forecast/training routes
+
+Each route runs in a fresh interpreter under `python -X importtime`, doing
+what a cold Lambda does: django.setup(), then a first request to the route
+(a GET, which the POST-only views answer with 405 after loading the view).
+The eager row imports api.views up front, as the URLconf did before views
+were loaded lazily.
+
+Run from backend-drf/:
+    python benchmarks/bench_imports.py [--json]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROUTES = {
+    'auth: token/': '/api/v1/token/',
+    'auth: register/': '/api/v1/register/',
+    'forecast/': '/api/v1/forecast/',
+    'train/': '/api/v1/train/',
+}
+HEAVY_PACKAGES = ['tensorflow', 'keras', 'sklearn', 'matplotlib', 'yfinance', 'pandas', 'celery']
+
+SCRIPT = '''
+import os, sys, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+start = time.perf_counter()
+import django
+django.setup()
+{eager}
+from django.test import Client
+status = Client(HTTP_HOST='localhost').get({path!r}).status_code
+print(time.perf_counter() - start, status, file=sys.stdout)
+'''
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure(path, eager=False):
+    env = {**os.environ, 'TF_CPP_MIN_LOG_LEVEL': '3'}
+    env.setdefault('SECRET_KEY', 'benchmark')
+    script = SCRIPT.format(path=path, eager='import api.views' if eager else '')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        capture_output=True, text=True, check=True, cwd=BACKEND_DIR, env=env,
+    )
+    seconds, status = proc.stdout.split()[-2:]
+
+    # Total over top-level imports, plus the cumulative time of each heavy
+    # package wherever in the import tree it was first pulled in
+    packages = {}
+    total = 0
+    for match in IMPORT_LINE.finditer(proc.stderr):
+        _, cumulative, indent, name = match.groups()
+        if len(indent) == 1:
+            total += int(cumulative)
+        if name in HEAVY_PACKAGES:
+            packages[name] = int(cumulative)
+    return {
+        'path': path,
+        'status': int(status),
+        'wall_s': float(seconds),
+        'import_s': total / 1e6,
+        'heavy_s': {name: packages.get(name, 0) / 1e6 for name in HEAVY_PACKAGES},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--json', action='store_true', help='print raw JSON results')
+    args = parser.parse_args()
+
+    results = {name: measure(path) for name, path in ROUTES.items()}
+    results['token/, eager api.views'] = measure(ROUTES['auth: token/'], eager=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f'{"route":<26} {"status":>6} {"wall s":>7} {"imports s":>9}  heavy packages (cumulative)')
+    for name, result in results.items():
+        heavy = sorted(((s, n) for n, s in result['heavy_s'].items() if s >= 0.01), reverse=True)
+        heavy = ', '.join(f'{n} {s:.2f}s' for s, n in heavy) or '-'
+        print(f'{name:<26} {result["status"]:6d} {result["wall_s"]:7.2f} {result["import_s"]:9.2f}  {heavy}')
+
+
+if __name__ == '__main__':
+    main()
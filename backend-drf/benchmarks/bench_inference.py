@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: inference backends in api/inference.py (keras predict vs traced
+tf.function vs TFLite) on the stored AAPL/GOOG models
+
+Each backend runs in its own subprocess so RSS figures are not polluted by
+the others. Two workloads per model: a full forecast (the ~750 test windows
+of a 10-year history) and a single next-day window.
+
+Run from backend-drf/:
+    python benchmarks/bench_inference.py [--iterations 50] [--json]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+MODELS = ['AAPL_stock_prediction_model.keras', 'GOOG_stock_prediction_model.keras']
+BACKENDS = ['keras', 'function', 'tflite']
+WORKLOADS = {'forecast': 755, 'next_day': 1}
+LOOKBACK = 100
+
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def run_backend(backend, iterations):
+    """Measure one backend in this process and return its results"""
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+    import keras
+    from api.inference import FunctionPredictor, KerasPredictor, TFLitePredictor
+
+    predictors = {
+        'keras': KerasPredictor,
+        'function': FunctionPredictor,
+        'tflite': lambda model: TFLitePredictor(model, batch_size=64),
+    }
+    rng = np.random.default_rng(0)
+    results = {'backend': backend, 'models': {}}
+    for name in MODELS:
+        model = keras.models.load_model(os.path.join(BACKEND_DIR, name))
+        start = time.perf_counter()
+        predictor = predictors[backend](model)
+        predictor.predict(rng.random((1, LOOKBACK, 1), dtype=np.float32))
+        setup = time.perf_counter() - start
+
+        workloads = {}
+        for workload, windows in WORKLOADS.items():
+            x = rng.random((windows, LOOKBACK, 1), dtype=np.float32)
+            for _ in range(3):
+                predictor.predict(x)
+            timings = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                predictor.predict(x)
+                timings.append((time.perf_counter() - start) * 1000)
+            workloads[workload] = {
+                'p50_ms': float(np.percentile(timings, 50)),
+                'p99_ms': float(np.percentile(timings, 99)),
+            }
+        results['models'][name] = {'setup_s': setup, **workloads}
+
+    results['rss_mb'] = rss_mb()
+    results['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--json', action='store_true', help='print raw JSON results')
+    parser.add_argument('--backend', choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_backend(args.backend, args.iterations)))
+        return
+
+    results = []
+    for backend in BACKENDS:
+        output = subprocess.run(
+            [sys.executable, __file__, '--backend', backend, '--iterations', str(args.iterations)],
+            capture_output=True, text=True, check=True, cwd=BACKEND_DIR,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f'{"backend":<10} {"model":<36} {"setup s":>8} '
+          f'{"forecast p50":>13} {"p99":>8} {"next-day p50":>13} {"p99":>8} {"RSS MB":>8} {"peak MB":>8}')
+    for result in results:
+        for name, model in result['models'].items():
+            print(f'{result["backend"]:<10} {name:<36} {model["setup_s"]:8.2f} '
+                  f'{model["forecast"]["p50_ms"]:10.2f} ms {model["forecast"]["p99_ms"]:5.2f} ms '
+                  f'{model["next_day"]["p50_ms"]:10.2f} ms {model["next_day"]["p99_ms"]:5.2f} ms '
+                  f'{result["rss_mb"]:8.0f} {result["peak_rss_mb"]:8.0f}')
+
+
+if __name__ == '__main__':
+    main()
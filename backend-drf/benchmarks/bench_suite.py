@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the forecast and training hot paths, fully offline
+
+Prices come from Resources/TSLA.csv through CSVFetcher, and forecasts use the
+stored AAPL/GOOG models in backend-drf/. Everything the suite writes (price
+store, chart files, the trained_models/ directory and the SQLite database
+holding the model catalog) lives in a temporary directory, and the cache is
+the in-process one. The forecast window is pinned to the 10 years before the
+last CSV bar, so results do not drift with the calendar.
+
+Measures:
+  prices.*     price store load, cold (CSV -> parquet + indicators) and warm
+  windowing.*  make_windows and prepare_test_data on the 10-year history
+  inference.*  model forward passes per backend, full test period and next day
+  backtest     run_backtest over the test-period predictions
+  charts.*     chart series publishing and PNG rendering per chart type
+  forecast.*   POST /api/v1/forecast/ end to end: cold model, uncached, cached,
+               next-day mode
+  training.*   fit_pipeline epochs/sec and samples/sec on 4 years of bars
+
+Results are JSON (timings in ms, p50/p95 over the iterations), tagged with
+the git commit, so runs can be compared across commits:
+
+Run from backend-drf/:
+    python benchmarks/bench_suite.py [--iterations 20] [--epochs 3] [--output results.json]
+    python benchmarks/bench_suite.py --compare baseline.json [--threshold 1.2]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESOURCES_DIR = os.path.join(os.path.dirname(BACKEND_DIR), 'Resources')
+sys.path.insert(0, BACKEND_DIR)
+
+TICKER = 'TSLA'
+MODELS = {
+    'AAPL': os.path.join(BACKEND_DIR, 'AAPL_stock_prediction_model.keras'),
+    'GOOG': os.path.join(BACKEND_DIR, 'GOOG_stock_prediction_model.keras'),
+}
+BACKENDS = ['keras', 'function', 'tflite']
+HISTORY_YEARS = 10
+
+
+def summarize(timings):
+    timings = np.asarray(timings) * 1000
+    return {
+        'iterations': len(timings),
+        'mean_ms': float(timings.mean()),
+        'p50_ms': float(np.percentile(timings, 50)),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'min_ms': float(timings.min()),
+    }
+
+
+def measure(fn, iterations, setup=None, warmup=1):
+    """Time fn() iterations times after warmup calls; setup() runs untimed before each call"""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    timings = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def configure(workdir):
+    """Point settings at the offline fixtures and workdir before Django starts"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+    os.environ['PRICE_FETCHER'] = 'api.price_store.CSVFetcher'
+    os.environ['PRICE_CSV_DIR'] = RESOURCES_DIR
+    os.environ['PRICE_DATA_DIR'] = os.path.join(workdir, 'price_data')
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(workdir, "db.sqlite3")}'
+    # Shared caches would make runs depend on whatever else is using them
+    os.environ.pop('REDIS_CACHE_URL', None)
+
+    import django
+    django.setup()
+    from django.conf import settings
+    settings.MEDIA_ROOT = os.path.join(workdir, 'media')
+    settings.ALLOWED_HOSTS = ['localhost']
+
+    # Model paths are relative to the working directory; TSLA is served by the AAPL model
+    os.makedirs(os.path.join(workdir, 'trained_models'))
+    shutil.copy(MODELS['AAPL'], os.path.join(workdir, 'trained_models', f'{TICKER}_stock_prediction_model.keras'))
+    os.chdir(workdir)
+
+    # The model catalog lives in the database
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+    call_command('sync_trained_models', stdout=io.StringIO())
+
+
+def pin_history_range(end):
+    """Make the forecast views use the 10 years before the last fixture bar"""
+    import api.forecasting
+    import api.views
+
+    def history_range(years=HISTORY_YEARS):
+        return end - pd.DateOffset(years=years), end + pd.Timedelta(days=1)
+
+    api.forecasting.history_range = history_range
+    api.views.history_range = history_range
+    return history_range()
+
+
+def bench_prices(results, workdir, start, end, iterations):
+    from api.price_store import CSVFetcher, PriceStore
+    directory = os.path.join(workdir, 'bench_prices')
+    fetcher = CSVFetcher()
+
+    def cold_setup():
+        shutil.rmtree(directory, ignore_errors=True)
+
+    store = {}
+
+    def cold():
+        store['store'] = PriceStore(directory, fetcher, refresh_seconds=3600)
+        store['store'].get_history(TICKER, start, end)
+
+    results['prices.load_cold'] = measure(cold, iterations, setup=cold_setup)
+    results['prices.load_warm'] = measure(lambda: PriceStore(directory, fetcher, 3600).get_history(TICKER, start, end),
+                                          iterations)
+
+
+def bench_windowing(results, df, iterations):
+    from api.forecasting import prepare_test_data
+    from api.windowing import make_windows
+    values = df[['Close']].to_numpy()
+    results['windowing.make_windows'] = measure(lambda: make_windows(values), iterations)
+    results['windowing.prepare_test_data'] = measure(lambda: prepare_test_data(df), iterations)
+
+
+def bench_inference(results, df, iterations):
+    import keras
+    from api.forecasting import prepare_next_day_window, prepare_test_data
+    from api.inference import make_predictor
+    from api.model_registry import get_bundle
+
+    for name, model_path in MODELS.items():
+        bundle = get_bundle(model_path)
+        x_test, _, _, _ = prepare_test_data(df, bundle)
+        x_next, _ = prepare_next_day_window(df, bundle)
+        model = keras.models.load_model(model_path)
+        for backend in BACKENDS:
+            predictor = make_predictor(model, backend)
+            results[f'inference.{backend}.{name}.forecast'] = measure(lambda: predictor.predict(x_test), iterations)
+            results[f'inference.{backend}.{name}.next_day'] = measure(lambda: predictor.predict(x_next), iterations)
+
+
+def bench_backtest_and_charts(results, df, iterations):
+    from api.backtest import run_backtest
+    from api.charts import CHART_FIELDS, _chart_dir, _image_path, data_version, get_chart
+    from api.forecasting import forecast_charts, predict_test_period
+
+    model_path = MODELS['AAPL']
+    y_test, y_predicted, _, _ = predict_test_period(df, model_path)
+    results['backtest'] = measure(lambda: run_backtest(y_predicted, 1000), iterations)
+
+    version = data_version(df, model_path)
+    results['charts.publish'] = measure(
+        lambda: forecast_charts(TICKER, df, model_path, y_test, y_predicted), iterations,
+        setup=lambda: shutil.rmtree(_chart_dir(TICKER, version), ignore_errors=True),
+    )
+    for chart_type in CHART_FIELDS:
+        path = _image_path(TICKER, version, chart_type)
+        results[f'charts.render.{chart_type}'] = measure(
+            lambda: get_chart(TICKER, version, chart_type), max(iterations // 2, 1),
+            setup=lambda: os.path.exists(path) and os.remove(path),
+        )
+
+
+def bench_forecast(results, iterations):
+    from django.core.cache import cache
+    from django.test import Client
+    from api.model_registry import model_registry
+    client = Client(HTTP_HOST='localhost')
+
+    def post(query=''):
+        response = client.post(f'/api/v1/forecast/{query}', {'ticker': TICKER}, content_type='application/json')
+        assert response.status_code == 200 and response.json().get('status') == 'success', response.content[:200]
+
+    def cold_setup():
+        cache.clear()
+        model_registry.invalidate()
+
+    # Includes loading api.views through the lazy URL callback on the first call
+    start = time.perf_counter()
+    post()
+    results['forecast.first_request'] = summarize([time.perf_counter() - start])
+
+    results['forecast.cold_model'] = measure(post, max(iterations // 4, 1), setup=cold_setup)
+    results['forecast.uncached'] = measure(post, iterations, setup=cache.clear)
+    results['forecast.cached'] = measure(post, iterations)
+    results['forecast.next_day'] = measure(lambda: post('?mode=next_day'), iterations, setup=cache.clear)
+
+
+def bench_training(results, df, epochs):
+    from api.training import TRAINING_YEARS, _training_windows, build_model, fit_pipeline
+    recent = df[df.Date >= df.Date.iloc[-1] - pd.DateOffset(years=TRAINING_YEARS)].reset_index(drop=True)
+    _, _, (x_train, y_train), _ = _training_windows(recent)
+
+    summary = fit_pipeline(build_model(), x_train, y_train, epochs, validation_split=0)
+    # The first epoch includes tracing the training step
+    steady = summary['epoch_seconds'][1:] or summary['epoch_seconds']
+    results['training.fit_pipeline'] = {
+        'epochs': summary['epochs'],
+        'batch_size': summary['batch_size'],
+        'windows': summary['train_windows'],
+        'first_epoch_s': summary['epoch_seconds'][0],
+        'epoch_p50_s': float(np.median(steady)),
+        'epochs_per_sec': 1 / float(np.median(steady)),
+        'samples_per_sec': summary['train_windows'] / float(np.median(steady)),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=BACKEND_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='bench-suite-')
+    try:
+        configure(workdir)
+        import tensorflow as tf
+        tf.get_logger().setLevel('ERROR')
+        from api.price_store import get_history
+
+        fixture = pd.read_csv(os.path.join(RESOURCES_DIR, f'{TICKER}.csv'), parse_dates=['Date'])
+        start, end = pin_history_range(fixture.Date.iloc[-1])
+        df = get_history(TICKER, start, end).reset_index()
+
+        results = {}
+        bench_prices(results, workdir, start, end, args.iterations)
+        bench_windowing(results, df, args.iterations)
+        bench_inference(results, df, args.iterations)
+        bench_backtest_and_charts(results, df, args.iterations)
+        bench_forecast(results, args.iterations)
+        bench_training(results, df, args.epochs)
+    finally:
+        os.chdir(BACKEND_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'tensorflow': tf.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'bars': len(df),
+            'iterations': args.iterations,
+        },
+        'results': results,
+    }
+
+
+def primary_value(result):
+    """(value, higher_is_better) used to compare a result across runs"""
+    if 'p50_ms' in result:
+        return result['p50_ms'], False
+    return result['samples_per_sec'], True
+
+
+def compare(baseline, current, threshold):
+    """Print per-benchmark ratios; returns the names that regressed by more than threshold"""
+    regressions = []
+    print(f'{"benchmark":<44} {"baseline":>12} {"current":>12} {"ratio":>7}  unit')
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        before, higher_is_better = primary_value(baseline['results'][name])
+        after, _ = primary_value(result)
+        # ratio > 1 means slower
+        ratio = before / after if higher_is_better else after / before
+        flag = '  REGRESSION' if ratio > threshold else ''
+        if flag:
+            regressions.append(name)
+        unit = 'samples/s' if higher_is_better else 'ms'
+        print(f'{name:<44} {before:12.2f} {after:12.2f} {ratio:7.2f}  {unit}{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--epochs', type=int, default=3, help='epochs for the training benchmark')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--compare', metavar='BASELINE', help='compare against an earlier results file')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='slowdown ratio reported as a regression with --compare (exit status 1)')
+    args = parser.parse_args()
+
+    # Keep stdout clean for the JSON; TF and the TFLite converter print as they go
+    with contextlib.redirect_stdout(sys.stderr):
+        results = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    elif not args.compare:
+        print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f'baseline {baseline["meta"]["commit"]}, current {results["meta"]["commit"]}')
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
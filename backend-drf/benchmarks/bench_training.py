@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the old NumPy model.fit(batch_size=16) loop vs the tf.data
+pipeline in api/training.py (fit_pipeline)
+
+Trains the per-ticker LSTM on the last 4 years of Resources/TSLA.csv and
+reports wall-clock per epoch, training throughput and the loss on the
+held-out 30% for each configuration. The fixed-epoch rows compare raw
+throughput; the last row adds early stopping on the validation split.
+
+Run from backend-drf/:
+    python benchmarks/bench_training.py [--epochs 5] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+import django
+django.setup()
+
+from api.training import (
+    BASE_LEARNING_RATE, TRAINING_YEARS, _training_windows, build_model, fit_pipeline, scaled_learning_rate,
+)
+from tensorflow.keras.callbacks import Callback
+
+CSV_PATH = os.path.join(BACKEND_DIR, '..', 'Resources', 'TSLA.csv')
+BATCH_SIZES = [16, 64, 128]
+
+
+class EpochTimer(Callback):
+    def on_train_begin(self, logs=None):
+        self.epoch_seconds = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_seconds.append(time.perf_counter() - self.start)
+
+
+def load_history():
+    df = pd.read_csv(CSV_PATH, parse_dates=['Date'])
+    return df[df.Date >= df.Date.iloc[-1] - pd.DateOffset(years=TRAINING_YEARS)].reset_index(drop=True)
+
+
+def legacy_fit(model, x, y, epochs):
+    # The loop train_model_task used before the tf.data pipeline
+    timer = EpochTimer()
+    model.optimizer.learning_rate = BASE_LEARNING_RATE
+    model.fit(x, y, epochs=epochs, batch_size=16, verbose=0, callbacks=[timer])
+    return {
+        'epochs': epochs,
+        'batch_size': 16,
+        'epoch_seconds': timer.epoch_seconds,
+        'samples_per_sec': len(y) * epochs / sum(timer.epoch_seconds),
+    }
+
+
+def run(name, train, x_val, y_val):
+    model = build_model()
+    start = time.perf_counter()
+    summary = train(model)
+    total = time.perf_counter() - start
+    return {
+        'name': name,
+        'epochs': summary['epochs'],
+        'batch_size': summary['batch_size'],
+        # The first epoch includes tracing; the median is the steady state
+        'first_epoch_s': summary['epoch_seconds'][0],
+        'median_epoch_s': float(np.median(summary['epoch_seconds'])),
+        'samples_per_sec': summary['samples_per_sec'],
+        'total_s': total,
+        'test_loss': float(model.evaluate(x_val, y_val, verbose=0)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--epochs', type=int, default=5, help='epochs for the fixed-epoch rows')
+    parser.add_argument('--max-epochs', type=int, default=50, help='epoch cap for the early stopping row')
+    parser.add_argument('--json', action='store_true', help='print raw JSON results')
+    args = parser.parse_args()
+
+    _, _, (x_train, y_train), (x_val, y_val) = _training_windows(load_history())
+    x_train = np.ascontiguousarray(x_train)
+
+    results = [run('numpy fit', lambda model: legacy_fit(model, x_train, y_train, args.epochs), x_val, y_val)]
+    for batch_size in BATCH_SIZES:
+        results.append(run(
+            'tf.data', lambda model: fit_pipeline(model, x_train, y_train, args.epochs, batch_size=batch_size,
+                                                  validation_split=0,
+                                                  learning_rate=scaled_learning_rate(batch_size)),
+            x_val, y_val,
+        ))
+    results.append(run(
+        'tf.data + early stopping', lambda model: fit_pipeline(model, x_train, y_train, args.max_epochs),
+        x_val, y_val,
+    ))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f'{len(x_train)} training windows, {len(x_val)} test windows')
+    print(f'{"pipeline":<26} {"batch":>5} {"epochs":>6} {"1st epoch s":>11} {"median s":>9} '
+          f'{"samples/s":>10} {"total s":>8} {"test loss":>10}')
+    for r in results:
+        print(f'{r["name"]:<26} {r["batch_size"]:5d} {r["epochs"]:6d} {r["first_epoch_s"]:11.2f} '
+              f'{r["median_epoch_s"]:9.3f} {r["samples_per_sec"]:10.0f} {r["total_s"]:8.1f} {r["test_loss"]:10.6f}')
+
+
+if __name__ == '__main__':
+    main()
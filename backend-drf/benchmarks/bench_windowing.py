@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: Python loop windowing vs api.windowing strided views
+
+Run from backend-drf/:
+    python benchmarks/bench_windowing.py
+"""
+import os
+import sys
+import timeit
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.windowing import make_windows
+
+LOOKBACK = 100
+DAYS = 252 * 10  # 10 years of daily bars
+TICKERS = 200
+
+
+def loop_windows(values):
+    # The loop previously used in api/views.py and api/tasks.py
+    x, y = [], []
+    for i in range(LOOKBACK, values.shape[0]):
+        x.append(values[i - LOOKBACK: i])
+        y.append(values[i, 0])
+    return np.array(x), np.array(y)
+
+
+def make_batch_windows(values, lookback=LOOKBACK):
+    """
+    make_windows for several equal-length series at once.
+
+    values has shape (tickers, days); x has shape
+    (tickers, days - lookback, lookback, 1) and is still a view.
+    Production batches window each ticker on its own, since histories
+    differ in length and each is scaled separately.
+    """
+    x = sliding_window_view(values[:, :-1], lookback, axis=1)[..., np.newaxis]
+    y = values[:, lookback:]
+    return x, y
+
+
+def report(name, baseline, optimized, repeat):
+    base = min(timeit.repeat(baseline, number=1, repeat=repeat))
+    fast = min(timeit.repeat(optimized, number=1, repeat=repeat))
+    print(f'{name:<45} loop {base * 1000:9.3f} ms   view {fast * 1000:9.3f} ms   x{base / fast:,.0f}')
+
+
+def main():
+    rng = np.random.default_rng(0)
+    single = rng.random((DAYS, 1))
+    batch = rng.random((TICKERS, DAYS))
+
+    # Sanity check: both builders produce the same windows
+    x_loop, y_loop = loop_windows(single)
+    x_view, y_view = make_windows(single)
+    assert np.array_equal(x_loop, x_view) and np.array_equal(y_loop, y_view)
+
+    print(f'{DAYS} days, lookback {LOOKBACK}')
+    report('single series, build', lambda: loop_windows(single), lambda: make_windows(single), 20)
+    report('single series, build + contiguous copy', lambda: loop_windows(single),
+           lambda: np.ascontiguousarray(make_windows(single)[0]), 20)
+    report(f'{TICKERS} tickers, build',
+           lambda: [loop_windows(row.reshape(-1, 1)) for row in batch],
+           lambda: make_batch_windows(batch), 3)
+    report(f'{TICKERS} tickers, build + stacked predict batch',
+           lambda: np.concatenate([loop_windows(row.reshape(-1, 1))[0] for row in batch]),
+           lambda: make_batch_windows(batch)[0].reshape(-1, LOOKBACK, 1), 3)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
@@ -11,4 +12,23 @@ app = Celery('core')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django apps.
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def configure_tensorflow_threads(**kwargs):
+    """
+    Cap TensorFlow's thread pools in each prefork child so several
+    training processes don't oversubscribe the CPU cores.
+    """
+    from django.conf import settings
+    if not (settings.TF_INTRA_OP_THREADS or settings.TF_INTER_OP_THREADS):
+        return
+
+    import tensorflow as tf
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(settings.TF_INTRA_OP_THREADS)
+        tf.config.threading.set_inter_op_parallelism_threads(settings.TF_INTER_OP_THREADS)
+    except RuntimeError:
+        # The TensorFlow runtime was already initialized in this process
+        pass
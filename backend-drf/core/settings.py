@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.timing.ServerTimingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -162,4 +163,129 @@ CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
-CELERY_TIMEZONE = 'UTC'
\ No newline at end of file
+CELERY_TIMEZONE = 'UTC'
+# Training runs on its own queue so it never starves other tasks;
+# start a worker with `-Q training` to consume it. Backtest sweep chunks
+# go to `-Q sweep`, a prefork worker that runs them side by side.
+CELERY_TASK_ROUTES = {
+    'api.tasks.train_model_task': {'queue': 'training'},
+    'api.tasks.train_shared_encoder_task': {'queue': 'training'},
+    'api.tasks.backtest_sweep_chunk_task': {'queue': 'sweep'},
+}
+
+# Loaded model cache (see api/model_registry.py)
+MODEL_REGISTRY_MAX_MODELS = config('MODEL_REGISTRY_MAX_MODELS', default=8, cast=int)
+MODEL_REGISTRY_MAX_BYTES = config('MODEL_REGISTRY_MAX_BYTES', default=512 * 1024 * 1024, cast=int)
+# How long a process reuses the catalog answer for which model serves a ticker
+MODEL_LOOKUP_CACHE_SECONDS = config('MODEL_LOOKUP_CACHE_SECONDS', default=30, cast=int)
+
+
+# Local price history (see api/price_store.py)
+PRICE_DATA_DIR = config('PRICE_DATA_DIR', default=str(BASE_DIR / 'price_data'))
+PRICE_FETCHER = config('PRICE_FETCHER', default='api.price_store.YFinanceFetcher')
+PRICE_CSV_DIR = config('PRICE_CSV_DIR', default=str(BASE_DIR.parent / 'Resources'))
+PRICE_STORE_REFRESH_SECONDS = config('PRICE_STORE_REFRESH_SECONDS', default=900, cast=int)
+
+# Maximum number of tickers accepted by /api/v1/forecast/batch/
+BATCH_FORECAST_MAX_TICKERS = config('BATCH_FORECAST_MAX_TICKERS', default=200, cast=int)
+
+# Cache (Redis when REDIS_CACHE_URL is set, in-process otherwise)
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Forecast result cache (see api/forecast_cache.py)
+FORECAST_CACHE_TIMEOUT = config('FORECAST_CACHE_TIMEOUT', default=6 * 60 * 60, cast=int)
+FORECAST_CACHE_LOCK_TIMEOUT = config('FORECAST_CACHE_LOCK_TIMEOUT', default=120, cast=int)
+
+# Superseded chart versions (api/charts.py) are deleted once unused for this long,
+# so clients holding an older forecast can still load its charts for a while
+CHART_RETENTION_SECONDS = config('CHART_RETENTION_SECONDS', default=60 * 60, cast=int)
+
+# Tickers per Celery task when fanning out a backtest sweep
+BACKTEST_SWEEP_CHUNK_SIZE = config('BACKTEST_SWEEP_CHUNK_SIZE', default=10, cast=int)
+
+# Training input pipeline (api/training.py fit_pipeline). The learning rate
+# is scaled from Adam's default at batch size 16 by 'linear', 'sqrt' or 'none'.
+TRAINING_BATCH_SIZE = config('TRAINING_BATCH_SIZE', default=64, cast=int)
+TRAINING_LR_SCALING = config('TRAINING_LR_SCALING', default='sqrt')
+# Upper bound on epochs for a full retrain; early stopping usually ends sooner
+TRAINING_MAX_EPOCHS = config('TRAINING_MAX_EPOCHS', default=50, cast=int)
+# Most recent share of the training windows held out for early stopping
+TRAINING_VALIDATION_SPLIT = config('TRAINING_VALIDATION_SPLIT', default=0.1, cast=float)
+TRAINING_EARLY_STOPPING_PATIENCE = config('TRAINING_EARLY_STOPPING_PATIENCE', default=5, cast=int)
+
+# Incremental retraining (train_model_task mode='incremental')
+INCREMENTAL_EPOCHS = config('INCREMENTAL_EPOCHS', default=5, cast=int)
+INCREMENTAL_REPLAY_RATIO = config('INCREMENTAL_REPLAY_RATIO', default=4.0, cast=float)
+# Full retrain when new prices leave the scaler range by more than this (in scaled units)
+INCREMENTAL_MAX_DRIFT = config('INCREMENTAL_MAX_DRIFT', default=0.2, cast=float)
+# Full retrain when loss on the new windows exceeds this multiple of the validation baseline
+INCREMENTAL_MAX_LOSS_RATIO = config('INCREMENTAL_MAX_LOSS_RATIO', default=3.0, cast=float)
+
+# Seconds between mid-epoch training progress updates (0 = per-epoch only)
+TRAINING_PROGRESS_BATCH_INTERVAL = config('TRAINING_PROGRESS_BATCH_INTERVAL', default=2.0, cast=float)
+
+# TensorFlow threads per worker process (0 = TensorFlow's default)
+TF_INTRA_OP_THREADS = config('TF_INTRA_OP_THREADS', default=0, cast=int)
+TF_INTER_OP_THREADS = config('TF_INTER_OP_THREADS', default=0, cast=int)
+
+# Training admission: retry later instead of starting without this much free memory
+TRAINING_MIN_FREE_MEMORY_MB = config('TRAINING_MIN_FREE_MEMORY_MB', default=1024, cast=int)
+TRAINING_ADMISSION_RETRY_SECONDS = config('TRAINING_ADMISSION_RETRY_SECONDS', default=30, cast=int)
+TRAINING_ADMISSION_MAX_RETRIES = config('TRAINING_ADMISSION_MAX_RETRIES', default=60, cast=int)
+
+# How long a ticker counts as "training" if its task never releases it
+TRAINING_INFLIGHT_TIMEOUT = config('TRAINING_INFLIGHT_TIMEOUT', default=2 * 60 * 60, cast=int)
+# How long bulk training status reports stay available
+TRAINING_UNIVERSE_RECORD_TIMEOUT = config('TRAINING_UNIVERSE_RECORD_TIMEOUT', default=7 * 24 * 60 * 60, cast=int)
+
+# Epochs for the shared encoder (all tickers at once) and for each per-ticker head
+SHARED_ENCODER_EPOCHS = config('SHARED_ENCODER_EPOCHS', default=20, cast=int)
+HEAD_EPOCHS = config('HEAD_EPOCHS', default=50, cast=int)
+
+# Inference backend for forecasts: 'function' (traced tf.function), 'keras'
+# (model.predict) or 'tflite' (converted TFLite interpreter)
+INFERENCE_BACKEND = config('INFERENCE_BACKEND', default='function')
+# Static batch size the TFLite model is converted with
+INFERENCE_TFLITE_BATCH_SIZE = config('INFERENCE_TFLITE_BATCH_SIZE', default=64, cast=int)
+
+# Limits for recursive horizon forecasts (rollouts = tickers x (paths + 1))
+HORIZON_MAX_DAYS = config('HORIZON_MAX_DAYS', default=252, cast=int)
+HORIZON_MAX_PATHS = config('HORIZON_MAX_PATHS', default=1000, cast=int)
+HORIZON_MAX_ROLLOUTS = config('HORIZON_MAX_ROLLOUTS', default=20000, cast=int)
+
+# Thread pools behind the async streaming forecast views: 'io' for price
+# fetches and chart files, 'compute' for inference. Requests beyond the
+# workers plus FORECAST_MAX_QUEUED waiting calls get an error event.
+FORECAST_IO_WORKERS = config('FORECAST_IO_WORKERS', default=8, cast=int)
+FORECAST_COMPUTE_WORKERS = config('FORECAST_COMPUTE_WORKERS', default=2, cast=int)
+FORECAST_MAX_QUEUED = config('FORECAST_MAX_QUEUED', default=32, cast=int)
+
+# Tickers whose models lambda_handler loads during Lambda init, e.g. "AAPL,GOOG"
+# (a ticker without its own model preloads the default model). Empty keeps the
+# ML stack out of init, so auth-only invocations start fastest.
+LAMBDA_PRELOAD_MODELS = config(
+    'LAMBDA_PRELOAD_MODELS', default='',
+    cast=Csv(post_process=lambda tickers: [ticker.upper() for ticker in tickers]),
+)
+
+# Stage timing histograms (api/timing.py): each process writes its snapshot
+# to the cache at most this often, and /metrics merges the live snapshots
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=10, cast=int)
+METRICS_PROCESS_TIMEOUT = config('METRICS_PROCESS_TIMEOUT', default=24 * 60 * 60, cast=int)
+
+# Trained-model listing (api.models.TrainedModel): default and largest ?page_size
+TRAINED_MODELS_PAGE_SIZE = config('TRAINED_MODELS_PAGE_SIZE', default=50, cast=int)
+TRAINED_MODELS_MAX_PAGE_SIZE = config('TRAINED_MODELS_MAX_PAGE_SIZE', default=500, cast=int)
@@ -29,6 +29,9 @@ STATIC_ROOT = '/tmp/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/tmp/media/'
 
+# Local price store (api/price_store.py); the code directory is read-only on Lambda
+PRICE_DATA_DIR = os.environ.get('PRICE_DATA_DIR', '/tmp/price_data')
+
 # CORS for production
 CORS_ALLOWED_ORIGINS = [
     "https://your-frontend-domain.com",
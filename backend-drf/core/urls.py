@@ -19,10 +19,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from api.timing import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
 
+    # Prometheus scrape endpoint for stage and request timings
+    path('metrics', metrics_view, name='metrics'),
+
     # Base API Endpoint
     path('api/v1/', include('api.urls'))
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -12,6 +12,13 @@ from django.core.wsgi import get_wsgi_application
 # Create WSGI application
 django_app = get_wsgi_application()
 
+# Optionally pay for the forecast stack and model loading during Lambda init
+# rather than on the first forecast request (LAMBDA_PRELOAD_MODELS)
+if settings.LAMBDA_PRELOAD_MODELS:
+    import api.views  # noqa: F401 (imports TensorFlow, sklearn and matplotlib)
+    from api.model_registry import preload_models
+    preload_models(settings.LAMBDA_PRELOAD_MODELS)
+
 # Lambda handler using Mangum
 handler = Mangum(django_app, lifespan="off")
 
@@ -13,6 +13,13 @@ from django.core.management import execute_from_command_line
 # Get Django WSGI application
 application = get_wsgi_application()
 
+# Optionally pay for the forecast stack and model loading during Lambda init
+# rather than on the first forecast request (LAMBDA_PRELOAD_MODELS)
+if settings.LAMBDA_PRELOAD_MODELS:
+    import api.views  # noqa: F401 (imports TensorFlow, sklearn and matplotlib)
+    from api.model_registry import preload_models
+    preload_models(settings.LAMBDA_PRELOAD_MODELS)
+
 # Create Mangum handler for Lambda
 handler = Mangum(application, lifespan="off")
 